@@ -1,17 +1,23 @@
 # This makes 'agents' a Python subpackage
-# You can import your main classes here for easier access
-from .crewai_orchestrator import FinancialCrewOrchestrator
-from .budget_agent import analyze_budget
-from .expenses_agent import optimize_expenses
-from .investment_agent import suggest_investments
-from .debt_agent import plan_debt_repayment
-from .health_agent import financial_health_score
+# Main classes are importable from here; each is loaded on first access so
+# that importing the package does not pull in CrewAI or the Gemini SDK
+import importlib
 
-__all__ = [
-    'FinancialCrewOrchestrator',
-    'analyze_budget',
-    'optimize_expenses',
-    'suggest_investments', 
-    'plan_debt_repayment',
-    'financial_health_score'
-]
\ No newline at end of file
+_EXPORTS = {
+    'FinancialCrewOrchestrator': '.crewai_orchestrator',
+    'analyze_budget': '.budget_agent',
+    'optimize_expenses': '.expenses_agent',
+    'suggest_investments': '.investment_agent',
+    'plan_debt_repayment': '.debt_agent',
+    'financial_health_score': '.health_agent',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
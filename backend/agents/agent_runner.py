@@ -0,0 +1,314 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Any, AsyncIterator, Callable, Dict, NamedTuple, Optional, Tuple
+
+from .budget_agent import analyze_budget, analyze_budget_async, create_fallback_response
+from .investment_agent import suggest_investments, suggest_investments_async, create_fallback_investment_response
+from .debt_agent import plan_debt_repayment, plan_debt_repayment_async, create_fallback_debt_response
+from .expenses_agent import optimize_expenses, optimize_expenses_async, create_fallback_expenses_response
+from .health_agent import financial_health_score, financial_health_score_async, calculate_fallback_score
+from .combined_agent import build_combined_prompt, parse_combined_data
+from gemini_client import gemini_circuit, gemini_generate_json, gemini_generate_json_async
+from resilience import bounded_timeout
+from token_usage import agent_scope, run_as_agent
+from metrics import fallback_watch, observe_agent
+from tracing import tracer
+
+# Each agent waits on its own Gemini round trip, so the pool is sized for
+# several concurrent analyses rather than for CPU.
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "20"))
+AGENT_TIMEOUT_SECONDS = float(os.getenv("AGENT_TIMEOUT_SECONDS", "20"))
+# "agents": one Gemini call per agent; "combined": one call for all sections
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "agents").strip().lower()
+
+# Sections of a full analysis, in response order
+SECTIONS = (
+    "budget_plan",
+    "investment_plan",
+    "debt_plan",
+    "expense_optimizations",
+    "financial_health_score",
+)
+
+_executor = ThreadPoolExecutor(max_workers=AGENT_POOL_SIZE, thread_name_prefix="agent")
+
+logger = logging.getLogger(__name__)
+
+
+def _submit(fn: Callable[..., Any], *args):
+    # Copy the context so the request deadline and usage ledger reach the worker thread
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _fallbacks_if_circuit_open(calls: Dict[str, "AgentCall"]) -> Optional[Dict[str, Any]]:
+    """Rule-based results for every call while Gemini calls are being skipped"""
+    if not gemini_circuit.is_open():
+        return None
+    logger.warning("Gemini circuit is open, using rule-based fallbacks")
+    for call in calls.values():
+        observe_agent(call.name, "circuit_open")
+    return {section: call.fallback(*call.fallback_args) for section, call in calls.items()}
+
+
+def _run_agent(section: str, call: "AgentCall"):
+    """Run one agent call; (result, whether it fell back, seconds taken)"""
+    start = time.monotonic()
+    with _agent_span(section, call) as span, agent_scope(section), fallback_watch() as used:
+        result = call.run(*call.args)
+        span.set_attribute("agent.fallback", bool(used))
+    return result, bool(used), time.monotonic() - start
+
+
+async def _run_agent_async(section: str, call: "AgentCall"):
+    """Event-loop counterpart of _run_agent"""
+    start = time.monotonic()
+    with _agent_span(section, call) as span, agent_scope(section), fallback_watch() as used:
+        result = await call.run_async(*call.args)
+        span.set_attribute("agent.fallback", bool(used))
+    return result, bool(used), time.monotonic() - start
+
+
+def _agent_span(section: str, call: "AgentCall"):
+    return tracer.start_as_current_span(
+        f"agent {call.name}", attributes={"agent.name": call.name, "agent.section": section}
+    )
+
+
+class AgentCall(NamedTuple):
+    """One agent invocation and the deterministic fallback that replaces it"""
+    run: Callable[..., Any]
+    run_async: Callable[..., Any]
+    args: tuple
+    fallback: Callable[..., Any]
+    fallback_args: tuple
+
+    @property
+    def name(self) -> str:
+        """Agent name used in metrics, e.g. analyze_budget"""
+        return self.run.__name__
+
+
+def monthly_investable(income: float, expenses: dict, debt: Optional[float]) -> float:
+    """What is left to invest each month: income after expenses and debt, never negative"""
+    return max(0, income - sum(expenses.values()) - (debt or 0))
+
+
+def build_agent_calls(income: float, expenses: dict, risk_level: str, debt: float,
+                      savings_goal: Optional[float], monthly_investable: float) -> Dict[str, AgentCall]:
+    """Describe the five independent agent calls for one analysis"""
+    return {
+        "budget_plan": AgentCall(
+            analyze_budget, analyze_budget_async, (income, expenses, savings_goal),
+            create_fallback_response, (income, expenses),
+        ),
+        "investment_plan": AgentCall(
+            suggest_investments, suggest_investments_async, (risk_level, monthly_investable),
+            create_fallback_investment_response, (risk_level, monthly_investable),
+        ),
+        "debt_plan": AgentCall(
+            plan_debt_repayment, plan_debt_repayment_async, (debt, income),
+            create_fallback_debt_response, (debt, income),
+        ),
+        "expense_optimizations": AgentCall(
+            optimize_expenses, optimize_expenses_async, (expenses,),
+            create_fallback_expenses_response, (expenses,),
+        ),
+        "financial_health_score": AgentCall(
+            financial_health_score, financial_health_score_async, (income, expenses, debt, savings_goal),
+            calculate_fallback_score, (income, expenses, debt),
+        ),
+    }
+
+
+def run_agents_concurrently(calls: Dict[str, AgentCall], timeout: float = AGENT_TIMEOUT_SECONDS,
+                            timeouts: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Run the agent calls on the shared pool and collect one result per section.
+
+    Every agent gets its own deadline (``timeouts[section]`` or ``timeout``,
+    capped by the request deadline), measured from submission. An agent
+    that times out or raises is replaced by its deterministic fallback, so
+    the result always has every section.
+    """
+    fallbacks = _fallbacks_if_circuit_open(calls)
+    if fallbacks is not None:
+        return fallbacks
+
+    timeouts = timeouts or {}
+    start = time.monotonic()
+    # Absolute per-section deadlines, fixed at submission
+    deadlines = {section: start + bounded_timeout(timeouts.get(section, timeout)) for section in calls}
+    futures = {
+        section: _submit(_run_agent, section, call)
+        for section, call in calls.items()
+    }
+
+    results = {}
+    for section, future in futures.items():
+        call = calls[section]
+        try:
+            remaining = max(0.0, deadlines[section] - time.monotonic())
+            results[section], fell_back, seconds = future.result(timeout=remaining)
+            observe_agent(call.name, "fallback" if fell_back else "success", seconds)
+        except FuturesTimeout:
+            future.cancel()
+            logger.warning("%s agent timed out, using fallback", section, extra={"agent": section})
+            observe_agent(call.name, "timeout", time.monotonic() - start)
+            results[section] = call.fallback(*call.fallback_args)
+        except Exception as e:
+            logger.error("%s agent failed: %s", section, e, extra={"agent": section})
+            observe_agent(call.name, "error", time.monotonic() - start)
+            results[section] = call.fallback(*call.fallback_args)
+
+    logger.info("%d agents finished in %.2fs", len(results), time.monotonic() - start)
+    return results
+
+
+async def iter_agents_async(calls: Dict[str, AgentCall], timeout: float = AGENT_TIMEOUT_SECONDS,
+                            timeouts: Optional[Dict[str, float]] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the async agent variants side by side and yield (section, result)
+    pairs in the order they finish.
+
+    Uses the same per-agent deadlines and fallbacks as
+    run_agents_concurrently, without holding a thread per agent.
+    """
+    fallbacks = _fallbacks_if_circuit_open(calls)
+    if fallbacks is not None:
+        for item in fallbacks.items():
+            yield item
+        return
+
+    timeouts = timeouts or {}
+
+    async def run_one(section: str, call: AgentCall):
+        start = time.monotonic()
+        try:
+            result, fell_back, seconds = await asyncio.wait_for(
+                _run_agent_async(section, call), bounded_timeout(timeouts.get(section, timeout))
+            )
+            observe_agent(call.name, "fallback" if fell_back else "success", seconds)
+            return section, result
+        except asyncio.TimeoutError:
+            logger.warning("%s agent timed out, using fallback", section, extra={"agent": section})
+            observe_agent(call.name, "timeout", time.monotonic() - start)
+        except Exception as e:
+            logger.error("%s agent failed: %s", section, e, extra={"agent": section})
+            observe_agent(call.name, "error", time.monotonic() - start)
+        return section, call.fallback(*call.fallback_args)
+
+    tasks = [asyncio.ensure_future(run_one(section, call)) for section, call in calls.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The consumer stopped early (e.g. the client disconnected)
+        for task in tasks:
+            task.cancel()
+
+
+async def run_agents_async(calls: Dict[str, AgentCall], timeout: float = AGENT_TIMEOUT_SECONDS,
+                           timeouts: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Event-loop counterpart of run_agents_concurrently"""
+    start = time.monotonic()
+    results = {}
+    async for section, value in iter_agents_async(calls, timeout, timeouts):
+        results[section] = value
+
+    logger.info("%d agents finished in %.2fs", len(results), time.monotonic() - start)
+    return {section: results[section] for section in calls}
+
+
+def run_analysis(income: float, expenses: dict, risk_level: str, debt: float,
+                 savings_goal: Optional[float], monthly_investable: float,
+                 mode: str = ANALYSIS_MODE) -> Dict[str, Any]:
+    """
+    Produce every analysis section using the configured execution mode.
+
+    In "combined" mode a single prompt asks for all sections; only the
+    sections that fail validation are recomputed by their own agent.
+    """
+    calls = build_agent_calls(income, expenses, risk_level, debt, savings_goal, monthly_investable)
+    if mode != "combined" or gemini_circuit.is_open():
+        return run_agents_concurrently(calls)
+
+    prompt = build_combined_prompt(income, expenses, risk_level, debt, savings_goal, monthly_investable)
+    start = time.monotonic()
+    with tracer.start_as_current_span("agent combined_analysis"):
+        try:
+            document = _submit(run_as_agent, "combined", gemini_generate_json, prompt, "{").result(
+                timeout=bounded_timeout(AGENT_TIMEOUT_SECONDS)
+            )
+            sections = parse_combined_data(
+                document, income, expenses, risk_level, debt, monthly_investable
+            )
+            observe_agent("combined_analysis", "success" if len(sections) == len(calls) else "fallback",
+                          time.monotonic() - start)
+        except FuturesTimeout:
+            logger.warning("Combined analysis timed out, running agents individually")
+            observe_agent("combined_analysis", "timeout", time.monotonic() - start)
+            sections = {}
+        except Exception as e:
+            logger.warning("Combined analysis failed, running agents individually: %s", e)
+            observe_agent("combined_analysis", "error", time.monotonic() - start)
+            sections = {}
+
+    missing = {section: call for section, call in calls.items() if section not in sections}
+    if missing:
+        sections.update(run_agents_concurrently(missing))
+    return {section: sections[section] for section in calls}
+
+
+async def iter_analysis_async(income: float, expenses: dict, risk_level: str, debt: float,
+                              savings_goal: Optional[float], monthly_investable: float,
+                              mode: str = ANALYSIS_MODE) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield (section, result) pairs of one analysis as soon as each is ready"""
+    calls = build_agent_calls(income, expenses, risk_level, debt, savings_goal, monthly_investable)
+    if mode == "combined" and not gemini_circuit.is_open():
+        prompt = build_combined_prompt(income, expenses, risk_level, debt, savings_goal, monthly_investable)
+        start = time.monotonic()
+        with tracer.start_as_current_span("agent combined_analysis"):
+            try:
+                with agent_scope("combined"):
+                    document = await asyncio.wait_for(
+                        gemini_generate_json_async(prompt, "{"), bounded_timeout(AGENT_TIMEOUT_SECONDS)
+                    )
+                sections = parse_combined_data(
+                    document, income, expenses, risk_level, debt, monthly_investable
+                )
+                observe_agent("combined_analysis", "success" if len(sections) == len(calls) else "fallback",
+                              time.monotonic() - start)
+            except asyncio.TimeoutError:
+                logger.warning("Combined analysis timed out, running agents individually")
+                observe_agent("combined_analysis", "timeout", time.monotonic() - start)
+                sections = {}
+            except Exception as e:
+                logger.warning("Combined analysis failed, running agents individually: %s", e)
+                observe_agent("combined_analysis", "error", time.monotonic() - start)
+                sections = {}
+
+        for section, value in sections.items():
+            yield section, value
+        calls = {section: call for section, call in calls.items() if section not in sections}
+
+    start = time.monotonic()
+    async for item in iter_agents_async(calls):
+        yield item
+    if calls:
+        logger.info("%d agents finished in %.2fs", len(calls), time.monotonic() - start)
+
+
+async def run_analysis_async(income: float, expenses: dict, risk_level: str, debt: float,
+                             savings_goal: Optional[float], monthly_investable: float,
+                             mode: str = ANALYSIS_MODE) -> Dict[str, Any]:
+    """Event-loop counterpart of run_analysis"""
+    results = {}
+    async for section, value in iter_analysis_async(
+        income, expenses, risk_level, debt, savings_goal, monthly_investable, mode
+    ):
+        results[section] = value
+    return {section: results[section] for section in SECTIONS}
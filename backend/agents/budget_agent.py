@@ -1,18 +1,52 @@
 from typing import Optional
-from gemini_client import gemini_generate  # Correct import for subdirectory
-import json
-import re
+from gemini_client import gemini_generate_json, gemini_generate_json_async  # Correct import for subdirectory
+from metrics import marks_fallback
+import logging
+
+from .prompts import PROMPT_STYLE, compact_json
+
+logger = logging.getLogger(__name__)
 
 def analyze_budget(income: float, expenses: dict, savings_goal: Optional[float] = None) -> dict:
     """
     Returns structured JSON for budget analysis.
     """
+    prompt = build_budget_prompt(income, expenses, savings_goal)
+
+    try:
+        data = gemini_generate_json(prompt, "{")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return create_fallback_response(income, expenses)
+    
+    return parse_budget_data(data, income, expenses)
+
+async def analyze_budget_async(income: float, expenses: dict, savings_goal: Optional[float] = None) -> dict:
+    """
+    Async variant of analyze_budget for use inside the event loop.
+    """
+    prompt = build_budget_prompt(income, expenses, savings_goal)
+
+    try:
+        data = await gemini_generate_json_async(prompt, "{")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return create_fallback_response(income, expenses)
+    
+    return parse_budget_data(data, income, expenses)
+
+def build_budget_prompt(income: float, expenses: dict, savings_goal: Optional[float] = None,
+                        style: str = PROMPT_STYLE) -> str:
+    """Build the Gemini prompt for budget analysis"""
+    if style == "compact":
+        return build_compact_budget_prompt(income, expenses, savings_goal)
+
     # Calculate actual savings
     total_expenses = sum(expenses.values()) if expenses else 0
     actual_savings = income - total_expenses
     actual_savings_percentage = (actual_savings / income) * 100 if income > 0 else 0
     
-    prompt = (
+    return (
         f"You are a financial assistant. Analyze this financial situation:\n"
         f"Monthly Income: ₹{income}\n"
         f"Expenses: {expenses}\n"
@@ -46,134 +80,53 @@ def analyze_budget(income: float, expenses: dict, savings_goal: Optional[float]
         "Return ONLY the JSON object, no other text."
     )
 
-    try:
-        response_text = gemini_generate(prompt)
-    except Exception as e:
-        print(f"Error calling Gemini: {e}")
-        return create_fallback_response(income, expenses)
-    
-    # Clean the response and extract JSON
-    cleaned_response = clean_json_response(response_text)
-    
-    try:
-        data = json.loads(cleaned_response)
-        
-        # Validate the required structure
-        if not validate_budget_structure(data):
-            return create_fallback_response(income, expenses)
-        
-        # 🎯 CORRECT: JUST USE ACTUAL SAVINGS
-        data["recommended_monthly_savings"] = float(actual_savings)
-        
-        # Update tips if user is saving exceptionally well
-        if actual_savings_percentage > 50:
-            data["tips"] = [
-                f"Exceptional! You're saving {actual_savings_percentage:.1f}% of your income (₹{actual_savings})",
-                "Consider investing your substantial savings for better returns",
-                "You're saving much more than the typical 20% target - excellent discipline!",
-                "Focus on investment strategies rather than basic savings advice"
-            ]
-            
-        return data
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {response_text}")
-        return create_fallback_response(income, expenses)
-    """
-    Returns structured JSON for budget analysis.
-    """
-    # 🚨 CALCULATE ACTUAL SAVINGS FIRST
+def build_compact_budget_prompt(income: float, expenses: dict, savings_goal: Optional[float] = None) -> str:
+    """Budget prompt with the same output schema in far fewer tokens"""
     total_expenses = sum(expenses.values()) if expenses else 0
     actual_savings = income - total_expenses
     actual_savings_percentage = (actual_savings / income) * 100 if income > 0 else 0
-    
-    prompt = (
-        f"You are a financial assistant. Analyze this financial situation:\n"
-        f"Monthly Income: ₹{income}\n"
-        f"Expenses: {expenses}\n"
-        f"Total Expenses: ₹{total_expenses}\n"
-        f"Actual Monthly Savings: ₹{actual_savings} ({actual_savings_percentage:.1f}% of income)\n"
-        f"Savings goal: {savings_goal if savings_goal else 'Not specified'}\n\n"
-        f"IMPORTANT: If the user is saving more than 20% (₹{income * 0.2}), acknowledge this "
-        f"and recommend maintaining their excellent savings rate of {actual_savings_percentage:.1f}%.\n\n"
-        "Provide analysis in this EXACT JSON format:\n"
-        "{\n"
-        '  "current_allocation": {\n'
-        '    "needs_percentage": 54.0,\n'
-        '    "wants_percentage": 9.0,\n'
-        '    "savings_percentage": 37.0\n'
-        "  },\n"
-        '  "recommended_allocation_50_30_20": {\n'
-        '    "needs_percentage": 50.0,\n'
-        '    "wants_percentage": 30.0,\n'
-        '    "savings_percentage": 20.0\n'
-        "  },\n"
-        f'  "recommended_monthly_savings": {max(actual_savings, income * 0.2)},\n'  # 🚨 KEY FIX
-        '  "tips": [\n'
-        '    "You are currently saving significantly more than the recommended 20% of your income!",\n'
-        '    "Consider setting specific financial goals for your excess savings.",\n'
-        '    "Review your needs category for potential optimizations."\n'
-        "  ]\n"
-        "}\n\n"
-        "Calculate current allocation percentages based on:\n"
-        "- Needs: rent, utilities, groceries\n"
-        "- Wants: entertainment, travel, dining\n"
-        "- Savings: Income - Total Expenses\n\n"
-        "Return ONLY the JSON object, no other text."
+
+    return (
+        f"Monthly income {income}; expenses {compact_json(expenses)} (total {total_expenses}); "
+        f"savings {actual_savings} ({actual_savings_percentage:.1f}%); "
+        f"goal {savings_goal if savings_goal else 'none'}.\n"
+        "Needs: rent, utilities, groceries. Wants: entertainment, travel, dining. "
+        f"Recommend keeping the {actual_savings_percentage:.1f}% savings rate; give 3 tips.\n"
+        "Reply with only this JSON, percentages filled in:\n"
+        '{"current_allocation":{"needs_percentage":0,"wants_percentage":0,"savings_percentage":0},'
+        '"recommended_allocation_50_30_20":{"needs_percentage":50,"wants_percentage":30,"savings_percentage":20},'
+        f'"recommended_monthly_savings":{actual_savings},"tips":["..."]}}'
     )
 
-    try:
-        response_text = gemini_generate(prompt)
-    except Exception as e:
-        print(f"Error calling Gemini: {e}")
-        return create_fallback_response(income, expenses)
-    
-    # Clean the response and extract JSON
-    cleaned_response = clean_json_response(response_text)
+def parse_budget_data(data, income: float, expenses: dict) -> dict:
+    """Turn parsed Gemini JSON into a validated budget plan"""
+    total_expenses = sum(expenses.values()) if expenses else 0
+    actual_savings = income - total_expenses
+    actual_savings_percentage = (actual_savings / income) * 100 if income > 0 else 0
     
-    try:
-        data = json.loads(cleaned_response)
-        
-        # Validate the required structure
-        if not validate_budget_structure(data):
-            return create_fallback_response(income, expenses)
-        
-        # 🚨 CRITICAL: ENSURE we use actual savings if it's higher
-        data["recommended_monthly_savings"] = float(max(
-            data.get("recommended_monthly_savings", income * 0.2),
-            actual_savings  # This ensures we never recommend LESS than what user already saves
-        ))
-        
-        # 🚨 Update tips if user is saving exceptionally well
-        if actual_savings_percentage > 50:
-            data["tips"] = [
-                f"Exceptional! You're saving {actual_savings_percentage:.1f}% of your income (₹{actual_savings})",
-                "Consider investing your substantial savings for better returns",
-                "You're saving much more than the typical 20% target - excellent discipline!",
-                "Focus on investment strategies rather than basic savings advice"
-            ]
-            
-        return data
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {response_text}")
+    # Validate the required structure
+    if not isinstance(data, dict) or not validate_budget_structure(data):
         return create_fallback_response(income, expenses)
-def clean_json_response(response_text: str) -> str:
-    """Clean and extract JSON from response text"""
-    if not response_text:
-        return "{}"
-        
-    # Remove markdown code blocks
-    cleaned = response_text.replace('```json', '').replace('```', '')
     
-    # Extract JSON using regex
-    json_match = re.search(r'\{.*\}', cleaned, re.DOTALL)
-    if json_match:
-        return json_match.group()
+    # 🎯 CORRECT: JUST USE ACTUAL SAVINGS
+    data["recommended_monthly_savings"] = float(actual_savings)
     
-    return cleaned.strip()
+    # Update tips if user is saving exceptionally well
+    if actual_savings_percentage > 50:
+        data["tips"] = exceptional_savings_tips(income, expenses)
+        
+    return data
+
+def exceptional_savings_tips(income: float, expenses: dict) -> list:
+    """Tips that replace Gemini's when more than half the income is saved"""
+    actual_savings = income - (sum(expenses.values()) if expenses else 0)
+    actual_savings_percentage = (actual_savings / income) * 100 if income > 0 else 0
+    return [
+        f"Exceptional! You're saving {actual_savings_percentage:.1f}% of your income (₹{actual_savings})",
+        "Consider investing your substantial savings for better returns",
+        "You're saving much more than the typical 20% target - excellent discipline!",
+        "Focus on investment strategies rather than basic savings advice"
+    ]
 
 def validate_budget_structure(data: dict) -> bool:
     """Validate that the response has the expected structure"""
@@ -194,6 +147,7 @@ def validate_budget_structure(data: dict) -> bool:
         return False
         
     return True
+@marks_fallback
 def create_fallback_response(income: float, expenses: dict) -> dict:
     """Create a fallback response when JSON parsing fails"""
     total_expenses = sum(expenses.values()) if expenses else 0
@@ -0,0 +1,143 @@
+from typing import Any, Dict, Optional
+import logging
+
+from .budget_agent import validate_budget_structure, parse_budget_data
+from .investment_agent import validate_investment_structure, parse_investment_data
+from .debt_agent import validate_debt_structure, parse_debt_data
+from .expenses_agent import validate_expenses_structure, parse_expenses_data
+from .health_agent import validate_health_structure, parse_health_data
+from .prompts import PROMPT_STYLE, compact_json
+
+logger = logging.getLogger(__name__)
+
+# Expected JSON type of every section in the combined document
+SECTION_TYPES = {
+    "budget_plan": dict,
+    "investment_plan": dict,
+    "debt_plan": dict,
+    "expense_optimizations": list,
+    "financial_health_score": dict,
+}
+
+SECTION_VALIDATORS = {
+    "budget_plan": validate_budget_structure,
+    "investment_plan": validate_investment_structure,
+    "debt_plan": validate_debt_structure,
+    "expense_optimizations": validate_expenses_structure,
+    "financial_health_score": validate_health_structure,
+}
+
+
+def build_combined_prompt(income: float, expenses: dict, risk_level: str, debt: float,
+                          savings_goal: Optional[float], monthly_investable: float,
+                          style: str = PROMPT_STYLE) -> str:
+    """Build one Gemini prompt that asks for every analysis section at once"""
+    if style == "compact":
+        return build_compact_combined_prompt(
+            income, expenses, risk_level, debt, savings_goal, monthly_investable
+        )
+
+    total_expenses = sum(expenses.values()) if expenses else 0
+    actual_savings = income - total_expenses
+    actual_savings_percentage = (actual_savings / income) * 100 if income > 0 else 0
+
+    return (
+        f"You are a team of financial advisors. Analyze this financial situation:\n"
+        f"Monthly Income: ₹{income}\n"
+        f"Expenses: {expenses}\n"
+        f"Total Expenses: ₹{total_expenses}\n"
+        f"Actual Monthly Savings: ₹{actual_savings} ({actual_savings_percentage:.1f}% of income)\n"
+        f"Savings goal: {savings_goal if savings_goal else 'Not specified'}\n"
+        f"Current debt: ₹{debt}\n"
+        f"User risk level: {risk_level}\n"
+        f"Monthly investable amount: ₹{monthly_investable}\n\n"
+        "Return ONLY this EXACT JSON format:\n"
+        "{\n"
+        '  "budget_plan": {\n'
+        '    "current_allocation": {"needs_percentage": 54.0, "wants_percentage": 9.0, "savings_percentage": 37.0},\n'
+        '    "recommended_allocation_50_30_20": {"needs_percentage": 50.0, "wants_percentage": 30.0, "savings_percentage": 20.0},\n'
+        f'    "recommended_monthly_savings": {actual_savings},\n'
+        '    "tips": ["Tip 1", "Tip 2", "Tip 3"]\n'
+        "  },\n"
+        '  "investment_plan": {\n'
+        '    "portfolio": [\n'
+        '      {"asset": "Mutual Funds", "allocation%": 50, "amount": 5000.0, "notes": "Balanced growth"}\n'
+        "    ],\n"
+        '    "important_considerations": ["Diversify across asset classes"]\n'
+        "  },\n"
+        '  "debt_plan": {\n'
+        '    "status": "Debt-free",\n'
+        '    "recommended_strategy": "Strategy description",\n'
+        '    "estimated_months_to_clear": 0\n'
+        "  },\n"
+        '  "expense_optimizations": [\n'
+        '    {"action": "Reduce spending on category", "estimated_savings": 1500.0, "reason": "Why this helps"}\n'
+        "  ],\n"
+        '  "financial_health_score": {"score": 75}\n'
+        "}\n\n"
+        "Rules:\n"
+        f"- budget_plan: recommend maintaining the current savings rate of {actual_savings_percentage:.1f}%; "
+        "needs are rent, utilities, groceries; wants are entertainment, travel, dining\n"
+        f"- investment_plan: split the monthly investable amount across assets for a {risk_level} risk level\n"
+        "- debt_plan: if debt is 0, status is 'Debt-free' and months is 0; otherwise status is 'Has debt' "
+        "with realistic months to clear\n"
+        "- expense_optimizations: 3-5 suggestions, highest spending categories first\n"
+        "- financial_health_score: 80-100 excellent, 60-79 good, 40-59 fair, 0-39 poor\n\n"
+        "Return ONLY the JSON object, no other text."
+    )
+
+
+def build_compact_combined_prompt(income: float, expenses: dict, risk_level: str, debt: float,
+                                  savings_goal: Optional[float], monthly_investable: float) -> str:
+    """Combined prompt with the same output schema in far fewer tokens"""
+    total_expenses = sum(expenses.values()) if expenses else 0
+    actual_savings = income - total_expenses
+    actual_savings_percentage = (actual_savings / income) * 100 if income > 0 else 0
+
+    return (
+        f"Monthly income {income}; expenses {compact_json(expenses)} (total {total_expenses}); "
+        f"savings {actual_savings} ({actual_savings_percentage:.1f}%); "
+        f"goal {savings_goal if savings_goal else 'none'}; debt {debt}; risk {risk_level}; "
+        f"investable {monthly_investable}.\n"
+        f"budget_plan: keep the {actual_savings_percentage:.1f}% savings rate; needs are rent, utilities, "
+        "groceries, wants are entertainment, travel, dining; 3 tips. "
+        "investment_plan: split the investable amount for the risk level. "
+        "debt_plan: debt 0 is \"Debt-free\" with 0 months, else \"Has debt\" with realistic months. "
+        "expense_optimizations: 3-5, highest spending first. "
+        "financial_health_score: 80+ excellent, 60-79 good, 40-59 fair, <40 poor.\n"
+        "Reply with only this JSON:\n"
+        '{"budget_plan":{"current_allocation":{"needs_percentage":0,"wants_percentage":0,"savings_percentage":0},'
+        '"recommended_allocation_50_30_20":{"needs_percentage":50,"wants_percentage":30,"savings_percentage":20},'
+        f'"recommended_monthly_savings":{actual_savings},"tips":["..."]}},'
+        '"investment_plan":{"portfolio":[{"asset":"...","allocation%":0,"amount":0.0,"notes":"..."}],'
+        '"important_considerations":["..."]},'
+        '"debt_plan":{"status":"...","recommended_strategy":"...","estimated_months_to_clear":0},'
+        '"expense_optimizations":[{"action":"...","estimated_savings":0.0,"reason":"..."}],'
+        '"financial_health_score":{"score":0}}'
+    )
+
+
+def parse_combined_data(document: Any, income: float, expenses: dict, risk_level: str,
+                        debt: float, monthly_investable: float) -> Dict[str, Any]:
+    """Split an already parsed combined document into validated sections"""
+    if not isinstance(document, dict):
+        return {}
+
+    sections = {}
+    for section, validate in SECTION_VALIDATORS.items():
+        data = document.get(section)
+        if not isinstance(data, SECTION_TYPES[section]) or not validate(data):
+            logger.info("Combined response has no valid %s", section)
+            continue
+        # Reuse each agent's post-processing (actual savings, score bounds)
+        if section == "budget_plan":
+            sections[section] = parse_budget_data(data, income, expenses)
+        elif section == "investment_plan":
+            sections[section] = parse_investment_data(data, risk_level, monthly_investable)
+        elif section == "debt_plan":
+            sections[section] = parse_debt_data(data, debt, income)
+        elif section == "expense_optimizations":
+            sections[section] = parse_expenses_data(data, expenses)
+        else:
+            sections[section] = parse_health_data(data, income, expenses, debt)
+    return sections
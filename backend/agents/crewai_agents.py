@@ -1,26 +1,6 @@
-from crewai import Agent, Task, Crew, Process
-from langchain_core.tools import Tool
-import json
-import os
-import sys
+import json_codec
 
-# Get the absolute path to the backend directory
-current_dir = os.path.dirname(os.path.abspath(__file__))
-backend_dir = os.path.dirname(current_dir)  # This goes up to backend folder
-sys.path.insert(0, backend_dir)
-
-# ✅ ABSOLUTE IMPORTS with full path
-try:
-    # Import gemini_client from backend folder
-    from gemini_client import gemini_generate
-    print("✅ Successfully imported gemini_client")
-except ImportError as e:
-    print(f"❌ Failed to import gemini_client: {e}")
-    # Fallback function
-    def gemini_generate(prompt): 
-        return f"Simulated response for: {prompt}"
-
-# Other agents use relative imports (they're in the same directory)
+# Agent functions wrapped as CrewAI tools
 from .budget_agent import analyze_budget
 from .investment_agent import suggest_investments
 from .debt_agent import plan_debt_repayment
@@ -33,6 +13,8 @@ class FinancialCrewAI:
     
     def _create_agents(self):
         """Define your specialized agents"""
+        # CrewAI is slow to import, so it loads only when agents are built
+        from crewai import Agent
         
         # Budget Analyst Agent
         budget_analyst = Agent(
@@ -105,9 +87,9 @@ class FinancialCrewAI:
     def _budget_analysis_tool(self, income: str, expenses: str) -> str:
         """Tool for budget analysis"""
         try:
-            expenses_dict = json.loads(expenses) if isinstance(expenses, str) else expenses
+            expenses_dict = json_codec.loads(expenses) if isinstance(expenses, str) else expenses
             result = analyze_budget(float(income), expenses_dict)
-            return json.dumps(result, ensure_ascii=False)
+            return json_codec.dumps_str(result)
         except Exception as e:
             return f"Error in budget analysis: {str(e)}"
     
@@ -115,7 +97,7 @@ class FinancialCrewAI:
         """Tool for investment analysis"""
         try:
             result = suggest_investments(risk_level, float(investable_amount))
-            return json.dumps(result, ensure_ascii=False)
+            return json_codec.dumps_str(result)
         except Exception as e:
             return f"Error in investment analysis: {str(e)}"
     
@@ -123,24 +105,24 @@ class FinancialCrewAI:
         """Tool for debt analysis"""
         try:
             result = plan_debt_repayment(float(debt), float(income))
-            return json.dumps(result, ensure_ascii=False)
+            return json_codec.dumps_str(result)
         except Exception as e:
             return f"Error in debt analysis: {str(e)}"
     
     def _expense_analysis_tool(self, expenses: str) -> str:
         """Tool for expense optimization"""
         try:
-            expenses_dict = json.loads(expenses) if isinstance(expenses, str) else expenses
+            expenses_dict = json_codec.loads(expenses) if isinstance(expenses, str) else expenses
             result = optimize_expenses(expenses_dict)
-            return json.dumps(result, ensure_ascii=False)
+            return json_codec.dumps_str(result)
         except Exception as e:
             return f"Error in expense analysis: {str(e)}"
     
     def _health_analysis_tool(self, income: str, expenses: str, debt: str) -> str:
         """Tool for health analysis"""
         try:
-            expenses_dict = json.loads(expenses) if isinstance(expenses, str) else expenses
+            expenses_dict = json_codec.loads(expenses) if isinstance(expenses, str) else expenses
             result = financial_health_score(float(income), expenses_dict, float(debt))
-            return json.dumps({"score": result}, ensure_ascii=False)
+            return json_codec.dumps_str({"score": result})
         except Exception as e:
             return f"Error in health analysis: {str(e)}"
\ No newline at end of file
@@ -1,15 +1,23 @@
-from crewai import Crew, Process, Task
 from .crewai_agents import FinancialCrewAI
+from .agent_runner import monthly_investable, run_analysis
+from tracing import tracer
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 class FinancialCrewOrchestrator:
-    def __init__(self):
-        self.financial_crew = FinancialCrewAI()
+    def __init__(self, financial_crew: FinancialCrewAI = None):
+        # The agent registry is expensive to build; share one across requests
+        self.financial_crew = financial_crew or FinancialCrewAI()
     
+    @tracer.start_as_current_span("orchestrator.analyze_finances")
     def analyze_finances(self, user_data):
         """Orchestrate the crew to analyze finances"""
         
-        print("🚀 Starting CrewAI Financial Analysis...")
+        from crewai import Crew, Process
+        
+        logger.info("Starting CrewAI financial analysis")
         
         # Create dynamic tasks based on user data
         tasks = self._create_dynamic_tasks(user_data)
@@ -19,19 +27,20 @@ class FinancialCrewOrchestrator:
             agents=list(self.financial_crew.agents.values()),
             tasks=tasks,
             process=Process.sequential,
-            verbose=True
+            # CrewAI's own step-by-step output only when debugging
+            verbose=logger.isEnabledFor(logging.DEBUG)
         )
         
         try:
             # Execute the crew
-            print("🤖 CrewAI agents are collaborating...")
-            result = crew.kickoff()
+            with tracer.start_as_current_span("crew.kickoff"):
+                result = crew.kickoff()
             
-            print("✅ CrewAI analysis completed!")
+            logger.info("CrewAI analysis completed")
             return self._fallback_analysis(user_data)  # Use fallback for now
             
         except Exception as e:
-            print(f"❌ CrewAI Error: {e}")
+            logger.error("CrewAI error: %s", e)
             return self._fallback_analysis(user_data)
     
     def _create_dynamic_tasks(self, user_data):
@@ -41,30 +50,27 @@ class FinancialCrewOrchestrator:
     
     def _fallback_analysis(self, user_data):
         """Fallback using direct agent calls"""
-        print("🔄 Using direct agent analysis...")
-        
-        total_expenses = sum(user_data['expenses'].values())
-        monthly_investable = max(0, user_data['income'] - total_expenses - user_data.get('debt', 0))
+        logger.info("Using direct agent analysis")
         
-        # ✅ FIXED: Use absolute imports
-        from backend.agents.budget_agent import analyze_budget
-        from backend.agents.investment_agent import suggest_investments
-        from backend.agents.debt_agent import plan_debt_repayment
-        from backend.agents.expenses_agent import optimize_expenses
-        from backend.agents.health_agent import financial_health_score
+        # Agents run side by side, or as one combined prompt (ANALYSIS_MODE)
+        results = run_analysis(
+            user_data['income'],
+            user_data['expenses'],
+            user_data['risk_level'],
+            user_data.get('debt', 0),
+            user_data.get('savings_goal', 0),
+            monthly_investable(user_data['income'], user_data['expenses'], user_data.get('debt', 0)),
+        )
         
         # Ensure health score is within bounds
-        health_score = financial_health_score(
-            user_data['income'], user_data['expenses'], user_data.get('debt', 0)
-        )
+        health_score = results["financial_health_score"]
         health_score = max(0, min(int(health_score) if isinstance(health_score, (int, float)) else 70, 100))
         
-        # ✅ FIXED: Proper indentation
         return {
-            "budget_plan": analyze_budget(user_data['income'], user_data['expenses'], user_data.get('savings_goal', 0)),
-            "investment_plan": suggest_investments(user_data['risk_level'], monthly_investable),
-            "debt_plan": plan_debt_repayment(user_data.get('debt', 0), user_data['income']),
-            "expense_optimizations": optimize_expenses(user_data['expenses']),
+            "budget_plan": results["budget_plan"],
+            "investment_plan": results["investment_plan"],
+            "debt_plan": results["debt_plan"],
+            "expense_optimizations": results["expense_optimizations"],
             "financial_health_score": health_score,
             "crewai_used": True
-        }
\ No newline at end of file
+        }
@@ -1,13 +1,45 @@
 from typing import Dict
-from gemini_client import gemini_generate
-import json
-import re
+from gemini_client import gemini_generate_json, gemini_generate_json_async
+from metrics import marks_fallback
+import logging
+
+from .prompts import PROMPT_STYLE
+
+logger = logging.getLogger(__name__)
 
 def plan_debt_repayment(debt: float, income: float) -> Dict:
     """
     Returns structured JSON for debt planning.
     """
-    prompt = (
+    prompt = build_debt_prompt(debt, income)
+
+    try:
+        data = gemini_generate_json(prompt, "{")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return create_fallback_debt_response(debt, income)
+    
+    return parse_debt_data(data, debt, income)
+
+async def plan_debt_repayment_async(debt: float, income: float) -> Dict:
+    """
+    Async variant of plan_debt_repayment for use inside the event loop.
+    """
+    prompt = build_debt_prompt(debt, income)
+
+    try:
+        data = await gemini_generate_json_async(prompt, "{")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return create_fallback_debt_response(debt, income)
+    
+    return parse_debt_data(data, debt, income)
+
+def build_debt_prompt(debt: float, income: float, style: str = PROMPT_STYLE) -> str:
+    """Build the Gemini prompt for debt planning"""
+    if style == "compact":
+        return build_compact_debt_prompt(debt, income)
+    return (
         f"User monthly income: ₹{income}, current debt: ₹{debt}.\n"
         "Provide a JSON object with this EXACT structure:\n"
         "{\n"
@@ -22,43 +54,22 @@ def plan_debt_repayment(debt: float, income: float) -> Dict:
         "Return ONLY the JSON object, no other text."
     )
 
-    try:
-        response_text = gemini_generate(prompt)
-    except Exception as e:
-        print(f"Error calling Gemini: {e}")
-        return create_fallback_debt_response(debt, income)
-    
-    # Clean the response and extract JSON
-    cleaned_response = clean_json_response(response_text)
-    
-    try:
-        data = json.loads(cleaned_response)
-        
-        # Validate the required structure
-        if not validate_debt_structure(data):
-            return create_fallback_debt_response(debt, income)
-            
-        return data
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {response_text}")
-        return create_fallback_debt_response(debt, income)
+def build_compact_debt_prompt(debt: float, income: float) -> str:
+    """Debt prompt with the same output schema in far fewer tokens"""
+    return (
+        f"Monthly income {income}, debt {debt}. "
+        "Debt 0: status \"Debt-free\", 0 months; else \"Has debt\", realistic months and practical strategy.\n"
+        "Reply with only this JSON:\n"
+        '{"status":"...","recommended_strategy":"...","estimated_months_to_clear":0}'
+    )
 
-def clean_json_response(response_text: str) -> str:
-    """Clean and extract JSON from response text"""
-    if not response_text:
-        return "{}"
+def parse_debt_data(data, debt: float, income: float) -> Dict:
+    """Turn parsed Gemini JSON into a validated debt plan"""
+    # Validate the required structure
+    if not isinstance(data, dict) or not validate_debt_structure(data):
+        return create_fallback_debt_response(debt, income)
         
-    # Remove markdown code blocks
-    cleaned = response_text.replace('```json', '').replace('```', '')
-    
-    # Extract JSON using regex
-    json_match = re.search(r'\{.*\}', cleaned, re.DOTALL)
-    if json_match:
-        return json_match.group()
-    
-    return cleaned.strip()
+    return data
 
 def validate_debt_structure(data: dict) -> bool:
     """Validate that the response has the expected structure"""
@@ -76,6 +87,7 @@ def validate_debt_structure(data: dict) -> bool:
         
     return True
 
+@marks_fallback
 def create_fallback_debt_response(debt: float, income: float) -> Dict:
     """Create a fallback response when JSON parsing fails"""
     if debt == 0:
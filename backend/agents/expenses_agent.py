@@ -1,7 +1,11 @@
 from typing import List, Dict
-from gemini_client import gemini_generate
-import json
-import re
+from gemini_client import gemini_generate_json, gemini_generate_json_async
+from metrics import marks_fallback
+import logging
+
+from .prompts import PROMPT_STYLE, compact_json
+
+logger = logging.getLogger(__name__)
 
 def optimize_expenses(expenses: Dict[str, float]) -> List[Dict]:
     """
@@ -11,7 +15,35 @@ def optimize_expenses(expenses: Dict[str, float]) -> List[Dict]:
         - 'estimated_savings': Potential savings amount
         - 'reason': Why this action helps
     """
-    prompt = (
+    prompt = build_expenses_prompt(expenses)
+
+    try:
+        data = gemini_generate_json(prompt, "[")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return create_fallback_expenses_response(expenses)
+    
+    return parse_expenses_data(data, expenses)
+
+async def optimize_expenses_async(expenses: Dict[str, float]) -> List[Dict]:
+    """
+    Async variant of optimize_expenses for use inside the event loop.
+    """
+    prompt = build_expenses_prompt(expenses)
+
+    try:
+        data = await gemini_generate_json_async(prompt, "[")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return create_fallback_expenses_response(expenses)
+    
+    return parse_expenses_data(data, expenses)
+
+def build_expenses_prompt(expenses: Dict[str, float], style: str = PROMPT_STYLE) -> str:
+    """Build the Gemini prompt for expense optimization"""
+    if style == "compact":
+        return build_compact_expenses_prompt(expenses)
+    return (
         f"User monthly expenses: {expenses}.\n"
         "Provide a list of 3-5 actionable suggestions to reduce costs in this EXACT JSON format:\n"
         "[\n"
@@ -30,43 +62,22 @@ def optimize_expenses(expenses: Dict[str, float]) -> List[Dict]:
         "Return ONLY the JSON array, no other text."
     )
 
-    try:
-        response_text = gemini_generate(prompt)
-    except Exception as e:
-        print(f"Error calling Gemini: {e}")
-        return create_fallback_expenses_response(expenses)
-    
-    # Clean the response and extract JSON
-    cleaned_response = clean_json_response(response_text)
-    
-    try:
-        suggestions = json.loads(cleaned_response)
-        
-        # Validate the required structure
-        if not validate_expenses_structure(suggestions):
-            return create_fallback_expenses_response(expenses)
-            
-        return suggestions
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {response_text}")
-        return create_fallback_expenses_response(expenses)
+def build_compact_expenses_prompt(expenses: Dict[str, float]) -> str:
+    """Expenses prompt with the same output schema in far fewer tokens"""
+    return (
+        f"Monthly expenses {compact_json(expenses)}. "
+        "Give 3-5 actionable suggestions to reduce costs, highest spending first.\n"
+        "Reply with only this JSON array:\n"
+        '[{"action":"...","estimated_savings":0.0,"reason":"..."}]'
+    )
 
-def clean_json_response(response_text: str) -> str:
-    """Clean and extract JSON from response text"""
-    if not response_text:
-        return "[]"
+def parse_expenses_data(suggestions, expenses: Dict[str, float]) -> List[Dict]:
+    """Turn parsed Gemini JSON into a validated list of suggestions"""
+    # Validate the required structure
+    if not validate_expenses_structure(suggestions):
+        return create_fallback_expenses_response(expenses)
         
-    # Remove markdown code blocks
-    cleaned = response_text.replace('```json', '').replace('```', '')
-    
-    # Extract JSON using regex - look for array format
-    json_match = re.search(r'\[.*\]', cleaned, re.DOTALL)
-    if json_match:
-        return json_match.group()
-    
-    return cleaned.strip()
+    return suggestions
 
 def validate_expenses_structure(suggestions: list) -> bool:
     """Validate that the response has the expected structure"""
@@ -83,6 +94,7 @@ def validate_expenses_structure(suggestions: list) -> bool:
             
     return True
 
+@marks_fallback
 def create_fallback_expenses_response(expenses: Dict[str, float]) -> List[Dict]:
     """Create a fallback response when JSON parsing fails"""
     fallback_suggestions = []
@@ -1,13 +1,46 @@
 from typing import Optional
-from gemini_client import gemini_generate
-import json
-import re
+from gemini_client import gemini_generate_json, gemini_generate_json_async
+from metrics import marks_fallback
+import logging
+
+from .prompts import PROMPT_STYLE, compact_json
+
+logger = logging.getLogger(__name__)
 
 def financial_health_score(income: float, expenses: dict, debt: float, savings_goal: Optional[float] = None) -> int:
     """
     Returns an integer financial health score (0-100).
     """
-    prompt = (
+    prompt = build_health_prompt(income, expenses, debt, savings_goal)
+
+    try:
+        data = gemini_generate_json(prompt, "{")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return calculate_fallback_score(income, expenses, debt)
+    
+    return parse_health_data(data, income, expenses, debt)
+
+async def financial_health_score_async(income: float, expenses: dict, debt: float, savings_goal: Optional[float] = None) -> int:
+    """
+    Async variant of financial_health_score for use inside the event loop.
+    """
+    prompt = build_health_prompt(income, expenses, debt, savings_goal)
+
+    try:
+        data = await gemini_generate_json_async(prompt, "{")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return calculate_fallback_score(income, expenses, debt)
+    
+    return parse_health_data(data, income, expenses, debt)
+
+def build_health_prompt(income: float, expenses: dict, debt: float, savings_goal: Optional[float] = None,
+                        style: str = PROMPT_STYLE) -> str:
+    """Build the Gemini prompt for the health score"""
+    if style == "compact":
+        return build_compact_health_prompt(income, expenses, debt, savings_goal)
+    return (
         f"Calculate a financial health score (0-100) based on:\n"
         f"Monthly Income: ₹{income}\n"
         f"Expenses: {expenses}\n"
@@ -25,45 +58,25 @@ def financial_health_score(income: float, expenses: dict, debt: float, savings_g
         "Return ONLY the JSON object, no other text."
     )
 
-    try:
-        response_text = gemini_generate(prompt)
-    except Exception as e:
-        print(f"Error calling Gemini: {e}")
-        return calculate_fallback_score(income, expenses, debt)
-    
-    # Clean the response and extract JSON
-    cleaned_response = clean_json_response(response_text)
-    
-    try:
-        data = json.loads(cleaned_response)
-        
-        # Validate the required structure
-        if not validate_health_structure(data):
-            return calculate_fallback_score(income, expenses, debt)
-            
-        score = int(data.get("score", 70))
-        # Ensure score is between 0 and 100
-        return max(0, min(score, 100))
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {response_text}")
-        return calculate_fallback_score(income, expenses, debt)
+def build_compact_health_prompt(income: float, expenses: dict, debt: float,
+                                savings_goal: Optional[float] = None) -> str:
+    """Health-score prompt with the same output schema in far fewer tokens"""
+    return (
+        f"Monthly income {income}; expenses {compact_json(expenses)}; debt {debt}; "
+        f"goal {savings_goal if savings_goal else 'none'}.\n"
+        "Score financial health 0-100 (80+ excellent, 60-79 good, 40-59 fair, <40 poor).\n"
+        'Reply with only this JSON: {"score":0}'
+    )
 
-def clean_json_response(response_text: str) -> str:
-    """Clean and extract JSON from response text"""
-    if not response_text:
-        return "{}"
+def parse_health_data(data, income: float, expenses: dict, debt: float) -> int:
+    """Turn parsed Gemini JSON into a validated health score"""
+    # Validate the required structure
+    if not validate_health_structure(data):
+        return calculate_fallback_score(income, expenses, debt)
         
-    # Remove markdown code blocks
-    cleaned = response_text.replace('```json', '').replace('```', '')
-    
-    # Extract JSON using regex
-    json_match = re.search(r'\{.*\}', cleaned, re.DOTALL)
-    if json_match:
-        return json_match.group()
-    
-    return cleaned.strip()
+    score = int(data.get("score", 70))
+    # Ensure score is between 0 and 100
+    return max(0, min(score, 100))
 
 def validate_health_structure(data: dict) -> bool:
     """Validate that the response has the expected structure"""
@@ -78,6 +91,7 @@ def validate_health_structure(data: dict) -> bool:
         
     return True
 
+@marks_fallback
 def calculate_fallback_score(income: float, expenses: dict, debt: float) -> int:
     """Calculate a fallback financial health score"""
     if income <= 0:
@@ -1,7 +1,11 @@
 from typing import Dict, Any
-from gemini_client import gemini_generate
-import json
-import re
+from gemini_client import gemini_generate_json, gemini_generate_json_async
+from metrics import marks_fallback
+import logging
+
+from .prompts import PROMPT_STYLE
+
+logger = logging.getLogger(__name__)
 
 def suggest_investments(risk_level: str, monthly_investable: float) -> Dict[str, Any]:
     """
@@ -10,7 +14,35 @@ def suggest_investments(risk_level: str, monthly_investable: float) -> Dict[str,
       - 'portfolio': list of dicts with 'asset', 'allocation%', 'amount', 'notes'
       - 'important_considerations': list of strings
     """
-    prompt = (
+    prompt = build_investment_prompt(risk_level, monthly_investable)
+
+    try:
+        data = gemini_generate_json(prompt, "{")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return create_fallback_investment_response(risk_level, monthly_investable)
+    
+    return parse_investment_data(data, risk_level, monthly_investable)
+
+async def suggest_investments_async(risk_level: str, monthly_investable: float) -> Dict[str, Any]:
+    """
+    Async variant of suggest_investments for use inside the event loop.
+    """
+    prompt = build_investment_prompt(risk_level, monthly_investable)
+
+    try:
+        data = await gemini_generate_json_async(prompt, "{")
+    except Exception as e:
+        logger.warning("Gemini call failed, using fallback: %s", e)
+        return create_fallback_investment_response(risk_level, monthly_investable)
+    
+    return parse_investment_data(data, risk_level, monthly_investable)
+
+def build_investment_prompt(risk_level: str, monthly_investable: float, style: str = PROMPT_STYLE) -> str:
+    """Build the Gemini prompt for investment suggestions"""
+    if style == "compact":
+        return build_compact_investment_prompt(risk_level, monthly_investable)
+    return (
         f"You are a financial advisor.\n"
         f"User risk level: {risk_level}\n"
         f"Monthly investable amount: ₹{monthly_investable}\n\n"
@@ -46,43 +78,23 @@ def suggest_investments(risk_level: str, monthly_investable: float) -> Dict[str,
         "Return ONLY the JSON object, no other text."
     )
 
-    try:
-        response_text = gemini_generate(prompt)
-    except Exception as e:
-        print(f"Error calling Gemini: {e}")
-        return create_fallback_investment_response(risk_level, monthly_investable)
-    
-    # Clean the response and extract JSON
-    cleaned_response = clean_json_response(response_text)
-    
-    try:
-        data = json.loads(cleaned_response)
-        
-        # Validate the required structure
-        if not validate_investment_structure(data):
-            return create_fallback_investment_response(risk_level, monthly_investable)
-            
-        return data
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {response_text}")
-        return create_fallback_investment_response(risk_level, monthly_investable)
+def build_compact_investment_prompt(risk_level: str, monthly_investable: float) -> str:
+    """Investment prompt with the same output schema in far fewer tokens"""
+    return (
+        f"Split a monthly investable amount of {monthly_investable} across 3-5 assets for a {risk_level} risk level; "
+        "amounts sum to it, allocation% to 100.\n"
+        "Reply with only this JSON:\n"
+        '{"portfolio":[{"asset":"...","allocation%":0,"amount":0.0,"notes":"..."}],'
+        '"important_considerations":["..."]}'
+    )
 
-def clean_json_response(response_text: str) -> str:
-    """Clean and extract JSON from response text"""
-    if not response_text:
-        return "{}"
+def parse_investment_data(data, risk_level: str, monthly_investable: float) -> Dict[str, Any]:
+    """Turn parsed Gemini JSON into a validated investment plan"""
+    # Validate the required structure
+    if not isinstance(data, dict) or not validate_investment_structure(data):
+        return create_fallback_investment_response(risk_level, monthly_investable)
         
-    # Remove markdown code blocks
-    cleaned = response_text.replace('```json', '').replace('```', '')
-    
-    # Extract JSON using regex
-    json_match = re.search(r'\{.*\}', cleaned, re.DOTALL)
-    if json_match:
-        return json_match.group()
-    
-    return cleaned.strip()
+    return data
 
 def validate_investment_structure(data: dict) -> bool:
     """Validate that the response has the expected structure"""
@@ -100,11 +112,14 @@ def validate_investment_structure(data: dict) -> bool:
     # Validate portfolio items
     portfolio_required = ["asset", "allocation%", "amount", "notes"]
     for item in data.get("portfolio", []):
+        if not isinstance(item, dict):
+            return False
         if not all(key in item for key in portfolio_required):
             return False
             
     return True
 
+@marks_fallback
 def create_fallback_investment_response(risk_level: str, monthly_investable: float) -> Dict[str, Any]:
     """Create a fallback response when JSON parsing fails"""
     if risk_level.lower() == "high":
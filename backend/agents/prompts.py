@@ -0,0 +1,12 @@
+import os
+import json
+
+# "full": the original, example-heavy templates; "compact": the same output
+# schema stated once in minified JSON, for fewer prompt tokens
+PROMPT_STYLE = os.getenv("PROMPT_STYLE", "full").strip().lower()
+PROMPT_STYLES = ("full", "compact")
+
+
+def compact_json(value) -> str:
+    """Minified JSON for embedding data or schemas in a compact prompt"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,305 @@
+"""
+Vectorized versions of the rule-based fallback calculations.
+
+The scalar create_fallback_* / calculate_fallback_score functions handle one
+user per call. compute_fallback_columns evaluates all of them for N users
+at once with NumPy, and assemble_fallback_results turns the columns back
+into the exact dicts the scalar functions return.
+
+Results are identical to the scalar functions for float inputs as long as
+every user's expense dict lists its categories in ``categories`` order
+(which expense_matrix_from_dicts guarantees): sums are accumulated in the
+same order as Python's ``sum`` and rounding is done with Python's ``round``.
+"""
+import gc
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+NEEDS_CATEGORIES = ("rent", "utilities", "groceries")
+WANTS_CATEGORIES = ("entertainment", "travel", "dining")
+
+# Same tables as create_fallback_investment_response: (asset, allocation%, share, notes)
+PORTFOLIOS = {
+    "high": (
+        ("Stocks", 60, 0.6, "High growth potential"),
+        ("Mutual Funds", 25, 0.25, "Diversified equity"),
+        ("Bonds", 15, 0.15, "Some stability"),
+    ),
+    "medium": (
+        ("Mutual Funds", 50, 0.5, "Balanced growth"),
+        ("Bonds", 30, 0.3, "Stable income"),
+        ("Fixed Deposits", 20, 0.2, "Safety net"),
+    ),
+    "low": (
+        ("Fixed Deposits", 50, 0.5, "Safe returns"),
+        ("Bonds", 30, 0.3, "Moderate risk"),
+        ("Mutual Funds", 20, 0.2, "Balanced growth"),
+    ),
+}
+
+IMPORTANT_CONSIDERATIONS = [
+    "Diversify across asset classes",
+    "Review portfolio every 6 months",
+    "Adjust based on risk tolerance",
+    "Consider consulting a financial advisor",
+]
+
+
+def expense_matrix_from_dicts(expenses_list: Sequence[Dict[str, float]]) -> Tuple[List[str], np.ndarray]:
+    """
+    Build a category-by-user expense matrix from per-user dicts.
+
+    Categories keep their first-seen order; a category a user does not have
+    is stored as 0.0.
+    """
+    categories: List[str] = []
+    index: Dict[str, int] = {}
+    for expenses in expenses_list:
+        for category in expenses:
+            if category not in index:
+                index[category] = len(categories)
+                categories.append(category)
+
+    matrix = np.zeros((len(categories), len(expenses_list)), dtype=np.float64)
+    for user, expenses in enumerate(expenses_list):
+        for category, amount in expenses.items():
+            matrix[index[category], user] = amount
+    return categories, matrix
+
+
+def _row_sum(matrix: np.ndarray, rows: Sequence[int], n: int) -> np.ndarray:
+    # Accumulate row by row, left to right, exactly like Python's sum()
+    total = np.zeros(n, dtype=np.float64)
+    for row in rows:
+        total += matrix[row]
+    return total
+
+
+def _ratio(numerator: np.ndarray, income: np.ndarray) -> np.ndarray:
+    # (x / income) where income > 0, else 0 -- without division warnings
+    out = np.zeros_like(numerator)
+    np.divide(numerator, income, out=out, where=income > 0)
+    return out
+
+
+def compute_fallback_columns(incomes, debts, risk_levels, categories: Sequence[str], expense_matrix,
+                             monthly_investable=None) -> Dict[str, np.ndarray]:
+    """
+    Compute every numeric fallback field for N users in one pass.
+
+    Args:
+        incomes, debts: arrays of shape (N,)
+        risk_levels: N risk level strings
+        categories: C expense category names
+        expense_matrix: array of shape (C, N)
+        monthly_investable: optional (N,) array; defaults to income minus
+            expenses, as used by /analyze-finance
+
+    Returns:
+        Dict of (N,) or (C, N) arrays, input to assemble_fallback_results.
+    """
+    income = np.asarray(incomes, dtype=np.float64)
+    debt = np.asarray(debts, dtype=np.float64)
+    matrix = np.asarray(expense_matrix, dtype=np.float64).reshape(len(categories), income.shape[0])
+    n = income.shape[0]
+    rows = {category: i for i, category in enumerate(categories)}
+
+    total_expenses = _row_sum(matrix, range(len(categories)), n)
+    actual_savings = income - total_expenses
+    positive_income = income > 0
+
+    # create_fallback_response
+    savings_percentage = _ratio(actual_savings, income) * 100
+    needs_total = _row_sum(matrix, [rows[c] for c in NEEDS_CATEGORIES if c in rows], n)
+    wants_total = _row_sum(matrix, [rows[c] for c in WANTS_CATEGORIES if c in rows], n)
+    needs_percentage = _ratio(needs_total, income) * 100
+    wants_percentage = _ratio(wants_total, income) * 100
+    tip_bracket = np.where(savings_percentage > 50, 2, np.where(savings_percentage >= 20, 1, 0))
+
+    # create_fallback_investment_response
+    investable = actual_savings if monthly_investable is None else np.asarray(monthly_investable, dtype=np.float64)
+    risk = np.char.lower(np.asarray(risk_levels, dtype=str))
+    risk_code = np.where(risk == "high", 2, np.where(risk == "medium", 1, 0))
+    shares = {share for table in PORTFOLIOS.values() for _, _, share, _ in table}
+    investment_amounts = {share: investable * share for share in shares}
+
+    # create_fallback_debt_response
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monthly_repayment = np.where(positive_income, income * 0.2, debt / 12)
+        months_to_clear = np.where(
+            monthly_repayment > 0,
+            np.maximum(1, np.trunc(debt / monthly_repayment)),
+            12,
+        )
+
+    # create_fallback_expenses_response
+    high_spending = matrix > total_expenses * 0.15
+    reduction = matrix * 0.15
+
+    # calculate_fallback_score
+    with np.errstate(divide="ignore", invalid="ignore"):
+        savings_ratio = np.where(positive_income, actual_savings / income, 0)
+        debt_ratio = np.where(positive_income, debt / income, 1)
+        expense_ratio = np.where(positive_income, total_expenses / income, 0)
+    savings_score = np.minimum(50, savings_ratio * 100)
+    debt_score = np.maximum(0, 30 - (debt_ratio * 30))
+    expense_score = np.maximum(0, 20 - (expense_ratio * 10))
+    total_score = savings_score + debt_score + expense_score
+    health_score = np.where(positive_income, np.clip(np.trunc(total_score), 0, 100), 0)
+
+    return {
+        "actual_savings": actual_savings,
+        "savings_percentage": savings_percentage,
+        "needs_percentage": needs_percentage,
+        "wants_percentage": wants_percentage,
+        "tip_bracket": tip_bracket,
+        "investable": investable,
+        "risk_code": risk_code,
+        "investment_amounts": investment_amounts,
+        "debt": debt,
+        "months_to_clear": months_to_clear,
+        "high_spending": high_spending,
+        "reduction": reduction,
+        "health_score": health_score,
+    }
+
+
+def _budget_tips(bracket: int, savings_percentage: float, actual_savings: float) -> List[str]:
+    if bracket == 2:
+        return [
+            f"Excellent! You're saving {savings_percentage:.1f}% of your income",
+            "Consider investing your excess savings for better returns",
+            "You're well ahead of the typical 20% savings goal"
+        ]
+    if bracket == 1:
+        return [
+            f"Good job! You're saving {savings_percentage:.1f}% of your income",
+            "You're meeting or exceeding the recommended savings rate",
+            "Consider automating your savings for consistency"
+        ]
+    return [
+        f"Current savings: {savings_percentage:.1f}% (₹{actual_savings})",
+        "Review your expenses to identify savings opportunities",
+        "Even small increases in savings can make a big difference over time"
+    ]
+
+
+def assemble_fallback_results(columns: Dict[str, np.ndarray], categories: Sequence[str]) -> List[dict]:
+    """
+    Turn computed columns into one result per user.
+
+    Each result has budget_plan, investment_plan, debt_plan,
+    expense_optimizations and financial_health_score, matching the
+    corresponding scalar fallback function output.
+    """
+    # tolist() converts to Python floats once, so formatting matches the scalar code
+    savings = columns["actual_savings"].tolist()
+    savings_pct = columns["savings_percentage"].tolist()
+    needs_pct = columns["needs_percentage"].tolist()
+    wants_pct = columns["wants_percentage"].tolist()
+    brackets = columns["tip_bracket"].tolist()
+    risk_codes = columns["risk_code"].tolist()
+    amounts = {share: values.tolist() for share, values in columns["investment_amounts"].items()}
+    debts = columns["debt"].tolist()
+    months = columns["months_to_clear"].tolist()
+    # Only the flagged (user, category) cells become suggestions; nonzero on
+    # the transposed mask orders them by user, then category
+    flagged_user, flagged_category = np.nonzero(columns["high_spending"].T)
+    reduction = columns["reduction"].T[flagged_user, flagged_category].tolist()
+    flagged_category = flagged_category.tolist()
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(flagged_user, minlength=len(savings))))).tolist()
+    health = columns["health_score"].tolist()
+    tables = (PORTFOLIOS["low"], PORTFOLIOS["medium"], PORTFOLIOS["high"])
+
+    # Millions of small acyclic containers: cyclic GC passes would only
+    # rescan them over and over, so pause collection while building
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _assemble(savings, savings_pct, needs_pct, wants_pct, brackets, risk_codes, amounts,
+                         debts, months, offsets, flagged_category, reduction, health, tables, categories)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _assemble(savings, savings_pct, needs_pct, wants_pct, brackets, risk_codes, amounts,
+              debts, months, offsets, flagged_category, reduction, health, tables, categories) -> List[dict]:
+    actions = [f"Reduce spending on {category}" for category in categories]
+    reasons = [f"{category} is high relative to total expenses" for category in categories]
+    results = []
+    for user in range(len(savings)):
+        budget_plan = {
+            "current_allocation": {
+                "needs_percentage": needs_pct[user],
+                "wants_percentage": wants_pct[user],
+                "savings_percentage": savings_pct[user]
+            },
+            "recommended_allocation_50_30_20": {
+                "needs_percentage": 50.0,
+                "wants_percentage": 30.0,
+                "savings_percentage": 20.0
+            },
+            "recommended_monthly_savings": savings[user],
+            "tips": _budget_tips(brackets[user], savings_pct[user], savings[user])
+        }
+
+        investment_plan = {
+            "portfolio": [
+                {"asset": asset, "allocation%": allocation, "amount": amounts[share][user], "notes": notes}
+                for asset, allocation, share, notes in tables[risk_codes[user]]
+            ],
+            "important_considerations": list(IMPORTANT_CONSIDERATIONS)
+        }
+
+        if debts[user] == 0:
+            debt_plan = {
+                "status": "Debt-free",
+                "recommended_strategy": "Maintain your debt-free status and continue saving",
+                "estimated_months_to_clear": 0
+            }
+        else:
+            debt_plan = {
+                "status": "Has debt",
+                "recommended_strategy": "Pay off high-interest debt first and avoid new debt. Consider allocating 20% of income towards debt repayment.",
+                "estimated_months_to_clear": int(months[user])
+            }
+
+        expense_optimizations = [
+            {
+                "action": actions[flagged_category[k]],
+                "estimated_savings": round(reduction[k], 2),
+                "reason": reasons[flagged_category[k]]
+            }
+            for k in range(offsets[user], offsets[user + 1])
+        ]
+        if not expense_optimizations:
+            expense_optimizations = [
+                {
+                    "action": "Review all subscriptions and recurring payments",
+                    "estimated_savings": 1000.0,
+                    "reason": "Often overlooked expenses can be optimized"
+                },
+                {
+                    "action": "Plan meals and reduce food waste",
+                    "estimated_savings": 800.0,
+                    "reason": "Food expenses often have optimization potential"
+                }
+            ]
+
+        results.append({
+            "budget_plan": budget_plan,
+            "investment_plan": investment_plan,
+            "debt_plan": debt_plan,
+            "expense_optimizations": expense_optimizations,
+            "financial_health_score": int(health[user]),
+        })
+    return results
+
+
+def batch_fallback_analysis(incomes, debts, risk_levels, categories: Sequence[str], expense_matrix,
+                            monthly_investable=None) -> List[dict]:
+    """Rule-based analysis for N users; see compute_fallback_columns for the inputs"""
+    columns = compute_fallback_columns(incomes, debts, risk_levels, categories, expense_matrix, monthly_investable)
+    return assemble_fallback_results(columns, categories)
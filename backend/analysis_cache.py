@@ -0,0 +1,208 @@
+import os
+import math
+import threading
+from typing import Optional
+
+import json_codec
+from llm_cache import LRUCache
+from agents.agent_runner import monthly_investable
+from agents.budget_agent import create_fallback_response, exceptional_savings_tips, parse_budget_data
+from agents.investment_agent import create_fallback_investment_response
+from agents.debt_agent import create_fallback_debt_response
+from agents.expenses_agent import create_fallback_expenses_response
+from agents.health_agent import calculate_fallback_score
+
+# Opt-in: a hit returns advice generated for a slightly different profile
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "0") == "1"
+ANALYSIS_CACHE_INCOME_BUCKET = float(os.getenv("ANALYSIS_CACHE_INCOME_BUCKET", "1000"))
+ANALYSIS_CACHE_DEBT_BUCKET = float(os.getenv("ANALYSIS_CACHE_DEBT_BUCKET", "1000"))
+ANALYSIS_CACHE_EXPENSE_BUCKET = float(os.getenv("ANALYSIS_CACHE_EXPENSE_BUCKET", "500"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1024"))
+ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+
+
+def _bucket(value: Optional[float], width: float) -> float:
+    """Index of the bucket a value falls into (exact value when width <= 0)"""
+    value = float(value or 0)
+    if width <= 0:
+        return value
+    return math.floor(value / width)
+
+
+def _savings_percentage(income: float, expenses: dict) -> float:
+    return (income - sum(expenses.values())) / income * 100 if income > 0 else 0
+
+
+def _by_name(expenses: dict) -> dict:
+    """Expense amounts keyed the way profile_key names the categories"""
+    return {category.strip().lower(): amount for category, amount in expenses.items()}
+
+
+def _fit_expense_optimizations(suggestions: list, old_expenses: dict, expenses: dict) -> bool:
+    """
+    Rescale each suggestion's estimated savings with the category it names.
+
+    A suggestion is tied to the one category its action or reason
+    mentions; False when one with a numeric saving names none or several.
+    """
+    old, new = _by_name(old_expenses), _by_name(expenses)
+    for suggestion in suggestions:
+        if not isinstance(suggestion, dict) or not isinstance(suggestion.get("estimated_savings"), (int, float)):
+            continue
+        text = f"{suggestion.get('action', '')} {suggestion.get('reason', '')}".lower()
+        named = [category for category in old if category and category in text]
+        if len(named) != 1 or not old[named[0]]:
+            return False
+        category = named[0]
+        suggestion["estimated_savings"] = round(suggestion["estimated_savings"] * new.get(category, 0) / old[category], 2)
+    return True
+
+
+class AnalysisCache:
+    """
+    Whole-analysis cache keyed by a quantized financial profile.
+
+    Income, debt, savings goal and each expense category are rounded down
+    into fixed-width buckets, so profiles that differ by a few rupees share
+    one stored result. Fields derived from the numbers are recomputed
+    from the real request on every hit (see refresh_deterministic_fields);
+    a stored analysis that cannot be fitted to the request is a miss.
+    """
+
+    def __init__(self, income_bucket: float = ANALYSIS_CACHE_INCOME_BUCKET,
+                 debt_bucket: float = ANALYSIS_CACHE_DEBT_BUCKET,
+                 expense_bucket: float = ANALYSIS_CACHE_EXPENSE_BUCKET,
+                 max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+                 ttl: float = ANALYSIS_CACHE_TTL_SECONDS):
+        self.income_bucket = income_bucket
+        self.debt_bucket = debt_bucket
+        self.expense_bucket = expense_bucket
+        # Entries are stored as JSON so every hit gets its own copy
+        self._store = LRUCache(max_entries=max_entries, max_bytes=max_entries * 64 * 1024, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def profile_key(self, user_data: dict) -> str:
+        profile = {
+            "income": _bucket(user_data["income"], self.income_bucket),
+            "debt": _bucket(user_data.get("debt"), self.debt_bucket),
+            "savings_goal": _bucket(user_data.get("savings_goal"), self.income_bucket),
+            "risk_level": str(user_data.get("risk_level", "medium")).strip().lower(),
+            "expenses": {
+                category.strip().lower(): _bucket(amount, self.expense_bucket)
+                for category, amount in user_data["expenses"].items()
+            },
+        }
+        return json_codec.dumps_str(profile, sort_keys=True)
+
+    def get(self, user_data: dict) -> Optional[dict]:
+        entry = self._store.get(self.profile_key(user_data))
+        results = None
+        if entry is not None:
+            stored = json_codec.loads(entry)
+            results = refresh_deterministic_fields(stored["results"], stored["profile"], user_data)
+        with self._stats_lock:
+            if results is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return results
+
+    def set(self, user_data: dict, results: dict):
+        # The profile the analysis was made for, to refit it to later requests
+        entry = json_codec.dumps_str({"profile": user_data, "results": results})
+        self._store.set(self.profile_key(user_data), entry)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._store),
+        }
+
+
+def refresh_deterministic_fields(results: dict, stored: dict, user_data: dict) -> Optional[dict]:
+    """
+    Fit an analysis made for ``stored`` to the request's own numbers.
+
+    Sections that came from the rule-based fallbacks are recomputed.
+    Gemini's sections keep their advice, with the numbers derived from the
+    profile redone: recommended savings and tips as parse_budget_data sets
+    them, portfolio amounts rescaled to the request's investable amount,
+    estimated savings rescaled with the category they name, months to
+    clear scaled with the debt, and the health score moved by the
+    difference in the rule-based score. Returns None when the stored
+    advice does not apply (debt-free on one side only, tips written for a
+    savings rate the request does not have, or a saving that cannot be
+    tied to one category).
+    """
+    income, expenses, debt = user_data["income"], user_data["expenses"], user_data.get("debt") or 0
+    old_income, old_expenses, old_debt = stored["income"], stored["expenses"], stored.get("debt") or 0
+    if (debt > 0) != (old_debt > 0):
+        return None
+
+    budget = results.get("budget_plan")
+    if isinstance(budget, dict):
+        if budget == create_fallback_response(old_income, old_expenses):
+            results["budget_plan"] = create_fallback_response(income, expenses)
+        else:
+            # Gemini's own tips were replaced by ones for savers of over half the income
+            replaced = budget.get("tips") == exceptional_savings_tips(old_income, old_expenses)
+            if replaced and _savings_percentage(income, expenses) <= 50:
+                return None
+            results["budget_plan"] = parse_budget_data(budget, income, expenses)
+
+    investment = results.get("investment_plan")
+    if isinstance(investment, dict):
+        old_investable = monthly_investable(old_income, old_expenses, old_debt)
+        investable = monthly_investable(income, expenses, debt)
+        if investment == create_fallback_investment_response(stored["risk_level"], old_investable):
+            results["investment_plan"] = create_fallback_investment_response(user_data["risk_level"], investable)
+        elif old_investable:
+            scale = investable / old_investable
+            for item in investment.get("portfolio", []):
+                if isinstance(item, dict) and isinstance(item.get("amount"), (int, float)):
+                    item["amount"] = item["amount"] * scale
+        elif investable:
+            return None
+
+    suggestions = results.get("expense_optimizations")
+    if isinstance(suggestions, list):
+        if suggestions == create_fallback_expenses_response(old_expenses):
+            results["expense_optimizations"] = create_fallback_expenses_response(expenses)
+        elif not _fit_expense_optimizations(suggestions, old_expenses, expenses):
+            return None
+
+    debt_plan = results.get("debt_plan")
+    if isinstance(debt_plan, dict):
+        if debt_plan == create_fallback_debt_response(old_debt, old_income):
+            results["debt_plan"] = create_fallback_debt_response(debt, income)
+        elif old_debt and isinstance(debt_plan.get("estimated_months_to_clear"), (int, float)):
+            months = debt_plan["estimated_months_to_clear"] * debt / old_debt
+            debt_plan["estimated_months_to_clear"] = max(1, math.ceil(months))
+
+    score = results.get("financial_health_score")
+    if isinstance(score, (int, float)):
+        shift = calculate_fallback_score(income, expenses, debt) - calculate_fallback_score(old_income, old_expenses, old_debt)
+        results["financial_health_score"] = max(0, min(int(score) + shift, 100))
+
+    return results
+
+
+_cache: Optional[AnalysisCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """Process-wide analysis cache, or None unless ANALYSIS_CACHE_ENABLED=1"""
+    global _cache
+    if not ANALYSIS_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache()
+    return _cache
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable
+
+from fastapi.responses import StreamingResponse
+
+import json_codec
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming NDJSON response whose generator may still be reading the body.
+
+    On ASGI servers older than spec 2.4, StreamingResponse listens for a
+    client disconnect by calling receive(), which would swallow the request
+    body chunks the batch generator has not read yet. Here the generator
+    owns receive(); a disconnect surfaces there as ClientDisconnect.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def listen_for_disconnect(self, receive) -> None:
+        # Cancelled by StreamingResponse once the body iterator is exhausted
+        await asyncio.Event().wait()
+
+
+async def iter_list(records: Iterable[Any]) -> AsyncIterator[Any]:
+    """Expose an in-memory list through the same interface as a stream"""
+    for record in records:
+        yield record
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Split a byte stream into NDJSON lines without buffering the whole body.
+
+    Lines are yielded raw, so a malformed record can be reported against
+    its own index instead of failing the batch.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def stream_completed(records: AsyncIterable[Any],
+                           worker: Callable[[int, Any], Awaitable[dict]],
+                           concurrency: int) -> AsyncIterator[bytes]:
+    """
+    Run ``worker(index, record)`` over a stream with bounded concurrency.
+
+    Yields one NDJSON line per record in completion order. At most
+    ``concurrency`` records are read ahead of the results, so memory use
+    does not grow with the size of the batch.
+    """
+    pending = set()
+
+    def drain(tasks):
+        return [json_codec.dumps(task.result()) + b"\n" for task in tasks]
+
+    try:
+        index = 0
+        async for record in records:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for line in drain(done):
+                    yield line
+            pending.add(asyncio.ensure_future(worker(index, record)))
+            index += 1
+
+            done = {task for task in pending if task.done()}
+            pending -= done
+            for line in drain(done):
+                yield line
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for line in drain(done):
+                yield line
+    finally:
+        # Client went away mid-batch: stop the work nobody will read
+        for task in pending:
+            task.cancel()
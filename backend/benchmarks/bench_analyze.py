@@ -0,0 +1,204 @@
+"""
+End-to-end load benchmark of /analyze-finance and the Flask /analyze route.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_analyze --concurrency 1 4 16 --requests 100
+    python -m benchmarks.bench_analyze --target flask --latency exp:1.0 --error-rate 0.05 --malformed-rate 0.05
+
+Starts the backend on the fake Gemini model (benchmarks/fake_gemini.py)
+and, for --target flask, the Flask frontend in front of it; both run as
+real HTTP servers in subprocesses. Each concurrency level sends distinct
+profiles, so neither coalescing nor the caches hide the work, and
+reports throughput, p50/p95/p99 latency and fallback rates (read from
+the services' /metrics). Prints one JSON object per level after one
+describing the run; redirect to a file to compare commits.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.fake_gemini import add_model_arguments
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRONTEND_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "flask-frontend")
+CATEGORIES = ["rent", "utilities", "groceries", "entertainment", "travel", "dining", "transport"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = requests.get(url, timeout=1)
+            if response.ok and response.json().get("ready", True):
+                return
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} did not become ready in {timeout:.0f}s")
+
+
+def start_backend(args, port: int) -> subprocess.Popen:
+    env = dict(os.environ, LLM_CACHE_ENABLED="1" if args.cache else "0", GEMINI_API_KEY="fake")
+    command = [sys.executable, "-m", "benchmarks.fake_gemini", "--port", str(port), "--latency", args.latency,
+               "--error-rate", str(args.error_rate), "--malformed-rate", str(args.malformed_rate),
+               "--seed", str(args.seed)]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_frontend(port: int, backend_url: str) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), BACKEND_URL=backend_url)
+    return subprocess.Popen([sys.executable, "app.py"], cwd=FRONTEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def scrape(url: str) -> dict:
+    """{(metric, labels...): value} of every counter sample at ``url``"""
+    samples = {}
+    for family in text_string_to_metric_families(requests.get(url, timeout=5).text):
+        if family.type != "counter":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_total"):
+                samples[(sample.name,) + tuple(sorted(sample.labels.items()))] = sample.value
+    return samples
+
+
+def counter_delta(before: dict, after: dict, name: str, **labels) -> float:
+    """Increase of every ``name`` sample matching ``labels`` between two scrapes"""
+    total = 0.0
+    for key, value in after.items():
+        if key[0] != name or any((k, v) not in key[1:] for k, v in labels.items()):
+            continue
+        total += value - before.get(key, 0.0)
+    return total
+
+
+def make_profile(rng: random.Random) -> dict:
+    income = round(rng.uniform(20000, 200000), 2)
+    expenses = {c: round(rng.uniform(500, income / len(CATEGORIES)), 2) for c in rng.sample(CATEGORIES, 4)}
+    return {"income": income, "expenses": expenses, "risk_level": rng.choice(["low", "medium", "high"]),
+            "debt": rng.choice([0, round(rng.uniform(10000, 500000), 2)])}
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+def run_level(url: str, profiles, concurrency: int):
+    """Send every profile with ``concurrency`` clients; (latencies, failures, seconds)"""
+    local = threading.local()
+
+    def send(profile):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = session.post(url, json=profile, timeout=60).status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(send, profiles))
+    elapsed = time.perf_counter() - start
+    return [latency for latency, ok in outcomes if ok], sum(1 for _, ok in outcomes if not ok), elapsed
+
+
+def report(**fields):
+    print(json.dumps(fields), flush=True)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=["fastapi", "flask"], default="fastapi")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--cache", action="store_true", help="keep the LLM response cache enabled")
+    add_model_arguments(parser)
+    args = parser.parse_args()
+
+    backend_url = f"http://127.0.0.1:{free_port()}"
+    processes = [start_backend(args, int(backend_url.rsplit(":", 1)[1]))]
+    try:
+        wait_until_ready(f"{backend_url}/health")
+        if args.target == "flask":
+            frontend_url = f"http://127.0.0.1:{free_port()}"
+            processes.append(start_frontend(int(frontend_url.rsplit(":", 1)[1]), backend_url))
+            wait_until_ready(f"{frontend_url}/health")
+            url = f"{frontend_url}/analyze"
+        else:
+            url = f"{backend_url}/analyze-finance"
+
+        rng = random.Random(args.seed)
+        report(run="bench_analyze", commit=git_commit(), target=args.target, latency=args.latency,
+               error_rate=args.error_rate, malformed_rate=args.malformed_rate, requests=args.requests,
+               cache=args.cache)
+        run_level(url, [make_profile(rng) for _ in range(args.warmup)], 1)
+
+        for concurrency in args.concurrency:
+            profiles = [make_profile(rng) for _ in range(args.requests)]
+            before = scrape(f"{backend_url}/metrics")
+            frontend_before = scrape(f"{frontend_url}/metrics") if args.target == "flask" else {}
+            latencies, failures, elapsed = run_level(url, profiles, concurrency)
+            after = scrape(f"{backend_url}/metrics")
+            frontend_after = scrape(f"{frontend_url}/metrics") if args.target == "flask" else {}
+
+            agent_calls = counter_delta(before, after, "agent_calls_total")
+            agent_fallbacks = agent_calls - counter_delta(before, after, "agent_calls_total", outcome="success")
+            latencies.sort()
+            fields = dict(
+                target=args.target, concurrency=concurrency, requests=len(profiles), failures=failures,
+                throughput_rps=round(len(latencies) / elapsed, 2),
+                p50_ms=round(percentile(latencies, 50) * 1000, 1),
+                p95_ms=round(percentile(latencies, 95) * 1000, 1),
+                p99_ms=round(percentile(latencies, 99) * 1000, 1),
+                max_ms=round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                agent_fallback_rate=round(agent_fallbacks / agent_calls, 4) if agent_calls else 0.0,
+                gemini_calls=int(counter_delta(before, after, "gemini_calls_total")),
+                gemini_errors=int(counter_delta(before, after, "gemini_calls_total", outcome="error")),
+                gemini_malformed=int(counter_delta(before, after, "gemini_calls_total", outcome="malformed")),
+            )
+            if args.target == "flask":
+                fields["frontend_fallback_rate"] = round(
+                    counter_delta(frontend_before, frontend_after, "frontend_fallbacks_total") / len(profiles), 4
+                )
+            report(**fields)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
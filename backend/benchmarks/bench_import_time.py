@@ -0,0 +1,82 @@
+"""
+Cold-start import time of the backend app, checked against a budget.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_import_time --budget-ms 1000
+
+Each run imports ``main`` in a fresh interpreter with ``-X importtime``.
+Prints one JSON object per run, the slowest modules imported directly by
+the app in the fastest run, and a summary; exits non-zero when the budget
+is exceeded.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str):
+    """(depth, module, cumulative microseconds) for every import"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented two spaces per level under their parent
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        imports.append((depth, name.strip(), int(cumulative)))
+    return imports
+
+
+def measure(module: str):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    wall_seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    return wall_seconds, parse_importtime(proc.stderr)
+
+
+def report(**fields):
+    print(json.dumps(fields))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    best = None
+    for run in range(args.runs):
+        wall_seconds, imports = measure(args.module)
+        import_ms = sum(cumulative for depth, _, cumulative in imports if depth == 0) / 1000
+        report(run=run, module=args.module, import_ms=round(import_ms, 1),
+               process_wall_ms=round(wall_seconds * 1000, 1))
+        if best is None or import_ms < best[0]:
+            best = (import_ms, imports)
+
+    import_ms, imports = best
+    direct = [(name, cumulative) for depth, name, cumulative in imports if depth == 1]
+    for name, cumulative in sorted(direct, key=lambda item: item[1], reverse=True)[:args.top]:
+        report(direct_import=name, cumulative_ms=round(cumulative / 1000, 1))
+
+    within_budget = import_ms <= args.budget_ms
+    report(summary=args.module, best_import_ms=round(import_ms, 1), budget_ms=args.budget_ms,
+           within_budget=within_budget)
+    if not within_budget:
+        raise SystemExit(f"import of {args.module} took {import_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Per-request logging cost, before and after the move to queued JSON logging.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_logging --requests 2000
+
+"before" replays the log lines one analysis used to produce in both
+services: the Flask prints of the payload, the backend response and the
+results, and the backend's f-string DEBUG CALCULATIONS block through a
+synchronous handler. "after" issues the lines that replaced them through
+logging_setup (a queue and a background JSON writer), at INFO, at DEBUG
+with sampling, and at DEBUG with every line kept. Everything is written
+to /dev/null, so the numbers are the cost paid on the request thread
+(caller_us) plus the time the writer needed to drain its queue.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import time
+
+from benchmarks.fake_gemini import ANSWERS
+from logging_setup import SAMPLED, setup_logging
+
+FORM = {"income": 85000.0, "expenses": {"rent": 22000.0, "groceries": 8000.0, "utilities": 3000.0,
+                                          "dining": 4500.0, "travel": 6000.0, "entertainment": 2500.0},
+        "risk_level": "medium", "debt": 150000.0}
+
+
+def legacy_request(log: logging.Logger, results: dict) -> None:
+    """The prints and f-string log lines of one analysis before the change"""
+    data = FORM
+    income, expenses, debt = data["income"], data["expenses"], data["debt"]
+    total_expenses = sum(expenses.values())
+    actual_savings = income - total_expenses
+    print(f"📨 Frontend received data: {data}")
+    print(f"💰 Parsed - Income: {income}, Expenses: {expenses}, Risk: {data['risk_level']}, Debt: {debt}")
+    print("📤 Sending to backend http://localhost:8000/analyze-finance")
+    print(f"📦 Payload: {data}")
+    log.info(f"🔍 DEBUG CALCULATIONS:")
+    log.info(f"🔍 Income: ₹{income}")
+    log.info(f"🔍 Expenses: ₹{total_expenses}")
+    log.info(f"🔍 Actual Savings: ₹{actual_savings}")
+    log.info(f"🔍 20% Rule: ₹{income * 0.2}")
+    log.info(f"🔍 Should Recommend: ₹{max(actual_savings, income * 0.2)}")
+    log.info(f"🚀 Processing request with CrewAI Agentic System")
+    log.info(f"   Income: {income}, Expenses: {expenses}, Debt: {debt}")
+    log.info(f"🎯 FINAL - Recommended Savings: ₹{results['budget_plan']['recommended_monthly_savings']}")
+    log.info("✅ CrewAI Agentic Analysis Completed!")
+    print("📥 Backend response status: 200")
+    print("✅ Backend analysis successful!")
+    print(f"📊 Backend response: {results}")
+    print(f"🔍 TRANSFORM DEBUG - Income: ₹{income}, Expenses: ₹{total_expenses}, Savings: ₹{actual_savings}")
+    print(f"✅ TRANSFORM COMPLETE - Final savings: ₹{results['budget_plan']['recommended_monthly_savings']}")
+    print(f"🎯 Sending results to frontend: {results}")
+
+
+def current_request(log: logging.Logger, results: dict, started: float) -> None:
+    """The log lines of one analysis after the change"""
+    log.debug("Frontend received data: %s", FORM, extra=SAMPLED)
+    log.debug("Analysis request: %s", FORM, extra=SAMPLED)
+    log.debug("CrewAI analysis result: %s", results, extra=SAMPLED)
+    log.info("%d agents finished in %.2fs", 5, time.perf_counter() - started)
+    log.debug("Backend response: %s", results, extra=SAMPLED)
+
+
+def run(requests: int, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests
+
+
+def wait_for_drain(listener) -> float:
+    start = time.perf_counter()
+    while not listener.queue.empty():
+        time.sleep(0.0005)
+    return time.perf_counter() - start
+
+
+def report(**fields):
+    print(json.dumps(fields), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    results = dict(ANSWERS)
+    sink = open(os.devnull, "w", encoding="utf-8")
+
+    # Before: print() to stdout and a synchronous handler, as basicConfig set up
+    legacy = logging.getLogger("bench.legacy")
+    legacy.propagate = False
+    legacy.setLevel(logging.INFO)
+    legacy.addHandler(logging.StreamHandler(sink))
+    with contextlib.redirect_stdout(sink):
+        caller = run(args.requests, lambda: legacy_request(legacy, results))
+    report(variant="before", level="INFO", caller_us=round(caller * 1e6, 2), drain_ms=0.0)
+
+    # After: queue + background JSON writer
+    listener = setup_logging(level="INFO", fmt="json", sample_rate=args.sample_rate, stream=sink)
+    root = logging.getLogger()
+    sample_filter = root.handlers[0].filters[0]
+    log = logging.getLogger("bench.current")
+    for level, rate in (("INFO", args.sample_rate), ("DEBUG", args.sample_rate), ("DEBUG", 1.0)):
+        root.setLevel(level)
+        sample_filter.rate = rate
+        started = time.perf_counter()
+        caller = run(args.requests, lambda: current_request(log, results, started))
+        drain = wait_for_drain(listener)
+        report(variant="after", level=level, sample_rate=rate if level == "DEBUG" else None,
+               caller_us=round(caller * 1e6, 2), drain_ms=round(drain * 1000, 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Prompt size of the "full" and "compact" prompt styles, per agent.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_prompt_tokens
+    python -m benchmarks.bench_prompt_tokens --count-tokens --live 3
+
+By default prompts are only built, and tokens estimated at ~4 characters
+each, so no API key is needed. --count-tokens asks Gemini's token counter
+for exact prompt sizes; --live N sends every prompt N times per style and
+reports latency and billed tokens (leave the LLM cache disabled so each
+call reaches the API). Prints one JSON object per measurement and a
+summary of the savings per style.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from agents.budget_agent import build_budget_prompt
+from agents.investment_agent import build_investment_prompt
+from agents.debt_agent import build_debt_prompt
+from agents.expenses_agent import build_expenses_prompt
+from agents.health_agent import build_health_prompt
+from agents.combined_agent import build_combined_prompt
+from agents.prompts import PROMPT_STYLES
+
+PROFILES = [
+    {"income": 60000, "expenses": {"rent": 15000, "food": 8000, "travel": 3000}, "risk_level": "medium",
+     "debt": 0, "savings_goal": None},
+    {"income": 45000, "expenses": {"rent": 18000, "groceries": 7000, "utilities": 2500, "entertainment": 4000,
+                                   "dining": 3500, "transport": 3000}, "risk_level": "low",
+     "debt": 120000, "savings_goal": 5000},
+    {"income": 150000, "expenses": {"rent": 40000, "groceries": 12000, "travel": 15000, "shopping": 10000},
+     "risk_level": "high", "debt": 500000, "savings_goal": 30000},
+]
+
+
+def build_prompts(profile: dict, style: str):
+    """(agent, prompt, JSON opening) for every Gemini call of one analysis"""
+    income, expenses, debt = profile["income"], profile["expenses"], profile["debt"]
+    savings_goal, risk_level = profile["savings_goal"], profile["risk_level"]
+    monthly_investable = income - sum(expenses.values())
+    return [
+        ("budget_plan", build_budget_prompt(income, expenses, savings_goal, style), "{"),
+        ("investment_plan", build_investment_prompt(risk_level, monthly_investable, style), "{"),
+        ("debt_plan", build_debt_prompt(debt, income, style), "{"),
+        ("expense_optimizations", build_expenses_prompt(expenses, style), "["),
+        ("financial_health_score", build_health_prompt(income, expenses, debt, savings_goal, style), "{"),
+        ("combined", build_combined_prompt(income, expenses, risk_level, debt, savings_goal,
+                                           monthly_investable, style), "{"),
+    ]
+
+
+def count_tokens(prompt: str) -> int:
+    from gemini_client import get_model
+    return get_model().count_tokens(prompt).total_tokens
+
+
+def run_live(prompt: str, opening: str, runs: int):
+    """Latency and billed tokens of ``runs`` real calls"""
+    from gemini_client import gemini_generate_json
+    from token_usage import usage_scope
+
+    latencies, failures = [], 0
+    with usage_scope() as usage:
+        for _ in range(runs):
+            start = time.perf_counter()
+            try:
+                gemini_generate_json(prompt, opening)
+            except Exception as e:
+                failures += 1
+                print(f"call failed: {e}", file=sys.stderr)
+                continue
+            latencies.append(time.perf_counter() - start)
+    summary = usage.summary()
+    calls = max(1, summary["calls"])
+    return {
+        "median_latency_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "prompt_tokens_per_call": round(summary["prompt_tokens"] / calls, 1),
+        "completion_tokens_per_call": round(summary["completion_tokens"] / calls, 1),
+        "failures": failures,
+    }
+
+
+def report(**fields):
+    print(json.dumps(fields))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count-tokens", action="store_true", help="count prompt tokens with the Gemini API")
+    parser.add_argument("--live", type=int, default=0, metavar="N", help="send every prompt N times per style")
+    args = parser.parse_args()
+
+    totals = {style: {"chars": 0, "estimated_tokens": 0, "tokens": 0} for style in PROMPT_STYLES}
+    for index, profile in enumerate(PROFILES):
+        for style in PROMPT_STYLES:
+            for agent, prompt, opening in build_prompts(profile, style):
+                fields = {"profile": index, "style": style, "agent": agent,
+                          "chars": len(prompt), "estimated_tokens": len(prompt) // 4}
+                if args.count_tokens:
+                    fields["tokens"] = count_tokens(prompt)
+                    totals[style]["tokens"] += fields["tokens"]
+                if args.live:
+                    fields.update(run_live(prompt, opening, args.live))
+                totals[style]["chars"] += fields["chars"]
+                totals[style]["estimated_tokens"] += fields["estimated_tokens"]
+                report(**fields)
+
+    baseline = totals["full"]
+    for style, total in totals.items():
+        key = "tokens" if args.count_tokens else "estimated_tokens"
+        report(summary=style, chars=total["chars"], **{key: total[key]},
+               saved_percent=round(100 * (1 - total[key] / baseline[key]), 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Agent pipeline cost without network time, on recorded Gemini responses.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_replay --record          # once, needs GEMINI_API_KEY
+    python -m benchmarks.bench_replay --record --fake   # or record the local stand-in
+    python -m benchmarks.bench_replay --repeat 200 --profile 25
+
+--record runs every agent (and the combined prompt) on the profiles of
+bench_prompt_tokens and saves the answers to a cassette directory (see
+cassette.py). Without it the same calls are replayed from the cassette:
+each agent's full path through gemini_client, JSON extraction and
+validation, and separately the parsing the agents used before JSON
+extraction (a greedy regex, json loads and validate_*_structure) on the
+recorded text, kept here as the baseline. Prints one JSON object per
+agent with the median cost per call; --profile N also prints the top N
+functions by cumulative time to stderr.
+"""
+import argparse
+import cProfile
+import json
+import pstats
+import re
+import statistics
+import sys
+import time
+
+import json_codec
+from agents.budget_agent import analyze_budget, parse_budget_data
+from agents.investment_agent import suggest_investments, parse_investment_data
+from agents.debt_agent import plan_debt_repayment, parse_debt_data
+from agents.expenses_agent import optimize_expenses, parse_expenses_data
+from agents.health_agent import financial_health_score, parse_health_data
+from agents.combined_agent import build_combined_prompt, parse_combined_data
+from agents.prompts import PROMPT_STYLE
+from benchmarks.bench_prompt_tokens import PROFILES, build_prompts
+from cassette import GEMINI_CASSETTE_DIR, Cassette, set_cassette
+from gemini_client import MODEL_NAME, gemini_generate_json
+from metrics import fallback_watch
+from token_usage import agent_scope
+
+
+def _legacy_loads(response_text: str, pattern: str = r"\{.*\}"):
+    """The agents' former clean_json_response and json loads; None when the text does not parse"""
+    cleaned = (response_text or "").replace("```json", "").replace("```", "")
+    match = re.search(pattern, cleaned, re.DOTALL)
+    try:
+        return json_codec.loads(match.group() if match else cleaned.strip())
+    except json_codec.JSONDecodeError:
+        return None
+
+
+def agent_calls(profile: dict):
+    """{agent: (run the agent, parse a raw answer text)} for one profile"""
+    income, expenses, debt = profile["income"], profile["expenses"], profile["debt"]
+    savings_goal, risk_level = profile["savings_goal"], profile["risk_level"]
+    monthly_investable = income - sum(expenses.values())
+    combined_prompt = build_combined_prompt(income, expenses, risk_level, debt, savings_goal, monthly_investable)
+    combined_args = (income, expenses, risk_level, debt, monthly_investable)
+    # The parse_*_data functions turn what does not parse (None) into the fallback
+    return {
+        "budget_plan": (lambda: analyze_budget(income, expenses, savings_goal),
+                        lambda text: parse_budget_data(_legacy_loads(text), income, expenses)),
+        "investment_plan": (lambda: suggest_investments(risk_level, monthly_investable),
+                            lambda text: parse_investment_data(_legacy_loads(text), risk_level, monthly_investable)),
+        "debt_plan": (lambda: plan_debt_repayment(debt, income),
+                      lambda text: parse_debt_data(_legacy_loads(text), debt, income)),
+        "expense_optimizations": (lambda: optimize_expenses(expenses),
+                                  lambda text: parse_expenses_data(_legacy_loads(text, r"\[.*\]"), expenses)),
+        "financial_health_score": (lambda: financial_health_score(income, expenses, debt, savings_goal),
+                                   lambda text: parse_health_data(_legacy_loads(text), income, expenses, debt)),
+        "combined": (lambda: parse_combined_data(gemini_generate_json(combined_prompt, "{"), *combined_args),
+                     lambda text: parse_combined_data(_legacy_loads(text), *combined_args)),
+    }
+
+
+def record(directory: str, fake: bool) -> None:
+    cassette = set_cassette(Cassette("record", directory))
+    if fake:
+        from benchmarks.fake_gemini import FakeGeminiModel, install
+        install(FakeGeminiModel("const:0"))
+    for profile in PROFILES:
+        for agent, (run, _) in agent_calls(profile).items():
+            with agent_scope(agent):
+                run()
+    report(recorded=cassette.recorded, directory=directory, prompt_style=PROMPT_STYLE)
+
+
+def replay(directory: str, repeat: int, latency_scale: float, profile_top: int) -> None:
+    cassette = set_cassette(Cassette("replay", directory, latency_scale))
+    texts = {}
+    for index, profile in enumerate(PROFILES):
+        for agent, prompt, _ in build_prompts(profile, PROMPT_STYLE):
+            try:
+                texts[index, agent] = cassette.lookup(MODEL_NAME, prompt)["text"]
+            except LookupError:
+                raise SystemExit(f"{agent} of profile {index} is not recorded in {directory}; run with --record")
+
+    profiler = cProfile.Profile() if profile_top else None
+    timings = {}
+    if profiler:
+        profiler.enable()
+    for _ in range(repeat):
+        for index, profile in enumerate(PROFILES):
+            for agent, (run, parse) in agent_calls(profile).items():
+                timing = timings.setdefault(agent, {"pipeline": [], "parse": [], "fallbacks": 0})
+                start = time.perf_counter()
+                with agent_scope(agent), fallback_watch() as used:
+                    run()
+                timing["pipeline"].append(time.perf_counter() - start)
+                timing["fallbacks"] += bool(used)
+                start = time.perf_counter()
+                parse(texts[index, agent])
+                timing["parse"].append(time.perf_counter() - start)
+    if profiler:
+        profiler.disable()
+
+    for agent, timing in timings.items():
+        report(agent=agent, calls=len(timing["pipeline"]), fallbacks=timing["fallbacks"],
+               pipeline_us=round(statistics.median(timing["pipeline"]) * 1e6, 1),
+               parse_us=round(statistics.median(timing["parse"]) * 1e6, 1))
+    if profiler:
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(profile_top)
+
+
+def report(**fields):
+    print(json.dumps(fields), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dir", default=GEMINI_CASSETTE_DIR, help="cassette directory")
+    parser.add_argument("--record", action="store_true", help="record the cassette instead of replaying it")
+    parser.add_argument("--fake", action="store_true", help="record the local Gemini stand-in (no API key)")
+    parser.add_argument("--repeat", type=int, default=100, help="replays of every call")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="replay with this share of the recorded latency")
+    parser.add_argument("--profile", type=int, default=0, metavar="N", help="print the top N functions")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.dir, args.fake)
+    else:
+        replay(args.dir, args.repeat, args.latency_scale, args.profile)
+
+
+if __name__ == "__main__":
+    main()
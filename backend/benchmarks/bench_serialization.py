@@ -0,0 +1,130 @@
+"""
+JSON serialization cost per analysis response and per batch, json vs orjson.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serialization --batch-size 100
+
+Times, on a full analysis response (the stand-in Gemini answers plus a
+token_usage summary for five agents):
+
+- response: FastAPI's path for an untyped route (jsonable_encoder, then
+  json.dumps in JSONResponse) against its path for a route with the
+  FinanceOutput response model (validation and dump_json in
+  pydantic-core), and json.dumps against json_codec.dumps for bodies the
+  backend encodes itself;
+- batch: the NDJSON lines of a POST /analyze-finance/batch answer;
+- parse: the agents' answers from Gemini text, json.loads against
+  json_codec.loads;
+- flask: jsonify() of the frontend's answer with Flask's default
+  provider against ORJSONProvider.
+
+Prints one JSON object per measurement with the median cost in
+microseconds.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+import json_codec
+from benchmarks.fake_gemini import ANSWERS
+from frontend_schema import frontend_response
+from models import FinanceOutput
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRONTEND_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "flask-frontend")
+AGENTS = ("budget_plan", "investment_plan", "debt_plan", "expense_optimizations", "financial_health_score")
+
+
+def analysis_response() -> dict:
+    """An /analyze-finance body as the backend returns it"""
+    usage = {"prompt_tokens": 410, "completion_tokens": 230, "calls": 1, "cached_calls": 0}
+    return {
+        **{section: ANSWERS[section] for section in AGENTS[:-1]},
+        "financial_health_score": ANSWERS["financial_health_score"]["score"],
+        "crewai_used": True,
+        "token_usage": {
+            "prompt_tokens": 2050, "completion_tokens": 1150, "total_tokens": 3200, "calls": 5,
+            "cached_calls": 0, "budget": None, "budget_rejections": 0,
+            "agents": {agent: dict(usage) for agent in AGENTS},
+        },
+    }
+
+
+def median_us(fn, number: int, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - start) / number)
+    return round(statistics.median(runs) * 1e6, 2)
+
+
+def report(**fields):
+    print(json.dumps(fields), flush=True)
+
+
+def compare(name: str, before, after, number: int, repeat: int, **fields):
+    before_us = median_us(before, number, repeat)
+    after_us = median_us(after, number, repeat)
+    report(measurement=name, before_us=before_us, after_us=after_us,
+           speedup=round(before_us / after_us, 2) if after_us else None, **fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    n, r = args.number, args.repeat
+
+    result = analysis_response()
+    adapter = TypeAdapter(FinanceOutput)
+
+    def untyped_route():
+        return JSONResponse(jsonable_encoder(result)).body
+
+    def typed_route():
+        return adapter.dump_json(adapter.validate_python(result), by_alias=True, exclude_unset=True)
+
+    assert json.loads(untyped_route()) == json.loads(typed_route())
+    compare("response_fastapi", untyped_route, typed_route, n, r, bytes=len(typed_route()))
+    compare("response_body", lambda: json.dumps(result, ensure_ascii=False).encode("utf-8"),
+            lambda: json_codec.dumps(result), n, r)
+
+    frontend = frontend_response(result, 85000.0, {"rent": 22000.0, "groceries": 8000.0}, 150000.0)
+    compare("frontend_view_body", lambda: json.dumps(frontend, ensure_ascii=False).encode("utf-8"),
+            lambda: json_codec.dumps(frontend), n, r)
+
+    records = [{"index": i, "result": result} for i in range(args.batch_size)]
+    compare("batch_ndjson",
+            lambda: b"".join(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records),
+            lambda: b"".join(json_codec.dumps(record) + b"\n" for record in records),
+            max(1, n // args.batch_size), r, records=args.batch_size)
+
+    texts = [json.dumps(ANSWERS[agent], indent=2) for agent in AGENTS]
+    compare("parse_agent_answers", lambda: [json.loads(text) for text in texts],
+            lambda: [json_codec.loads(text) for text in texts], n, r, answers=len(texts))
+
+    sys.path.insert(0, FRONTEND_DIR)
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from json_provider import ORJSONProvider
+    app = Flask("bench")
+    default, fast = DefaultJSONProvider(app), ORJSONProvider(app)
+    with app.app_context():
+        assert json.loads(default.response(frontend).get_data()) == json.loads(fast.response(frontend).get_data())
+        compare("flask_jsonify", lambda: default.response(frontend), lambda: fast.response(frontend), n, r)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Throughput of the vectorized fallback engine against the scalar functions.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_vectorized --sizes 100000 1000000
+
+Prints one JSON object per measurement. The scalar path is timed on a
+sample and the vectorized results are checked against it for equality.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from agents.budget_agent import create_fallback_response
+from agents.investment_agent import create_fallback_investment_response
+from agents.debt_agent import create_fallback_debt_response
+from agents.expenses_agent import create_fallback_expenses_response
+from agents.health_agent import calculate_fallback_score
+from agents.vectorized import assemble_fallback_results, compute_fallback_columns
+
+CATEGORIES = ["rent", "utilities", "groceries", "entertainment", "travel", "dining", "transport", "healthcare"]
+RISK_LEVELS = np.array(["High", "Medium", "Low", "medium", "low"])
+
+
+def generate_profiles(n: int, rng: np.random.Generator):
+    incomes = np.round(rng.uniform(-1000, 200000, n), 2)
+    debts = np.where(rng.random(n) < 0.5, 0.0, np.round(rng.uniform(0, 500000, n), 2))
+    risk_levels = RISK_LEVELS[rng.integers(0, len(RISK_LEVELS), n)]
+    matrix = np.round(rng.uniform(0, 30000, (len(CATEGORIES), n)), 2)
+    matrix[rng.random(matrix.shape) < 0.3] = 0.0
+    return incomes, debts, risk_levels, matrix
+
+
+def scalar_analysis(income: float, debt: float, risk_level: str, expenses: dict) -> dict:
+    actual_savings = income - sum(expenses.values())
+    return {
+        "budget_plan": create_fallback_response(income, expenses),
+        "investment_plan": create_fallback_investment_response(risk_level, actual_savings),
+        "debt_plan": create_fallback_debt_response(debt, income),
+        "expense_optimizations": create_fallback_expenses_response(expenses),
+        "financial_health_score": calculate_fallback_score(income, expenses, debt),
+    }
+
+
+def run_scalar(incomes, debts, risk_levels, matrix):
+    incomes, debts, risk_levels = incomes.tolist(), debts.tolist(), risk_levels.tolist()
+    columns = matrix.T.tolist()
+    results = []
+    for user in range(len(incomes)):
+        # Absent categories are dropped, as a real request would send them
+        expenses = {c: amount for c, amount in zip(CATEGORIES, columns[user]) if amount}
+        results.append(scalar_analysis(incomes[user], debts[user], risk_levels[user], expenses))
+    return results
+
+
+def report(**fields):
+    print(json.dumps(fields))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--scalar-sample", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    sample = generate_profiles(args.scalar_sample, rng)
+    start = time.perf_counter()
+    expected = run_scalar(*sample)
+    scalar_seconds = time.perf_counter() - start
+    report(engine="scalar", profiles=args.scalar_sample, seconds=round(scalar_seconds, 4),
+           profiles_per_second=round(args.scalar_sample / scalar_seconds))
+
+    actual = assemble_fallback_results(compute_fallback_columns(*sample[:3], CATEGORIES, sample[3]), CATEGORIES)
+    mismatches = sum(1 for a, b in zip(actual, expected) if a != b)
+    report(check="identical_to_scalar", profiles=args.scalar_sample, mismatches=mismatches)
+    if mismatches:
+        raise SystemExit("vectorized results differ from the scalar functions")
+
+    for n in args.sizes:
+        incomes, debts, risk_levels, matrix = generate_profiles(n, rng)
+
+        start = time.perf_counter()
+        columns = compute_fallback_columns(incomes, debts, risk_levels, CATEGORIES, matrix)
+        compute_seconds = time.perf_counter() - start
+        report(engine="vectorized_columns", profiles=n, seconds=round(compute_seconds, 4),
+               profiles_per_second=round(n / compute_seconds))
+
+        start = time.perf_counter()
+        assemble_fallback_results(columns, CATEGORIES)
+        total_seconds = compute_seconds + time.perf_counter() - start
+        report(engine="vectorized_dicts", profiles=n, seconds=round(total_seconds, 4),
+               profiles_per_second=round(n / total_seconds),
+               speedup_vs_scalar=round((n / total_seconds) / (args.scalar_sample / scalar_seconds), 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Local stand-in for the Gemini model, for benchmarks without network or key.
+
+FakeGeminiModel answers every agent prompt (full, compact or combined)
+with valid JSON of the expected shape, after a latency drawn from a
+configurable distribution. A share of calls fails or returns malformed
+(truncated) JSON. It replaces the model handle behind gemini_client, so
+caching, the outbound limiter, the circuit breaker, streaming and JSON
+parsing all run as in production.
+
+Serve the backend on the fake:
+
+    python -m benchmarks.fake_gemini --port 8001 --latency lognormal:0.8,0.5 --error-rate 0.02
+
+Latency specs: ``const:S``, ``uniform:A,B``, ``exp:MEAN`` and
+``lognormal:MEDIAN,SIGMA`` (seconds).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+ANSWERS = {
+    "budget_plan": {
+        "current_allocation": {"needs_percentage": 45.0, "wants_percentage": 15.0, "savings_percentage": 40.0},
+        "recommended_allocation_50_30_20": {"needs_percentage": 50.0, "wants_percentage": 30.0,
+                                            "savings_percentage": 20.0},
+        "recommended_monthly_savings": 0,
+        "tips": ["Automate your savings", "Review subscriptions monthly", "Keep an emergency fund"],
+    },
+    "investment_plan": {
+        "portfolio": [
+            {"asset": "Mutual Funds", "allocation%": 50, "amount": 5000.0, "notes": "Balanced growth"},
+            {"asset": "Fixed Deposits", "allocation%": 30, "amount": 3000.0, "notes": "Capital safety"},
+            {"asset": "Gold", "allocation%": 20, "amount": 2000.0, "notes": "Inflation hedge"},
+        ],
+        "important_considerations": ["Diversify across asset classes", "Review every 6 months"],
+    },
+    "debt_plan": {"status": "Has debt", "recommended_strategy": "Pay the highest interest first",
+                  "estimated_months_to_clear": 12},
+    "expense_optimizations": [
+        {"action": "Reduce dining out", "estimated_savings": 1500.0, "reason": "Largest discretionary spend"},
+        {"action": "Switch utility plan", "estimated_savings": 500.0, "reason": "Cheaper tariffs exist"},
+        {"action": "Cancel unused subscriptions", "estimated_savings": 300.0, "reason": "Recurring waste"},
+    ],
+    "financial_health_score": {"score": 72},
+}
+
+
+def answer_for(prompt: str) -> str:
+    """JSON text of the right shape for an agent prompt"""
+    if '"budget_plan"' in prompt and '"investment_plan"' in prompt:
+        return json.dumps(ANSWERS)
+    if "current_allocation" in prompt:
+        return json.dumps(ANSWERS["budget_plan"])
+    if "portfolio" in prompt:
+        return json.dumps(ANSWERS["investment_plan"])
+    if "estimated_months_to_clear" in prompt:
+        return json.dumps(ANSWERS["debt_plan"])
+    if "estimated_savings" in prompt:
+        return json.dumps(ANSWERS["expense_optimizations"])
+    return json.dumps(ANSWERS["financial_health_score"])
+
+
+def parse_latency(spec: str):
+    """Sampler for a latency spec such as ``lognormal:0.8,0.5``; returns seconds"""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "const":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+class FakeGeminiError(Exception):
+    """What a failed fake call raises (reads like a 503 from the API)"""
+
+
+class _Chunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StreamIterator:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class _Stream:
+    """Streamed response: the answer arrives in chunks spread over the latency"""
+
+    def __init__(self, parts, delays, usage):
+        self._parts = parts
+        self._delays = delays
+        self._iterator = _StreamIterator()
+        self.usage_metadata = usage
+
+    def __iter__(self):
+        for part, delay in zip(self._parts, self._delays):
+            if self._iterator.cancelled:
+                return
+            time.sleep(delay)
+            yield _Chunk(part)
+
+    async def __aiter__(self):
+        for part, delay in zip(self._parts, self._delays):
+            if self._iterator.cancelled:
+                return
+            await asyncio.sleep(delay)
+            yield _Chunk(part)
+
+
+class FakeGeminiModel:
+    """
+    Drop-in for genai.GenerativeModel's generate_content(_async).
+
+    ``latency`` is a spec for parse_latency. ``error_rate`` and
+    ``malformed_rate`` are the shares of calls that raise or return
+    truncated JSON. ``chunk_chars`` sets the stream chunk size.
+    """
+
+    def __init__(self, latency: str = "const:0.5", error_rate: float = 0.0, malformed_rate: float = 0.0,
+                 seed: int = 0, chunk_chars: int = 40):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.chunk_chars = chunk_chars
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _plan(self, prompt: str):
+        """(latency, text or None for an error) of the next call"""
+        with self._lock:
+            self.calls += 1
+            latency = self.sample_latency(self._rng)
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            return latency, None
+        text = answer_for(prompt)
+        if roll < self.error_rate + self.malformed_rate:
+            text = text[:len(text) * 2 // 3]
+        return latency, text
+
+    def _response(self, prompt: str, text: str):
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4,
+                                total_token_count=(len(prompt) + len(text)) // 4)
+        return SimpleNamespace(text=text, candidates=None, usage_metadata=usage)
+
+    def _stream(self, prompt: str, latency: float, text: str):
+        parts = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        # First token after 30% of the latency, the rest spread evenly
+        rest = latency * 0.7 / max(1, len(parts) - 1)
+        delays = [latency * 0.3] + [rest] * (len(parts) - 1)
+        return _Stream(parts, delays, self._response(prompt, text).usage_metadata)
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options=None):
+        latency, text = self._plan(prompt)
+        if text is None:
+            time.sleep(latency * 0.3)
+            raise FakeGeminiError("503 The fake model is overloaded")
+        if stream:
+            return self._stream(prompt, latency, text)
+        time.sleep(latency)
+        return self._response(prompt, text)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, request_options=None):
+        latency, text = self._plan(prompt)
+        if text is None:
+            await asyncio.sleep(latency * 0.3)
+            raise FakeGeminiError("503 The fake model is overloaded")
+        if stream:
+            return self._stream(prompt, latency, text)
+        await asyncio.sleep(latency)
+        return self._response(prompt, text)
+
+
+def install(model: FakeGeminiModel) -> FakeGeminiModel:
+    """Make gemini_client use ``model`` instead of the real Gemini model"""
+    import gemini_client
+
+    gemini_client.get_model = lambda: model
+    return model
+
+
+def add_model_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="lognormal:0.8,0.5", help="Gemini latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    add_model_arguments(parser)
+    args = parser.parse_args()
+
+    # The key is only checked, never sent
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    import gemini_client
+    gemini_client.API_KEY = gemini_client.API_KEY or "fake"
+    install(FakeGeminiModel(args.latency, args.error_rate, args.malformed_rate, args.seed))
+
+    import uvicorn
+    from main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Record and replay Gemini responses ("cassettes").
+
+With GEMINI_CASSETTE_MODE=record every successful Gemini call is saved
+to GEMINI_CASSETTE_DIR: prompt, response text, billed tokens, latency and
+the agent that made it, one JSON file per prompt. With =replay the calls
+are answered from those files instead of the API, so the agents, their
+JSON parsing and validation can be run, tested and profiled without a
+network or an API key. A prompt that was never recorded fails like an
+API error and the agent falls back.
+
+Replay is instant unless GEMINI_CASSETTE_LATENCY_SCALE is set: 1 waits
+as long as the recorded call took, 0.5 half as long.
+"""
+import os
+import json
+import threading
+from typing import Dict, Optional
+
+from llm_cache import prompt_key
+
+# off, record or replay
+GEMINI_CASSETTE_MODE = os.getenv("GEMINI_CASSETTE_MODE", "off").strip().lower()
+GEMINI_CASSETTE_DIR = os.getenv("GEMINI_CASSETTE_DIR", "cassettes")
+GEMINI_CASSETTE_LATENCY_SCALE = float(os.getenv("GEMINI_CASSETTE_LATENCY_SCALE", "0"))
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Replay was asked for a prompt that has not been recorded"""
+
+
+class Cassette:
+    """
+    A directory of recorded Gemini calls, keyed like the LLM cache.
+
+    Recorded entries are read once and then served from memory, so a
+    replayed call costs a dict lookup.
+    """
+
+    def __init__(self, mode: str = GEMINI_CASSETTE_MODE, directory: str = GEMINI_CASSETTE_DIR,
+                 latency_scale: float = GEMINI_CASSETTE_LATENCY_SCALE):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown GEMINI_CASSETTE_MODE {mode!r}")
+        self.mode = mode
+        self.directory = directory
+        self.latency_scale = latency_scale
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def record(self, model: str, prompt: str, text: str, usage, latency: float, agent: str) -> None:
+        """Save one successful call, replacing an earlier recording of the same prompt"""
+        key = prompt_key(model, prompt)
+        entry = {
+            "model": model,
+            "agent": agent,
+            "prompt": prompt,
+            "text": text,
+            "usage": list(usage) if usage else None,
+            "latency": round(latency, 4),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename, so a concurrent replay never sees half a file
+        tmp = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._entries[key] = entry
+            self.recorded += 1
+
+    def lookup(self, model: str, prompt: str) -> dict:
+        """The recorded entry for ``prompt``; raises CassetteMiss when there is none"""
+        key = prompt_key(model, prompt)
+        entry = self._entries.get(key)
+        if entry is None:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                with self._lock:
+                    self.misses += 1
+                raise CassetteMiss(f"No recorded Gemini response for this prompt in {self.directory}")
+            self._entries[key] = entry
+        with self._lock:
+            self.replayed += 1
+        return entry
+
+    def delay(self, entry: dict) -> float:
+        """Seconds a replay of ``entry`` should take"""
+        return entry["latency"] * self.latency_scale
+
+    def entries(self):
+        """Every recorded entry in the directory"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    entries.append(json.load(f))
+        return entries
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "directory": self.directory,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Cassette:
+    """The process-wide cassette configured from the environment"""
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette()
+    return _cassette
+
+
+def set_cassette(cassette: Cassette) -> Cassette:
+    """Replace the process-wide cassette, e.g. from a benchmark"""
+    global _cassette
+    _cassette = cassette
+    return cassette
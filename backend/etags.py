@@ -0,0 +1,74 @@
+import os
+import hashlib
+import threading
+from typing import Optional
+
+import json_codec
+from llm_cache import LRUCache
+
+# How long an analysis handed out for a profile stays current for revalidation
+ANALYSIS_ETAG_TTL_SECONDS = float(os.getenv("ANALYSIS_ETAG_TTL_SECONDS", "3600"))
+ANALYSIS_ETAG_MAX_ENTRIES = int(os.getenv("ANALYSIS_ETAG_MAX_ENTRIES", "10000"))
+
+# Differs on every request, so it is not part of the analysis' identity
+_VOLATILE_FIELDS = ("token_usage",)
+
+
+def analysis_etag(results: dict) -> str:
+    """Strong ETag of an analysis result"""
+    stable = {key: value for key, value in results.items() if key not in _VOLATILE_FIELDS}
+    body = json_codec.dumps(stable, sort_keys=True)
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value names ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class AnalysisETags:
+    """
+    ETag of the latest analysis sent for each exact profile.
+
+    Only the tag is stored, not the analysis: a client that still holds
+    the analysis revalidates with If-None-Match and gets a 304 without any
+    agent work, for as long as the entry lives (TTL, then LRU eviction).
+    """
+
+    def __init__(self, max_entries: int = ANALYSIS_ETAG_MAX_ENTRIES, ttl: float = ANALYSIS_ETAG_TTL_SECONDS):
+        self._store = LRUCache(max_entries=max_entries, max_bytes=max_entries * 128, ttl=ttl)
+        self.not_modified = 0
+        self.stale = 0
+        self._stats_lock = threading.Lock()
+
+    def revalidate(self, key: str, if_none_match: Optional[str]) -> Optional[str]:
+        """The stored ETag when the client's copy is still current, else None"""
+        if not if_none_match:
+            return None
+        etag = self._store.get(key)
+        with self._stats_lock:
+            if etag is not None and etag_matches(if_none_match, etag):
+                self.not_modified += 1
+                return etag
+            self.stale += 1
+        return None
+
+    def store(self, key: str, results: dict) -> str:
+        """Remember the analysis sent for ``key``; returns its ETag"""
+        etag = analysis_etag(results)
+        self._store.set(key, etag)
+        return etag
+
+    def stats(self) -> dict:
+        revalidations = self.not_modified + self.stale
+        return {
+            "not_modified": self.not_modified,
+            "stale": self.stale,
+            "not_modified_rate": self.not_modified / revalidations if revalidations else 0.0,
+            "entries": len(self._store),
+        }
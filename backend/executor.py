@@ -0,0 +1,99 @@
+import math
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class QueueFullError(Exception):
+    """Raised when the executor already holds as much work as it may queue"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Executor queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking work called from the event loop, with admission control.
+
+    At most ``max_workers`` jobs run and ``max_queue`` more wait; anything
+    beyond that is rejected immediately with QueueFullError instead of
+    piling up behind slow jobs. Queue depth and queue wait times are
+    tracked for monitoring.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, name: str = "executor"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._waits = deque(maxlen=1000)
+        self._durations = deque(maxlen=1000)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) on the pool and await its result"""
+        with self._lock:
+            if self._admitted >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(self._retry_after())
+            self._admitted += 1
+
+        submitted = time.monotonic()
+
+        def job():
+            started = time.monotonic()
+            with self._lock:
+                self._running += 1
+                self._waits.append(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                # Here and not in the awaiting coroutine: a caller that is
+                # cancelled stops waiting, but the thread keeps working
+                with self._lock:
+                    self._running -= 1
+                    self._admitted -= 1
+                    self.completed += 1
+                    self._durations.append(time.monotonic() - started)
+
+        # copy_context keeps request-scoped context variables visible in the worker
+        context = contextvars.copy_context()
+        future = self._pool.submit(context.run, job)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A job that has not started yet never will; give its slot back
+            if future.cancel():
+                with self._lock:
+                    self._admitted -= 1
+            raise
+
+    def _retry_after(self) -> int:
+        # Time for the workers to drain what is already queued
+        if not self._durations:
+            return 1
+        average = sum(self._durations) / len(self._durations)
+        return max(1, math.ceil(average * (self._admitted / self.max_workers)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._admitted - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_p50_seconds": waits[len(waits) // 2] if waits else 0.0,
+                "queue_wait_p95_seconds": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "queue_wait_max_seconds": waits[-1] if waits else 0.0,
+            }
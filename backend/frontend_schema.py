@@ -0,0 +1,143 @@
+"""
+The Flask frontend's result schema, built on the backend.
+
+The only implementation of it: POST /analyze-finance?view=frontend answers
+in this schema, and the frontend either relays those bytes as they are
+(FRONTEND_PASSTHROUGH) or decodes them for its result cache.
+"""
+from typing import Any, Dict
+
+
+def _months_to_clear(debt: float, income: float) -> int:
+    """Default payoff time, paying 15% of income a month"""
+    if debt == 0:
+        return 0
+    if income <= 0:
+        return 12
+    return max(6, int(debt / (income * 0.15)))
+
+
+def frontend_results(backend_data: Dict[str, Any], income: float, expenses: Dict[str, float],
+                     debt: float) -> Dict[str, Any]:
+    """The ``results`` object the browser expects, from an analysis"""
+    total_expenses = sum(expenses.values()) if expenses else 0
+    actual_savings = income - total_expenses
+    savings_rate = (actual_savings / income) * 100 if income > 0 else 0
+
+    needs_percentage = backend_data.get('needs_percentage')
+    wants_percentage = backend_data.get('wants_percentage')
+    savings_percentage = backend_data.get('savings_percentage')
+
+    # Allocation from the actual numbers unless the analysis provides it
+    if needs_percentage is None or wants_percentage is None or savings_percentage is None:
+        if income > 0:
+            savings_percentage = min(100, max(0, ((income - total_expenses) / income) * 100))
+            needs_percentage = min(100 - savings_percentage, (total_expenses / income) * 100)
+            wants_percentage = max(0, 100 - needs_percentage - savings_percentage)
+        else:
+            needs_percentage = 50
+            wants_percentage = 30
+            savings_percentage = 20
+
+    recommended_savings = backend_data.get('recommended_monthly_savings', actual_savings)
+
+    if savings_rate > 50:
+        tips = [
+            f"Exceptional! You're saving {savings_rate:.1f}% of your income (₹{actual_savings:,.0f})",
+            "Consider investing your substantial savings for better returns",
+            "You're saving much more than the typical 20% target"
+        ]
+    elif savings_rate >= 20:
+        tips = [
+            f"Good job! You're saving {savings_rate:.1f}% of your income",
+            "You're meeting or exceeding savings goals",
+            "Consider automating your investments"
+        ]
+    else:
+        tips = [
+            f"Current savings: {savings_rate:.1f}% (₹{actual_savings:,.0f})",
+            "Aim to increase savings gradually",
+            "Review expenses for optimization opportunities"
+        ]
+
+    debt_plan = backend_data.get('debt_plan', {})
+    return {
+        "budget_plan": {
+            "current_allocation": {
+                "needs_percentage": round(needs_percentage, 1),
+                "wants_percentage": round(wants_percentage, 1),
+                "savings_percentage": round(savings_percentage, 1)
+            },
+            "recommended_allocation_50_30_20": {
+                "needs": 50,
+                "wants": 30,
+                "savings": 20
+            },
+            "recommended_monthly_savings": recommended_savings,
+            "tips": tips
+        },
+        "investment_plan": {
+            "portfolio": backend_data.get('portfolio', [
+                {
+                    "asset": "Emergency Fund",
+                    "allocation%": 20,
+                    "amount": total_expenses * 4,
+                    "notes": "Liquid cash for emergencies"
+                },
+                {
+                    "asset": "Index Funds",
+                    "allocation%": 40,
+                    "amount": recommended_savings * 0.4,
+                    "notes": "Diversified stock market investment"
+                },
+                {
+                    "asset": "Bonds",
+                    "allocation%": 30,
+                    "amount": recommended_savings * 0.3,
+                    "notes": "Fixed income for stability"
+                },
+                {
+                    "asset": "Real Estate",
+                    "allocation%": 10,
+                    "amount": recommended_savings * 0.1,
+                    "notes": "Real estate investment trusts"
+                }
+            ]),
+            "important_considerations": backend_data.get('important_considerations', [
+                'Consult with a financial advisor',
+                'Consider your risk tolerance when investing'
+            ])
+        },
+        "expense_optimizations": backend_data.get('expense_optimizations', [
+            {
+                "action": "Review monthly subscriptions",
+                "estimated_savings": total_expenses * 0.1,
+                "reason": "Potential 10% savings from unused services"
+            },
+            {
+                "action": "Reduce dining out",
+                "estimated_savings": total_expenses * 0.05,
+                "reason": "Cook more meals at home to save money"
+            }
+        ]),
+        "debt_plan": {
+            "status": debt_plan.get('status', 'Excellent - Debt Free!' if debt == 0 else 'Manageable Debt'),
+            "estimated_months_to_clear": (
+                debt_plan['estimated_months_to_clear'] if 'estimated_months_to_clear' in debt_plan
+                else _months_to_clear(debt, income)
+            ),
+            "recommended_strategy": debt_plan.get(
+                'recommended_strategy',
+                'Maintain your debt-free financial health!' if debt == 0 else 'Focus on high-interest debt first'
+            )
+        },
+        "financial_health_score": backend_data.get(
+            'financial_health_score', min(100, max(40, 70 + (savings_rate * 0.3)))
+        )
+    }
+
+
+def frontend_response(backend_data: Dict[str, Any], income: float, expenses: Dict[str, float],
+                      debt: float) -> Dict[str, Any]:
+    """The whole body of the frontend's /analyze answer"""
+    return {"success": True, "results": frontend_results(backend_data, income, expenses, debt)}
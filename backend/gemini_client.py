@@ -1,48 +1,489 @@
 import os
-import google.generativeai as genai
+import time
+import logging
+import functools
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Any
 from dotenv import load_dotenv
+from llm_cache import get_llm_cache, prompt_key
+from resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, LatencyTracker,
+    bounded_timeout, hedge_delay, hedged_call, hedged_call_async,
+)
+from rate_limiter import OutboundLimiter, RateLimitTimeout, estimate_tokens
+from json_stream import JSONStreamExtractor, MalformedJSONError, extract_json
+from token_usage import TokenBudgetExceeded, current_agent, record_usage, release_tokens, reserve_tokens
+from cassette import CassetteMiss, get_cassette
+from metrics import observe_gemini
+from tracing import trace, tracer
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
 # Load environment variables
 load_dotenv()
 
 API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not set in environment. Please add it to your .env file.")
-
-# Configure Gemini API
-genai.configure(api_key=API_KEY)
 
 # Use Gemini 2.5 Flash
 MODEL_NAME = "gemini-2.0-flash-exp"  # This is Gemini 2.5 Flash
 
+# Agents that want JSON stream the answer and stop reading once it is complete
+GEMINI_STREAM_JSON = os.getenv("GEMINI_STREAM_JSON", "1").lower() in ("1", "true", "yes")
+# Longest a single call may take; shortened further by the request deadline
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "20"))
+
+# Shared by every caller: when Gemini is failing or slow, stop calling it
+# and let the agents use their rule-based fallbacks straight away
+gemini_circuit = CircuitBreaker()
+gemini_latencies = LatencyTracker()
+# Process-wide quota and concurrency control for every Gemini call, sync or async
+gemini_limiter = OutboundLimiter()
+
+_model = None
+_model_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_model() -> "genai.GenerativeModel":
+    """
+    Return the shared model handle, creating it on first use.
+
+    The Gemini SDK is imported and configured here rather than at module
+    import, which keeps cold starts fast; a missing GEMINI_API_KEY is
+    reported on the first call. The handle is safe to share between
+    threads and event-loop tasks; the underlying gRPC clients are cached by
+    the SDK, so every call reuses the same channels instead of opening new
+    connections.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if not API_KEY:
+                    raise RuntimeError("GEMINI_API_KEY not set in environment. Please add it to your .env file.")
+                import google.generativeai as genai
+
+                # Configure Gemini API
+                genai.configure(api_key=API_KEY)
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+
+def _extract_text(response) -> str:
+    """Pull the generated text out of a Gemini response"""
+    if hasattr(response, "text") and response.text:
+        return response.text.strip()
+    elif hasattr(response, "candidates") and response.candidates:
+        # Handle candidate-based response
+        candidate = response.candidates[0]
+        if hasattr(candidate, "content") and candidate.content:
+            return candidate.content.parts[0].text.strip()
+        elif hasattr(candidate, "output"):
+            return str(candidate.output).strip()
+    else:
+        # Fallback to string representation
+        return str(response).strip()
+
+
+def _chunk_text(chunk) -> str:
+    """Text of one streamed chunk; chunks without text parts yield nothing"""
+    try:
+        return chunk.text
+    except (ValueError, IndexError, AttributeError):
+        return ""
+
+
+def _close_stream(response) -> None:
+    """Stop a streamed response that is no longer being read"""
+    # The SDK has no public cancel; its gRPC stream iterators do
+    cancel = getattr(getattr(response, "_iterator", None), "cancel", None)
+    if callable(cancel):
+        cancel()
+
+
+def _usage(response):
+    """(prompt_tokens, completion_tokens) billed for a response, when the API reports them"""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    completion_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    if not prompt_tokens and not completion_tokens:
+        return None
+    return prompt_tokens, completion_tokens
+
+
+def _call_timeout() -> float:
+    """Timeout for the next call, within what is left of the request deadline"""
+    timeout = bounded_timeout(GEMINI_TIMEOUT_SECONDS)
+    if timeout <= 0:
+        raise DeadlineExceeded("Request deadline passed before calling Gemini")
+    return timeout
+
+
+def _admit(tokens: int) -> int:
+    """
+    Refuse the call up front when the token budget or the circuit says so.
+
+    Returns the budget reserved for the call; the caller settles it with
+    the recorded usage or gives it back with release_tokens.
+    """
+    try:
+        reserved = reserve_tokens(tokens)
+    except TokenBudgetExceeded:
+        observe_gemini("budget_exceeded")
+        raise
+    if not gemini_circuit.allow():
+        release_tokens(reserved)
+        observe_gemini("circuit_open")
+        raise CircuitOpenError("Gemini circuit is open, skipping the call")
+    return reserved
+
+
+# Raised before a request left the process; they say nothing about Gemini
+LOCAL_ERRORS = (RateLimitTimeout, DeadlineExceeded)
+
+
+def _not_sent(e: Exception, reserved: int, start: float) -> None:
+    """Account for a call refused locally: no circuit verdict, no tokens spent"""
+    release_tokens(reserved)
+    gemini_circuit.release()
+    outcome = "rate_limited" if isinstance(e, RateLimitTimeout) else "deadline_exceeded"
+    observe_gemini(outcome, time.monotonic() - start)
+    logger.warning("Gemini call not sent: %s", e)
+
+
+def _request_span(prompt: str):
+    """Span around one Gemini request, limiter wait included"""
+    return tracer.start_as_current_span(
+        "gemini.generate_content", kind=trace.SpanKind.CLIENT,
+        attributes={"gemini.model": MODEL_NAME, "gemini.prompt_chars": len(prompt)},
+    )
+
+
+def _set_usage_attributes(span, usage) -> None:
+    if usage is not None:
+        span.set_attribute("gemini.prompt_tokens", usage[0])
+        span.set_attribute("gemini.completion_tokens", usage[1])
+
+
+def _record_call_usage(prompt: str, text: str, usage, reserved: int = 0) -> None:
+    # A stream cut short may not carry usage; estimate from the text instead
+    if usage is None:
+        record_usage(len(prompt) // 4, len(text) // 4, estimated=True, reserved=reserved)
+    else:
+        record_usage(*usage, reserved=reserved)
+
+
+def _replayed_entry(cassette, prompt: str) -> dict:
+    try:
+        entry = cassette.lookup(MODEL_NAME, prompt)
+    except CassetteMiss:
+        observe_gemini("error")
+        raise
+    observe_gemini("replayed", cassette.delay(entry))
+    usage = entry["usage"] and tuple(entry["usage"])
+    _set_usage_attributes(trace.get_current_span(), usage)
+    _record_call_usage(prompt, entry["text"], usage)
+    return entry
+
+
+def _replay(cassette, prompt: str, parse_cached):
+    """Answer from the recorded cassette instead of calling Gemini (see cassette.py)"""
+    with _request_span(prompt) as span:
+        span.set_attribute("gemini.replayed", True)
+        entry = _replayed_entry(cassette, prompt)
+        if cassette.delay(entry):
+            time.sleep(cassette.delay(entry))
+    return parse_cached(entry["text"])
+
+
+async def _replay_async(cassette, prompt: str, parse_cached):
+    with _request_span(prompt) as span:
+        span.set_attribute("gemini.replayed", True)
+        entry = _replayed_entry(cassette, prompt)
+        if cassette.delay(entry):
+            await asyncio.sleep(cassette.delay(entry))
+    return parse_cached(entry["text"])
+
+
+def _spent(e: MalformedJSONError, text: str, response) -> MalformedJSONError:
+    """Attach what a call with unusable output received, so its tokens are still recorded"""
+    e.text = text
+    e.usage = _usage(response)
+    return e
+
+
+def _request_text(prompt: str, timeout: float):
+    response = get_model().generate_content(prompt, request_options={"timeout": timeout})
+    text = _extract_text(response)
+    return text, text, _usage(response)
+
+
+def _request_json(prompt: str, timeout: float, opening: str):
+    response = get_model().generate_content(prompt, request_options={"timeout": timeout})
+    text = _extract_text(response)
+    try:
+        return text, extract_json(text, opening), _usage(response)
+    except MalformedJSONError as e:
+        raise _spent(e, text, response)
+
+
+def _request_json_stream(prompt: str, timeout: float, opening: str):
+    extractor = JSONStreamExtractor(opening)
+    response = get_model().generate_content(prompt, stream=True, request_options={"timeout": timeout})
+    received = []
+    try:
+        for chunk in response:
+            received.append(_chunk_text(chunk))
+            if extractor.feed(received[-1]):
+                break
+        return extractor.text(), extractor.value(), _usage(response)
+    except MalformedJSONError as e:
+        raise _spent(e, "".join(received), response)
+    finally:
+        _close_stream(response)
+
+
+async def _request_text_async(prompt: str, timeout: float):
+    response = await get_model().generate_content_async(prompt, request_options={"timeout": timeout})
+    text = _extract_text(response)
+    return text, text, _usage(response)
+
+
+async def _request_json_async(prompt: str, timeout: float, opening: str):
+    response = await get_model().generate_content_async(prompt, request_options={"timeout": timeout})
+    text = _extract_text(response)
+    try:
+        return text, extract_json(text, opening), _usage(response)
+    except MalformedJSONError as e:
+        raise _spent(e, text, response)
+
+
+async def _request_json_stream_async(prompt: str, timeout: float, opening: str):
+    extractor = JSONStreamExtractor(opening)
+    response = await get_model().generate_content_async(prompt, stream=True, request_options={"timeout": timeout})
+    received = []
+    try:
+        async for chunk in response:
+            received.append(_chunk_text(chunk))
+            if extractor.feed(received[-1]):
+                break
+        return extractor.text(), extractor.value(), _usage(response)
+    except MalformedJSONError as e:
+        raise _spent(e, "".join(received), response)
+    finally:
+        _close_stream(response)
+
+
+def _generate(prompt: str, request, parse_cached):
+    """
+    Run one Gemini request with caching, limits and failure tracking.
+
+    ``request(prompt, timeout)`` returns (text, value, usage), usage being
+    (prompt_tokens, completion_tokens) or None. The text is what gets
+    cached, and ``parse_cached`` turns a cached text back into a value.
+    Token usage is recorded against the current request and agent (see
+    token_usage), and a call that would overrun the request's token budget
+    is refused before it is made.
+
+    With GEMINI_CASSETTE_MODE=replay the answer comes from the recorded
+    cassette and nothing else runs; with =record every successful call is
+    saved to it, bypassing the cache so that each prompt reaches the API.
+    """
+    cassette = get_cassette()
+    if cassette.replaying:
+        return _replay(cassette, prompt, parse_cached)
+    cache = None if cassette.recording else get_llm_cache()
+    key = prompt_key(MODEL_NAME, prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            record_usage(cached=True)
+            observe_gemini("cached")
+            trace.get_current_span().set_attribute("gemini.cache_hit", True)
+            return parse_cached(cached)
+
+    timeout = _call_timeout()
+    tokens = estimate_tokens(prompt)
+    reserved = _admit(tokens)
+
+    def attempt():
+        with _request_span(prompt) as span:
+            # Waiting for a slot uses up part of the deadline, so re-read it after
+            queued = time.monotonic()
+            permit = gemini_limiter.acquire(tokens, timeout)
+            started = time.monotonic()
+            span.set_attribute("gemini.limiter_wait_ms", round((started - queued) * 1000, 1))
+            try:
+                text, value, usage = request(prompt, _call_timeout())
+            except BaseException as e:
+                gemini_limiter.release(permit, time.monotonic() - started, error=e)
+                raise
+            gemini_limiter.release(permit, time.monotonic() - started, actual_tokens=usage and sum(usage))
+            _set_usage_attributes(span, usage)
+            return text, value, usage
+
+    start = time.monotonic()
+    try:
+        delay = hedge_delay(gemini_latencies, timeout)
+        text, value, usage = attempt() if delay is None else hedged_call(attempt, delay, timeout)
+    except MalformedJSONError as e:
+        # Gemini answered, the answer was unusable: not an availability problem
+        gemini_circuit.record(True, time.monotonic() - start)
+        observe_gemini("malformed", time.monotonic() - start)
+        _record_call_usage(prompt, getattr(e, "text", ""), getattr(e, "usage", None), reserved)
+        raise
+    except LOCAL_ERRORS as e:
+        _not_sent(e, reserved, start)
+        raise Exception(f"Gemini API call failed: {str(e)}")
+    except Exception as e:
+        release_tokens(reserved)
+        gemini_circuit.record(False, time.monotonic() - start)
+        observe_gemini("error", time.monotonic() - start)
+        logger.warning("Gemini API error: %s", e)
+        raise Exception(f"Gemini API call failed: {str(e)}")
+
+    duration = time.monotonic() - start
+    gemini_circuit.record(True, duration)
+    observe_gemini("success", duration)
+    gemini_latencies.add(duration)
+    _record_call_usage(prompt, text, usage, reserved)
+    if cassette.recording:
+        cassette.record(MODEL_NAME, prompt, text, usage, duration, current_agent())
+    if cache is not None:
+        cache.set(key, text)
+    return value
+
+
+async def _generate_async(prompt: str, request, parse_cached):
+    """Event-loop counterpart of _generate"""
+    cassette = get_cassette()
+    if cassette.replaying:
+        return await _replay_async(cassette, prompt, parse_cached)
+    cache = None if cassette.recording else get_llm_cache()
+    key = prompt_key(MODEL_NAME, prompt)
+    if cache is not None:
+        cached = await cache.get_async(key)
+        if cached is not None:
+            record_usage(cached=True)
+            observe_gemini("cached")
+            trace.get_current_span().set_attribute("gemini.cache_hit", True)
+            return parse_cached(cached)
+
+    timeout = _call_timeout()
+    tokens = estimate_tokens(prompt)
+    reserved = _admit(tokens)
+
+    async def attempt():
+        with _request_span(prompt) as span:
+            queued = time.monotonic()
+            permit = await gemini_limiter.acquire_async(tokens, timeout)
+            started = time.monotonic()
+            span.set_attribute("gemini.limiter_wait_ms", round((started - queued) * 1000, 1))
+            try:
+                text, value, usage = await request(prompt, _call_timeout())
+            except BaseException as e:
+                gemini_limiter.release(permit, time.monotonic() - started, error=e)
+                raise
+            gemini_limiter.release(permit, time.monotonic() - started, actual_tokens=usage and sum(usage))
+            _set_usage_attributes(span, usage)
+            return text, value, usage
+
+    start = time.monotonic()
+    try:
+        delay = hedge_delay(gemini_latencies, timeout)
+        text, value, usage = await (attempt() if delay is None else hedged_call_async(attempt, delay))
+    except asyncio.CancelledError:
+        # The caller gave up waiting; says nothing about Gemini's health
+        release_tokens(reserved)
+        gemini_circuit.release()
+        observe_gemini("cancelled", time.monotonic() - start)
+        raise
+    except MalformedJSONError as e:
+        gemini_circuit.record(True, time.monotonic() - start)
+        observe_gemini("malformed", time.monotonic() - start)
+        _record_call_usage(prompt, getattr(e, "text", ""), getattr(e, "usage", None), reserved)
+        raise
+    except LOCAL_ERRORS as e:
+        _not_sent(e, reserved, start)
+        raise Exception(f"Gemini API call failed: {str(e)}")
+    except Exception as e:
+        release_tokens(reserved)
+        gemini_circuit.record(False, time.monotonic() - start)
+        observe_gemini("error", time.monotonic() - start)
+        logger.warning("Gemini API error: %s", e)
+        raise Exception(f"Gemini API call failed: {str(e)}")
+
+    duration = time.monotonic() - start
+    gemini_circuit.record(True, duration)
+    observe_gemini("success", duration)
+    gemini_latencies.add(duration)
+    _record_call_usage(prompt, text, usage, reserved)
+    if cassette.recording:
+        cassette.record(MODEL_NAME, prompt, text, usage, duration, current_agent())
+    if cache is not None:
+        await cache.set_async(key, text)
+    return value
+
+
 def gemini_generate(prompt: str) -> str:
     """
     Generate text using Google Gemini 2.5 Flash.
 
+    Identical prompts are answered from the LLM response cache when it is
+    enabled, without calling the API. Calls wait for a slot in the shared
+    outbound limiter (quota and adaptive concurrency), are bounded by the
+    request deadline, skipped while the circuit breaker is open, and hedged
+    with a second attempt when GEMINI_HEDGE_ENABLED is set.
+
     Returns:
         str: Generated response text
-        
+
     Raises:
+        DeadlineExceeded: If the request deadline has already passed
+        TokenBudgetExceeded: If the call would overrun the request's token budget
+        CircuitOpenError: If Gemini calls are currently being skipped
         Exception: If there's an error with the API call
     """
-    try:
-        model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content(prompt)
-        
-        # Extract text from response
-        if hasattr(response, "text") and response.text:
-            return response.text.strip()
-        elif hasattr(response, "candidates") and response.candidates:
-            # Handle candidate-based response
-            candidate = response.candidates[0]
-            if hasattr(candidate, "content") and candidate.content:
-                return candidate.content.parts[0].text.strip()
-            elif hasattr(candidate, "output"):
-                return str(candidate.output).strip()
-        else:
-            # Fallback to string representation
-            return str(response).strip()
-            
-    except Exception as e:
-        print(f"Gemini 2.5 Flash API Error: {e}")
-        raise Exception(f"Gemini API call failed: {str(e)}")
\ No newline at end of file
+    return _generate(prompt, _request_text, lambda text: text)
+
+
+async def gemini_generate_async(prompt: str) -> str:
+    """
+    Async counterpart of gemini_generate.
+
+    Awaits the SDK's asyncio transport, so many prompts can be in flight
+    from one event loop without tying up a thread each. Sync and async
+    calls share the same outbound limiter.
+    """
+    return await _generate_async(prompt, _request_text_async, lambda text: text)
+
+
+def gemini_generate_json(prompt: str, opening: str = "{[") -> Any:
+    """
+    Generate a JSON answer and return it parsed.
+
+    With GEMINI_STREAM_JSON (the default) the response is streamed and
+    reading stops as soon as the first value starting with one of
+    ``opening`` closes; anything the model adds after it is never
+    generated or parsed. Prose or markdown fences before the value are
+    skipped.
+
+    Raises:
+        MalformedJSONError: If the answer is not (or not only) valid JSON
+        and everything gemini_generate raises
+    """
+    request = _request_json_stream if GEMINI_STREAM_JSON else _request_json
+    return _generate(
+        prompt, functools.partial(request, opening=opening), lambda text: extract_json(text, opening)
+    )
+
+
+async def gemini_generate_json_async(prompt: str, opening: str = "{[") -> Any:
+    """Async counterpart of gemini_generate_json"""
+    request = _request_json_stream_async if GEMINI_STREAM_JSON else _request_json_async
+    return await _generate_async(
+        prompt, functools.partial(request, opening=opening), lambda text: extract_json(text, opening)
+    )
@@ -0,0 +1,38 @@
+"""
+Fast JSON encoding and decoding for bodies the backend builds itself.
+
+Backed by orjson, several times faster than the json module for both
+directions. Routes with a response model are serialized by FastAPI
+(pydantic-core writes the bytes directly); this module covers the rest:
+NDJSON batch lines, SSE events, relayed frontend bodies, cache entries,
+ETags and the parsing of agent output.
+
+Output is compact UTF-8, the equivalent of ``json.dumps(...,
+ensure_ascii=False, separators=(",", ":"))``. NaN and infinity are
+written as null instead of invalid JSON, and numpy scalars and arrays
+are serialized natively.
+"""
+from typing import Any
+
+import orjson
+
+# A subclass of json.JSONDecodeError, so existing handlers still catch it
+JSONDecodeError = orjson.JSONDecodeError
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """Encode ``value`` as UTF-8 JSON bytes; unknown types are written with str()"""
+    option = _OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _OPTIONS
+    return orjson.dumps(value, default=str, option=option)
+
+
+def dumps_str(value: Any, sort_keys: bool = False) -> str:
+    """dumps() for callers that need text"""
+    return dumps(value, sort_keys).decode("utf-8")
+
+
+def loads(data) -> Any:
+    """Decode JSON from str, bytes or bytearray"""
+    return orjson.loads(data)
@@ -0,0 +1,126 @@
+"""
+Incremental extraction of the first JSON value from streamed LLM output.
+
+Models often wrap their JSON in markdown fences or a sentence of prose.
+JSONStreamExtractor skips whatever comes before the opening bracket, then
+tracks bracket nesting (and string/escape state) chunk by chunk, so the
+caller learns the moment the top-level object or array closes and can
+stop reading the stream. Output that cannot be JSON -- a mismatched
+bracket, a stray character outside a string -- is rejected as soon as it
+arrives instead of after the whole response.
+"""
+import os
+import re
+import json_codec
+from typing import Any
+
+# Prose allowed before the JSON value starts
+JSON_MAX_PREFIX_CHARS = int(os.getenv("JSON_MAX_PREFIX_CHARS", "4096"))
+
+_OPENERS = {"{": "}", "[": "]"}
+_CLOSERS = {"}": "{", "]": "["}
+# Everything that may appear outside strings in JSON besides brackets and quotes
+_BARE = frozenset(" \t\r\n:,-+.0123456789eEtrufalsn")
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class MalformedJSONError(ValueError):
+    """Raised when streamed output cannot be (or did not finish being) JSON"""
+
+
+class JSONStreamExtractor:
+    """
+    Feed text chunks in order; feed() returns True once the first JSON
+    value starting with one of ``opening`` is complete. text() then gives
+    exactly that value's source and value() the parsed structure.
+    """
+
+    def __init__(self, opening: str = "{[", max_prefix: int = JSON_MAX_PREFIX_CHARS):
+        self.opening = opening
+        self.max_prefix = max_prefix
+        self.complete = False
+        self._started = False
+        self._skipped = 0
+        self._parts = []
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> bool:
+        if self.complete:
+            return True
+        if not chunk:
+            return False
+
+        i = 0
+        if not self._started:
+            starts = [p for p in (chunk.find(c) for c in self.opening) if p >= 0]
+            if not starts:
+                self._skip(len(chunk))
+                return False
+            i = min(starts)
+            self._skip(i)
+            self._started = True
+        begin = i
+
+        n = len(chunk)
+        while i < n:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(chunk, i)
+                if match is None:
+                    break
+                i = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                continue
+
+            c = chunk[i]
+            if c == '"':
+                self._in_string = True
+            elif c in _OPENERS:
+                self._stack.append(c)
+            elif c in _CLOSERS:
+                if not self._stack or self._stack[-1] != _CLOSERS[c]:
+                    raise MalformedJSONError(f"Unexpected {c!r} in JSON output")
+                self._stack.pop()
+                if not self._stack:
+                    self._parts.append(chunk[begin:i + 1])
+                    self.complete = True
+                    return True
+            elif c not in _BARE:
+                raise MalformedJSONError(f"Unexpected character {c!r} outside a JSON string")
+            i += 1
+
+        self._parts.append(chunk[begin:])
+        return False
+
+    def _skip(self, count: int) -> None:
+        self._skipped += count
+        if self._skipped > self.max_prefix:
+            raise MalformedJSONError(f"No JSON value in the first {self.max_prefix} characters")
+
+    def text(self) -> str:
+        """Source text of the completed JSON value"""
+        if not self.complete:
+            raise MalformedJSONError("Output ended before the JSON value was complete")
+        return "".join(self._parts)
+
+    def value(self) -> Any:
+        """The completed JSON value, parsed"""
+        try:
+            return json_codec.loads(self.text())
+        except json_codec.JSONDecodeError as e:
+            raise MalformedJSONError(f"Invalid JSON: {e}") from e
+
+
+def extract_json(text: str, opening: str = "{[") -> Any:
+    """Parse the first JSON value in a complete response text"""
+    extractor = JSONStreamExtractor(opening, max_prefix=len(text))
+    extractor.feed(text)
+    return extractor.value()
@@ -1,15 +1,114 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from models import FinanceInput  # ← CHANGED
+from models import FinanceInput, FinanceOutput, HealthStatus  # ← CHANGED
 from agents.crewai_orchestrator import FinancialCrewOrchestrator  # ← CHANGED
+from analysis_cache import get_analysis_cache
+from etags import AnalysisETags
+from frontend_schema import frontend_response
+from singleflight import SingleFlight
+from executor import BoundedExecutor, QueueFullError
+from batch import NDJSONStreamingResponse, iter_list, iter_ndjson, stream_completed
+from resilience import REQUEST_DEADLINE_SECONDS, deadline_scope
+from rate_limiter import BATCH, priority_scope
+from token_usage import REQUEST_TOKEN_BUDGET, usage_scope, usage_totals
+from gemini_client import gemini_circuit, gemini_limiter
+from llm_cache import get_llm_cache
+from cassette import get_cassette
+from metrics import PrometheusMiddleware, TokenUsageCollector, register_stats, render_metrics
+from tracing import TracingMiddleware, setup_tracing, tracer
+from logging_setup import SAMPLED, setup_logging
+import json_codec
+from prometheus_client import REGISTRY
+from fastapi.responses import Response, StreamingResponse
+from contextlib import asynccontextmanager
 import os
+import asyncio
 import logging
 
-# Add logging for production
-logging.basicConfig(level=logging.INFO)
+# JSON lines written by a background thread; see logging_setup.py
+setup_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AI Personal Finance Advisor - CrewAI")
+# Spans go to TRACING_EXPORTER (off by default); see tracing.py
+setup_tracing(os.environ.get("OTEL_SERVICE_NAME", "finance-backend"))
+
+def build_orchestrator():
+    """Build the CrewAI agent registry once; None if CrewAI cannot start"""
+    try:
+        return FinancialCrewOrchestrator()
+    except Exception as e:
+        logger.error("CrewAI agents unavailable, using direct agent analysis: %s", e)
+        return None
+
+def warm_up():
+    """Load what the first request would otherwise pay for"""
+    from gemini_client import get_model
+    from agents.agent_runner import AGENT_POOL_SIZE
+    try:
+        get_model()
+    except Exception as e:
+        logger.error("Gemini client not ready: %s", e)
+    get_llm_cache()
+    get_analysis_cache()
+    logger.info("Warm-up done", extra={"agent_pool_size": AGENT_POOL_SIZE})
+
+async def start_up():
+    """Build the orchestrator and warm up, off the event loop"""
+    orchestrator = await asyncio.to_thread(build_orchestrator)
+    await asyncio.to_thread(warm_up)
+    return orchestrator
+
+async def get_orchestrator():
+    """The shared orchestrator, once start-up has finished"""
+    startup = getattr(app.state, "startup", None)
+    if startup is None:
+        return None
+    return await asyncio.shield(startup)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy imports load in the background so /health answers right away;
+    # analysis requests wait for them in get_orchestrator
+    app.state.startup = asyncio.create_task(start_up())
+    yield
+
+app = FastAPI(title="AI Personal Finance Advisor - CrewAI", lifespan=lifespan)
+
+# Identical requests that arrive while one is running share its result
+analysis_flight = SingleFlight()
+# Lets clients holding an analysis revalidate it (If-None-Match -> 304)
+analysis_etags = AnalysisETags()
+
+# Records of one batch request analyzed at the same time
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+
+# The CrewAI orchestration is blocking, so it runs on its own bounded pool;
+# when the pool and its queue are full, requests get a fast 503 instead
+orchestration_executor = BoundedExecutor(
+    max_workers=int(os.environ.get("ORCHESTRATOR_WORKERS", 4)),
+    max_queue=int(os.environ.get("ORCHESTRATOR_QUEUE_SIZE", 16)),
+    name="orchestrator",
+)
+
+def cache_stats(get_cache):
+    cache = get_cache()
+    return cache.stats() if cache is not None else None
+
+# Components that keep their own counters are read when /metrics is scraped
+register_stats("llm_cache", lambda: cache_stats(get_llm_cache), counters=("memory_hits", "disk_hits", "misses"))
+register_stats("analysis_cache", lambda: cache_stats(get_analysis_cache), counters=("hits", "misses"))
+register_stats("analysis_etags", analysis_etags.stats, counters=("not_modified", "stale"))
+register_stats("analysis_coalescing", analysis_flight.stats, counters=("executions", "coalesced"))
+register_stats("orchestrator_executor", orchestration_executor.stats, counters=("completed", "rejected"))
+register_stats("gemini_limiter", gemini_limiter.stats, counters=("admitted", "rate_limited", "timed_out"))
+register_stats(
+    "gemini_circuit", lambda: {**gemini_circuit.stats(), "open": gemini_circuit.is_open()},
+    counters=("times_opened", "rejected"),
+)
+REGISTRY.register(TokenUsageCollector(usage_totals))
+
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(TracingMiddleware)
 
 # Enable CORS - Update for production
 app.add_middleware(
@@ -25,58 +124,232 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/analyze-finance")
-async def analyze(fin: FinanceInput):
+# Declaring the response model lets FastAPI validate the analysis and write
+# it straight to JSON bytes in pydantic-core, without an intermediate dict
+@app.post("/analyze-finance", response_model=FinanceOutput, response_model_exclude_unset=True)
+async def analyze(fin: FinanceInput, request: Request, response: Response, view: str = "analysis"):
+    """
+    Full analysis of one profile.
+
+    The response carries an ETag. A client that sends it back in
+    If-None-Match for the same profile gets 304 Not Modified, without any
+    agent work, while the analysis is still current.
+
+    With ``?view=frontend`` the body is exactly what the Flask frontend's
+    /analyze returns ({"success": true, "results": ...}), so the frontend
+    can relay it as is.
+    """
+    if view not in ("analysis", "frontend"):
+        raise HTTPException(status_code=422, detail="view must be 'analysis' or 'frontend'")
+    key = profile_key(fin)
+    etag_key = key if view == "analysis" else f"{key}#{view}"
+    etag = analysis_etags.revalidate(etag_key, request.headers.get("if-none-match"))
+    if etag is not None:
+        return Response(status_code=304, headers={"ETag": etag})
+    results = await analyze_profile(fin, key)
+    if view == "frontend":
+        body = frontend_response(results, fin.income, dict(fin.expenses or {}), fin.debt or 0)
+        etag = analysis_etags.store(etag_key, body)
+        return Response(json_codec.dumps(body), media_type="application/json", headers={"ETag": etag})
+    response.headers["ETag"] = analysis_etags.store(etag_key, results)
+    return results
+
+def profile_key(fin: FinanceInput) -> str:
+    return json_codec.dumps_str(build_user_data(fin), sort_keys=True)
+
+async def analyze_profile(fin: FinanceInput, key: str = None):
+    # Every agent call made for this request shares one deadline
+    with deadline_scope():
+        return await analysis_flight.do(key or profile_key(fin), lambda: run_analysis_with_usage(fin))
+
+async def run_analysis_with_usage(fin: FinanceInput):
+    """run_analysis plus the Gemini tokens it spent, per agent"""
+    with usage_scope() as usage, tracer.start_as_current_span("analysis") as span:
+        results = await run_analysis(fin)
+        span.set_attribute("analysis.crewai_used", bool(results.get("crewai_used")))
+        span.set_attribute("gemini.total_tokens", usage.total_tokens)
+    # Copy: the cached analysis must not carry this request's usage
+    return {**results, "token_usage": usage.summary()}
+
+@app.post("/analyze-finance/batch")
+async def analyze_batch(request: Request):
+    """
+    Analyze many profiles in one request.
+
+    Accepts a JSON list of FinanceInput records, or an NDJSON stream when
+    sent as application/x-ndjson. Streams back one NDJSON line per record,
+    {"index": i, "result": {...}} or {"index": i, "error": "..."}, in the
+    order the analyses complete.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        records = iter_ndjson(request.stream())
+    else:
+        try:
+            body = json_codec.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON list or NDJSON stream")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON list of FinanceInput records")
+        records = iter_list(body)
+
+    async def analyze_record(index: int, record):
+        try:
+            if isinstance(record, (bytes, str)):
+                record = json_codec.loads(record)
+            fin = FinanceInput(**record)
+            # Batch work queues behind interactive requests for Gemini slots
+            with priority_scope(BATCH):
+                return {"index": index, "result": await analyze_profile(fin)}
+        except Exception as e:
+            return {"index": index, "error": str(e)}
+
+    return NDJSONStreamingResponse(stream_completed(records, analyze_record, BATCH_CONCURRENCY))
+
+async def run_analysis(fin: FinanceInput):
     try:
-        expenses = dict(fin.expenses or {})
+        user_data = build_user_data(fin)
+        # Formatted only when DEBUG is on and the line is sampled
+        logger.debug("Analysis request: %s", user_data, extra=SAMPLED)
         
-        # 🚨 ADD DEBUG CALCULATIONS
-        total_expenses = sum(expenses.values())
-        actual_savings = fin.income - total_expenses
-        logger.info(f"🔍 DEBUG CALCULATIONS:")
-        logger.info(f"🔍 Income: ₹{fin.income}")
-        logger.info(f"🔍 Expenses: ₹{total_expenses}")
-        logger.info(f"🔍 Actual Savings: ₹{actual_savings}")
-        logger.info(f"🔍 20% Rule: ₹{fin.income * 0.2}")
-        logger.info(f"🔍 Should Recommend: ₹{max(actual_savings, fin.income * 0.2)}")
-
-        logger.info(f"🚀 Processing request with CrewAI Agentic System")
-        logger.info(f"   Income: {fin.income}, Expenses: {expenses}, Debt: {fin.debt}")
-
-        # CREWAI AGENTIC AI ORCHESTRATION
-        orchestrator = FinancialCrewOrchestrator()
-        
-        user_data = {
-            "income": fin.income,
-            "expenses": expenses,
-            "risk_level": fin.risk_level,
-            "debt": fin.debt or 0,
-            "savings_goal": fin.savings_goal or 0
-        }
-        
-        # CrewAI handles ALL agent coordination automatically
-        results = orchestrator.analyze_finances(user_data)
-        
-        # 🚨 CHECK FINAL RESULTS
-        if 'budget_plan' in results and 'recommended_monthly_savings' in results['budget_plan']:
-            logger.info(f"🎯 FINAL - Recommended Savings: ₹{results['budget_plan']['recommended_monthly_savings']}")
-        
-        logger.info("✅ CrewAI Agentic Analysis Completed!")
-        logger.info("   🤖 Budget Analyst → Investment Advisor → Debt Specialist → Expense Optimizer")
+        # Reuse a stored analysis for a near-identical profile (opt-in)
+        analysis_cache = get_analysis_cache()
+        if analysis_cache is not None:
+            cached = analysis_cache.get(user_data)
+            if cached is not None:
+                logger.info("Serving analysis from profile cache")
+                return cached
+
+        # CREWAI AGENTIC AI ORCHESTRATION, built once at startup
+        orchestrator = await get_orchestrator()
+        if orchestrator is None:
+            raise RuntimeError("CrewAI agents are not available")
         
+        # CrewAI handles ALL agent coordination automatically, off the event loop
+        results = await orchestration_executor.run(orchestrator.analyze_finances, user_data)
+        if analysis_cache is not None:
+            analysis_cache.set(user_data, results)
+
+        logger.debug("CrewAI analysis result: %s", results, extra=SAMPLED)
         return results
 
+    except QueueFullError as e:
+        raise server_busy(e)
     except Exception as e:
-        logger.error(f"❌ Error in CrewAI analysis: {e}")
+        logger.error("Error in CrewAI analysis: %s", e)
         # Fallback to direct function calls if CrewAI fails
         return await fallback_analysis(fin)
+
+def server_busy(e: QueueFullError) -> HTTPException:
+    logger.warning("Rejecting analysis, orchestrator queue is full", extra={"retry_after": e.retry_after})
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+@app.post("/analyze-finance/stream")
+async def analyze_stream(fin: FinanceInput):
+    """
+    Server-Sent Events variant of /analyze-finance.
+
+    Emits one event per section (budget_plan, investment_plan, debt_plan,
+    expense_optimizations, financial_health_score) as soon as its agent
+    finishes, then a "complete" event carrying the full result and the
+    request's token usage.
+    """
+    from agents.agent_runner import iter_analysis_async, monthly_investable
+
+    user_data = build_user_data(fin)
+    expenses = user_data["expenses"]
+    actual_savings = fin.income - sum(expenses.values())
+
+    async def events():
+        analysis_cache = get_analysis_cache()
+        cached = analysis_cache.get(user_data) if analysis_cache is not None else None
+        if cached is not None:
+            for section, value in cached.items():
+                if section != "crewai_used":
+                    yield sse_event(section, value)
+            yield sse_event("complete", cached)
+            return
+
+        results = {}
+        with deadline_scope(), usage_scope() as usage:
+            async for section, value in iter_analysis_async(
+                fin.income, expenses, fin.risk_level, fin.debt, fin.savings_goal,
+                monthly_investable(fin.income, expenses, fin.debt)
+            ):
+                results[section] = finalize_section(section, value, actual_savings)
+                yield sse_event(section, results[section])
+
+        results["crewai_used"] = False
+        if analysis_cache is not None:
+            analysis_cache.set(user_data, results)
+        yield sse_event("complete", {**results, "token_usage": usage.summary()})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json_codec.dumps_str(data)}\n\n"
+
+def finalize_section(section: str, value, actual_savings: float):
+    """Apply the corrections every response gets before it leaves the API"""
+    if section == "budget_plan":
+        value["recommended_monthly_savings"] = float(actual_savings)
+    elif section == "financial_health_score":
+        value = max(0, min(int(value) if isinstance(value, (int, float)) else 70, 100))
+    return value
+
+def build_user_data(fin: FinanceInput) -> dict:
+    """Plain dict of the request fields used by the orchestrator and caches"""
+    return {
+        "income": fin.income,
+        "expenses": dict(fin.expenses or {}),
+        "risk_level": fin.risk_level,
+        "debt": fin.debt or 0,
+        "savings_goal": fin.savings_goal or 0
+    }
+
 @app.get("/")
 async def root():
     return {"message": "Finance AI with CrewAI - Agentic System"}
 
-@app.get("/health")
+@app.get("/health", response_model=HealthStatus)
 async def health_check():
-    return {"status": "healthy", "crewai": "integrated"}
+    startup = getattr(app.state, "startup", None)
+    return {"status": "healthy", "crewai": "integrated", "ready": startup is not None and startup.done()}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus exposition of request, agent, Gemini and cache metrics"""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+@app.get("/stats")
+async def stats():
+    from agents.agent_runner import ANALYSIS_MODE
+    cache = get_llm_cache()
+    analysis_cache = get_analysis_cache()
+    return {
+        "analysis_mode": ANALYSIS_MODE,
+        "llm_cache": cache.stats() if cache is not None else None,
+        "analysis_cache": analysis_cache.stats() if analysis_cache is not None else None,
+        "analysis_etags": analysis_etags.stats(),
+        "coalescing": analysis_flight.stats(),
+        "orchestrator_executor": orchestration_executor.stats(),
+        "request_deadline_seconds": REQUEST_DEADLINE_SECONDS,
+        "gemini_circuit": gemini_circuit.stats(),
+        "gemini_limiter": gemini_limiter.stats(),
+        "request_token_budget": REQUEST_TOKEN_BUDGET or None,
+        "token_usage": usage_totals.summary(),
+        "gemini_cassette": get_cassette().stats(),
+    }
 
 @app.get("/test")
 async def test_endpoint():
@@ -86,43 +359,35 @@ async def test_endpoint():
 # FALLBACK - Only used if CrewAI fails
 async def fallback_analysis(fin: FinanceInput):
     """Fallback using direct agent calls if CrewAI fails"""
-    logger.info("🔄 CrewAI failed, using fallback analysis...")
+    logger.info("Using direct agent analysis")
     
     try:
-        from agents.budget_agent import analyze_budget
-        from agents.expenses_agent import optimize_expenses
-        from agents.investment_agent import suggest_investments
-        from agents.debt_agent import plan_debt_repayment
-        from agents.health_agent import financial_health_score
+        from agents.agent_runner import monthly_investable, run_analysis as run_agents
         
         expenses = dict(fin.expenses or {})
         total_expenses = sum(expenses.values())
         actual_savings = fin.income - total_expenses
         
-        # 🚨 DEBUG: Check what's happening
-        logger.info(f"🔍 FALLBACK DEBUG:")
-        logger.info(f"🔍 Income: ₹{fin.income}")
-        logger.info(f"🔍 Expenses: ₹{total_expenses}")
-        logger.info(f"🔍 Actual Savings: ₹{actual_savings}")
-        
-        # Call all agents
-        budget = analyze_budget(fin.income, expenses, fin.savings_goal)
-        expense_opts = optimize_expenses(expenses)  # ✅ Fixed variable name
-        invest = suggest_investments(fin.risk_level, actual_savings)  # ✅ Fixed variable name
-        debt_plan = plan_debt_repayment(fin.debt, fin.income)  # ✅ Fixed variable name
-        health = financial_health_score(fin.income, expenses, fin.debt, fin.savings_goal)
-        
-        # 🚨 DEBUG: Check what the budget agent returned
-        logger.info(f"🔍 Budget Agent Returned: ₹{budget.get('recommended_monthly_savings')}")
+        # Agents run concurrently, on the same bounded pool as the orchestrator,
+        # so admission control covers this path too
+        with tracer.start_as_current_span("fallback_analysis"):
+            results = await orchestration_executor.run(
+                run_agents, fin.income, expenses, fin.risk_level, fin.debt, fin.savings_goal,
+                monthly_investable(fin.income, expenses, fin.debt)
+            )
+        budget = results["budget_plan"]
+        expense_opts = results["expense_optimizations"]
+        invest = results["investment_plan"]
+        debt_plan = results["debt_plan"]
+        health = results["financial_health_score"]
         
-        # 🚨 FORCE THE CORRECT VALUE
-        budget["recommended_monthly_savings"] = float(actual_savings)
-        logger.info(f"🚨 FORCED CORRECTION: ₹{actual_savings}")
+        # The recommendation is always the actual savings
+        budget = finalize_section("budget_plan", budget, actual_savings)
         
         # Ensure health is between 0-100
-        health = max(0, min(int(health) if isinstance(health, (int, float)) else 70, 100))
+        health = finalize_section("financial_health_score", health, actual_savings)
         
-        return {
+        results = {
             "budget_plan": budget,
             "expense_optimizations": expense_opts,  # ✅ Now defined
             "investment_plan": invest,  # ✅ Now defined
@@ -131,8 +396,16 @@ async def fallback_analysis(fin: FinanceInput):
             "crewai_used": False
         }
         
+        analysis_cache = get_analysis_cache()
+        if analysis_cache is not None:
+            analysis_cache.set(build_user_data(fin), results)
+        
+        return results
+        
+    except QueueFullError as e:
+        raise server_busy(e)
     except Exception as e:
-        logger.error(f"❌ Fallback also failed: {e}")
+        logger.exception("Direct agent analysis failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
    
 # Add this for production deployment
@@ -0,0 +1,187 @@
+"""
+Prometheus metrics for the backend, served at GET /metrics.
+
+Hot-path signals (HTTP requests, agents, Gemini calls) are recorded as they
+happen. Everything that already keeps its own counters -- caches,
+coalescing, the orchestrator pool, the outbound limiter, the circuit
+breaker, token usage -- is read from its stats() at scrape time instead,
+so /stats and /metrics never disagree.
+"""
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Analyses take seconds, not milliseconds; the default buckets stop at 10 s
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 20, 30, 60)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to serve a request, until the last body byte",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served", ["route"])
+
+AGENT_SECONDS = Histogram(
+    "agent_duration_seconds", "Time for one agent to produce its section", ["agent"], buckets=LATENCY_BUCKETS,
+)
+# outcome: success, fallback (the agent used its rule-based answer), timeout, error, circuit_open
+AGENT_CALLS = Counter("agent_calls_total", "Agent invocations by outcome", ["agent", "outcome"])
+
+GEMINI_SECONDS = Histogram(
+    "gemini_request_duration_seconds", "Gemini call latency, including limiter wait and hedging",
+    ["outcome"], buckets=LATENCY_BUCKETS,
+)
+# outcome: success, cached, replayed, error, malformed, cancelled, circuit_open, budget_exceeded,
+# rate_limited (no local slot in time), deadline_exceeded (request deadline passed before sending)
+GEMINI_CALLS = Counter("gemini_calls_total", "Gemini calls by outcome", ["outcome"])
+
+_fallback_watch: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("fallback_watch", default=None)
+
+
+def marks_fallback(fn):
+    """Decorate a rule-based fallback so the agent call using it counts as a fallback"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        watch = _fallback_watch.get()
+        if watch is not None:
+            watch.append(fn.__name__)
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def fallback_watch():
+    """Yield a list that collects the fallbacks used inside the block"""
+    used = []
+    token = _fallback_watch.set(used)
+    try:
+        yield used
+    finally:
+        _fallback_watch.reset(token)
+
+
+def observe_agent(agent: str, outcome: str, seconds: Optional[float] = None) -> None:
+    AGENT_CALLS.labels(agent, outcome).inc()
+    if seconds is not None:
+        AGENT_SECONDS.labels(agent).observe(seconds)
+
+
+def observe_gemini(outcome: str, seconds: Optional[float] = None) -> None:
+    GEMINI_CALLS.labels(outcome).inc()
+    if seconds is not None:
+        GEMINI_SECONDS.labels(outcome).observe(seconds)
+
+
+class StatsCollector:
+    """
+    Exposes the numeric fields of existing stats() dicts at scrape time.
+
+    A source is a prefix, a function returning a dict (or None when the
+    component is disabled), and the keys that are monotonic counters;
+    every other number is reported as a gauge.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Tuple[Callable[[], Optional[dict]], frozenset]] = {}
+
+    def add(self, prefix: str, stats: Callable[[], Optional[dict]], counters: Iterable[str] = ()) -> None:
+        self._sources[prefix] = (stats, frozenset(counters))
+
+    def collect(self):
+        for prefix, (stats, counters) in self._sources.items():
+            values = stats()
+            if not values:
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                family = CounterMetricFamily(name, f"{key} ({prefix})") if key in counters \
+                    else GaugeMetricFamily(name, f"{key} ({prefix})")
+                family.add_metric([], value)
+                yield family
+
+
+_stats_collector = StatsCollector()
+REGISTRY.register(_stats_collector)
+register_stats = _stats_collector.add
+
+
+class TokenUsageCollector:
+    """Gemini tokens per agent from a token_usage.UsageLedger"""
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+
+    def collect(self):
+        summary = self.ledger.summary()
+        tokens = CounterMetricFamily("gemini_tokens", "Gemini tokens billed", labels=["agent", "kind"])
+        calls = CounterMetricFamily("gemini_token_calls", "Gemini calls with recorded usage",
+                                    labels=["agent", "source"])
+        for agent, entry in summary["agents"].items():
+            tokens.add_metric([agent, "prompt"], entry["prompt_tokens"])
+            tokens.add_metric([agent, "completion"], entry["completion_tokens"])
+            calls.add_metric([agent, "api"], entry["calls"] - entry["cached_calls"] - entry["estimated_calls"])
+            calls.add_metric([agent, "estimated"], entry["estimated_calls"])
+            calls.add_metric([agent, "cached"], entry["cached_calls"])
+        rejections = CounterMetricFamily("gemini_token_budget_rejections", "Calls refused by the token budget")
+        rejections.add_metric([], summary["budget_rejections"])
+        yield tokens
+        yield calls
+        yield rejections
+
+
+def _route_template(scope) -> str:
+    """Path template of the route that will serve the request, e.g. /analyze-finance"""
+    from starlette.routing import Match
+
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware timing every HTTP request per route template.
+
+    Timing ends when the response is complete, so streamed responses
+    (SSE, batch NDJSON) are measured to their last byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        route = _route_template(scope)
+        status = ["500"]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, status[0]).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Body and content type for GET /metrics"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
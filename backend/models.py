@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict, Optional, Any, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, Optional, Any, List, Union
 
 # Input model
 class FinanceInput(BaseModel):
@@ -9,10 +9,50 @@ class FinanceInput(BaseModel):
     risk_level: str = "medium"
     debt: Optional[float] = 0.0
 
-# Output model
-class FinanceOutput(BaseModel):
-    budget_plan: Dict[str, Any]
-    investment_plan: Dict[str, Any]
-    expense_optimizations: List[Dict[str, Any]]
-    debt_plan: Dict[str, Any]
-    health_score: int
+# Output models. Only fields the agents check (validate_*_structure) or
+# set themselves (parse_*) are typed; anything else Gemini writes stays
+# Any, so an odd answer reaches the client instead of failing response
+# validation. Extra keys are passed through as they are.
+class Section(BaseModel):
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+class BudgetPlan(Section):
+    current_allocation: Dict[str, Any]
+    recommended_allocation_50_30_20: Any
+    recommended_monthly_savings: Union[int, float]
+    tips: List[Any]
+
+class PortfolioItem(Section):
+    asset: Any
+    allocation: Any = Field(alias="allocation%")
+    amount: Any
+    notes: Any
+
+class InvestmentPlan(Section):
+    portfolio: List[PortfolioItem]
+    important_considerations: List[Any]
+
+class ExpenseOptimization(Section):
+    action: Any
+    estimated_savings: Any
+    reason: Any
+
+class DebtPlan(Section):
+    status: Any
+    recommended_strategy: Any
+    estimated_months_to_clear: Union[int, float]
+
+class FinanceOutput(Section):
+    budget_plan: BudgetPlan
+    investment_plan: InvestmentPlan
+    expense_optimizations: List[ExpenseOptimization]
+    debt_plan: DebtPlan
+    financial_health_score: int
+    crewai_used: Optional[bool] = None
+    # Gemini tokens spent on this request, per agent (token_usage.py)
+    token_usage: Optional[Dict[str, Any]] = None
+
+class HealthStatus(BaseModel):
+    status: str
+    crewai: str
+    ready: bool
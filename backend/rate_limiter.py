@@ -0,0 +1,263 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+# Quotas of the Gemini project; 0 disables that bucket
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "1000"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+# Adaptive concurrency: starts at the initial cap and moves between min and max
+GEMINI_MIN_CONCURRENCY = int(os.getenv("GEMINI_MIN_CONCURRENCY", "1"))
+GEMINI_INITIAL_CONCURRENCY = int(os.getenv("GEMINI_INITIAL_CONCURRENCY", "8"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+# Calls slower than this count as congestion and shrink the cap
+GEMINI_LATENCY_TARGET_SECONDS = float(os.getenv("GEMINI_LATENCY_TARGET_SECONDS", "8"))
+# Output tokens reserved per call until the real usage is known
+GEMINI_EXPECTED_OUTPUT_TOKENS = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "512"))
+
+# Lower value = served first
+INTERACTIVE = 0
+BATCH = 1
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority_scope(priority: int):
+    """Queue the Gemini calls made inside the block at ``priority``"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough token count for a prompt plus its expected answer (~4 characters per token)"""
+    return len(prompt) // 4 + GEMINI_EXPECTED_OUTPUT_TOKENS
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether an API error is a quota rejection (HTTP 429 / RESOURCE_EXHAUSTED)"""
+    return (
+        getattr(error, "code", None) == 429
+        or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+        or "429" in str(error)
+    )
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no call slot became free before the caller's timeout"""
+
+
+class TokenBucket:
+    """Refills at ``per_minute / 60`` per second up to ``per_minute``; not thread-safe on its own"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available (after refill)"""
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= amount
+
+
+class Permit:
+    """A granted call slot, handed back through OutboundLimiter.release"""
+
+    __slots__ = ("tokens", "granted", "cancelled", "_wake")
+
+    def __init__(self, tokens: int, wake):
+        self.tokens = tokens
+        self.granted = False
+        self.cancelled = False
+        self._wake = wake
+
+
+class OutboundLimiter:
+    """
+    Shared admission control for outbound LLM calls.
+
+    A call is admitted when fewer than ``limit`` calls are in flight and
+    both token buckets (requests and tokens per minute) can cover it.
+    Callers that cannot be admitted wait in a priority queue, so
+    interactive requests overtake batch work; within a priority, order is
+    first come, first served.
+
+    The concurrency cap adapts AIMD-style: it grows by about one per
+    ``limit`` successful calls under the latency target, and is halved on
+    a 429 (which also empties the request bucket) or cut by 10% when a
+    call is slower than the target. Works from threads and from any event
+    loop at the same time.
+    """
+
+    def __init__(self, rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM,
+                 min_concurrency: int = GEMINI_MIN_CONCURRENCY,
+                 initial_concurrency: int = GEMINI_INITIAL_CONCURRENCY,
+                 max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+                 latency_target: float = GEMINI_LATENCY_TARGET_SECONDS):
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.latency_target = latency_target
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._lock = threading.Lock()
+        self._queue = []  # (priority, sequence, permit)
+        self._sequence = itertools.count()
+        self._timer: Optional[threading.Timer] = None
+        self._in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.timed_out = 0
+
+    def acquire(self, tokens: int, timeout: float, priority: Optional[int] = None) -> Permit:
+        """Block until a slot is granted, or raise RateLimitTimeout"""
+        event = threading.Event()
+        permit = self._enqueue(tokens, priority, event.set)
+        if not event.wait(timeout):
+            self._abandon(permit)
+        return permit
+
+    async def acquire_async(self, tokens: int, timeout: float, priority: Optional[int] = None) -> Permit:
+        """Event-loop counterpart of acquire"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        permit = self._enqueue(tokens, priority, wake)
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(permit)
+        except asyncio.CancelledError:
+            with self._lock:
+                permit.cancelled = True
+                if permit.granted:
+                    self._finish(permit)
+            raise
+        return permit
+
+    def release(self, permit: Permit, latency: float, error: Optional[BaseException] = None,
+                actual_tokens: Optional[int] = None) -> None:
+        """Hand a slot back and adapt the cap to how the call went"""
+        with self._lock:
+            if self._tokens is not None and actual_tokens is not None:
+                # Settle the estimate against the real usage (refund or charge)
+                self._tokens.consume(actual_tokens - permit.tokens)
+
+            if error is not None and is_rate_limited(error):
+                self.rate_limited += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                if self._requests is not None:
+                    self._requests.tokens = 0.0
+            elif latency > self.latency_target:
+                self.limit = max(float(self.min_concurrency), self.limit * 0.9)
+            elif error is None:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._finish(permit)
+
+    def _enqueue(self, tokens: int, priority: Optional[int], wake) -> Permit:
+        permit = Permit(tokens, wake)
+        with self._lock:
+            priority = current_priority() if priority is None else priority
+            heapq.heappush(self._queue, (priority, next(self._sequence), permit))
+            self._dispatch()
+        return permit
+
+    def _abandon(self, permit: Permit) -> None:
+        with self._lock:
+            if permit.granted:
+                # Granted just as the wait ran out: keep the slot
+                return
+            permit.cancelled = True
+            self.timed_out += 1
+        raise RateLimitTimeout("No Gemini call slot became free in time")
+
+    def _finish(self, permit: Permit) -> None:
+        # Caller holds the lock
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        # Caller holds the lock: admit waiters in priority order while there is room
+        now = time.monotonic()
+        for bucket in (self._requests, self._tokens):
+            if bucket is not None:
+                bucket.refill(now)
+
+        while self._queue:
+            permit = self._queue[0][2]
+            if permit.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if self._in_flight >= int(self.limit):
+                return
+            wait = max(
+                self._requests.time_until(1) if self._requests is not None else 0.0,
+                self._tokens.time_until(permit.tokens) if self._tokens is not None else 0.0,
+            )
+            if wait > 0:
+                self._schedule(wait)
+                return
+
+            heapq.heappop(self._queue)
+            if self._requests is not None:
+                self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(permit.tokens)
+            self._in_flight += 1
+            self.admitted += 1
+            permit.granted = True
+            permit._wake()
+
+    def _schedule(self, delay: float) -> None:
+        # Caller holds the lock: dispatch again once the buckets have refilled
+        if self._timer is not None and self._timer.is_alive():
+            return
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def stats(self) -> dict:
+        with self._lock:
+            waiting = [priority for priority, _, permit in self._queue if not permit.cancelled]
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "waiting_interactive": waiting.count(INTERACTIVE),
+                "waiting_batch": waiting.count(BATCH),
+                "request_tokens": round(self._requests.tokens, 1) if self._requests is not None else None,
+                "token_bucket": round(self._tokens.tokens) if self._tokens is not None else None,
+                "admitted": self.admitted,
+                "rate_limited": self.rate_limited,
+                "timed_out": self.timed_out,
+            }
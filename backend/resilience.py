@@ -0,0 +1,258 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+# Whole-request budget; kept under the Flask frontend's 30 s client timeout
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "10"))
+CIRCUIT_SLOW_RATE = float(os.getenv("CIRCUIT_SLOW_RATE", "0.5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+HEDGE_ENABLED = os.getenv("GEMINI_HEDGE_ENABLED", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", "20"))
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("GEMINI_HEDGE_POOL_SIZE", "8")), thread_name_prefix="hedge")
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the request deadline has passed before a call could start"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+@contextmanager
+def deadline_scope(seconds: float = REQUEST_DEADLINE_SECONDS):
+    """
+    Set the deadline for everything called inside the block.
+
+    The deadline lives in a context variable, so it follows the request
+    into tasks and into executor threads that copy the context. A nested
+    scope can only shorten an outer deadline, never extend it.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None outside a deadline scope"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bounded_timeout(timeout: float) -> float:
+    """``timeout`` shortened to what is left of the current deadline"""
+    remaining = time_remaining()
+    return timeout if remaining is None else max(0.0, min(timeout, remaining))
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency that is failing or slow.
+
+    Outcomes of the calls in the last ``window`` seconds are kept. Once at
+    least ``min_calls`` are recorded and the share of errors or of calls
+    slower than ``slow_call_seconds`` reaches its threshold, the circuit
+    opens and allow() returns False for ``open_seconds``. After that a
+    single probe call is let through (half-open): success closes the
+    circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: float = CIRCUIT_WINDOW_SECONDS, min_calls: int = CIRCUIT_MIN_CALLS,
+                 error_rate: float = CIRCUIT_ERROR_RATE, slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS,
+                 slow_rate: float = CIRCUIT_SLOW_RATE, open_seconds: float = CIRCUIT_OPEN_SECONDS):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._calls = deque()  # (timestamp, failed, slow)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _refresh(self, now: float) -> None:
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    def _open(self, now: float) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.times_opened += 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def is_open(self) -> bool:
+        """True while calls are being refused outright"""
+        return self.state == self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; every allowed call must be recorded or released"""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success: bool, duration: float) -> None:
+        """Record the outcome of an allowed call"""
+        now = time.monotonic()
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if success and not slow:
+                    self._state = self.CLOSED
+                else:
+                    self._open(now)
+                return
+            if self._state == self.OPEN:
+                # Straggler from before the circuit opened
+                return
+
+            self._calls.append((now, not success, slow))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, was_slow in self._calls if was_slow)
+            if failures / len(self._calls) >= self.error_rate or slow_calls / len(self._calls) >= self.slow_rate:
+                self._open(now)
+
+    def release(self) -> None:
+        """An allowed call ended without a verdict on the dependency (never sent, or abandoned)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return {
+                "state": self._state,
+                "recent_calls": len(self._calls),
+                "recent_failures": sum(1 for _, failed, _ in self._calls if failed),
+                "recent_slow_calls": sum(1 for _, _, slow in self._calls if slow),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class LatencyTracker:
+    """Recent call durations, for choosing the hedge delay"""
+
+    def __init__(self, size: int = 200, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile, or None until enough samples are recorded"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def hedge_delay(latencies: LatencyTracker, timeout: float) -> Optional[float]:
+    """How long to wait before a hedged second attempt; None for no hedge"""
+    if not HEDGE_ENABLED:
+        return None
+    delay = latencies.percentile(HEDGE_PERCENTILE)
+    if delay is None or delay >= timeout:
+        return None
+    return delay
+
+
+def hedged_call(fn: Callable[[], Any], delay: float, timeout: float) -> Any:
+    """
+    Call ``fn`` and, if it has not returned after ``delay`` seconds, call it
+    again in parallel; the first attempt to succeed wins.
+
+    The losing attempt cannot be interrupted and finishes in the
+    background, bounded by its own request timeout.
+    """
+    start = time.monotonic()
+    pending = {_hedge_pool.submit(contextvars.copy_context().run, fn)}
+    done, pending = wait(pending, timeout=delay)
+    if not done:
+        pending.add(_hedge_pool.submit(contextvars.copy_context().run, fn))
+
+    error = None
+    while True:
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        if not pending:
+            raise error
+        remaining = timeout - (time.monotonic() - start)
+        if remaining <= 0:
+            raise TimeoutError(f"No attempt finished within {timeout:.1f}s")
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+
+async def hedged_call_async(make_call: Callable[[], Awaitable[Any]], delay: float) -> Any:
+    """Event-loop counterpart of hedged_call; the losing attempt is cancelled"""
+    pending = {asyncio.ensure_future(make_call())}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            pending.add(asyncio.ensure_future(make_call()))
+
+        error = None
+        while True:
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            if not pending:
+                raise error
+            done, pending = await asyncio.wait(pending, return_when=FIRST_COMPLETED)
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,62 @@
+import copy
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the work; callers that arrive while it
+    is still in flight wait for the same result instead of starting their
+    own. Each follower receives a deep copy so callers cannot mutate each
+    other's results. The work runs in its own task: a caller that is
+    cancelled stops waiting, and the work is cancelled only once no caller
+    is left. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "_Call"] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._inflight.get(key)
+        leader = call is None
+        if leader:
+            # A task of its own, so that the caller that started the work
+            # going away does not cancel it for everyone else
+            call = _Call(asyncio.ensure_future(fn()))
+            self._inflight[key] = call
+            call.task.add_done_callback(lambda task: self._inflight.pop(key, None))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Everyone who wanted the result went away
+                call.task.cancel()
+        # Followers get their own copy; the leader keeps the original
+        return result if leader else copy.deepcopy(result)
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+class _Call:
+    """One execution in flight and the number of callers awaiting it"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
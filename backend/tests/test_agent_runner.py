@@ -0,0 +1,57 @@
+"""
+run_agents_concurrently under a request deadline shorter than the agent timeout.
+
+Run from the backend directory:
+
+    python -m unittest discover tests
+"""
+import time
+import unittest
+
+from agents.agent_runner import AgentCall, run_agents_concurrently
+from resilience import deadline_scope
+
+
+def sleeper(seconds: float):
+    def answer(section: str):
+        time.sleep(seconds)
+        return section
+    answer.__name__ = f"sleep_{seconds}"
+    return answer
+
+
+def fallback(section: str):
+    return f"{section} fallback"
+
+
+def calls(**seconds):
+    return {
+        section: AgentCall(sleeper(delay), None, (section,), fallback, (section,))
+        for section, delay in seconds.items()
+    }
+
+
+class RequestDeadlineTest(unittest.TestCase):
+
+    def test_agents_share_the_request_deadline(self):
+        # Each agent may run until the request deadline, not until the time
+        # left when the previous agent's result was collected
+        with deadline_scope(0.6):
+            results = run_agents_concurrently(calls(first=0.2, second=0.35, third=0.45), timeout=10)
+        self.assertEqual(results, {"first": "first", "second": "second", "third": "third"})
+
+    def test_agent_past_the_request_deadline_falls_back(self):
+        start = time.monotonic()
+        with deadline_scope(0.3):
+            results = run_agents_concurrently(calls(first=0.1, slow=1.0), timeout=10)
+        self.assertEqual(results, {"first": "first", "slow": "slow fallback"})
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_agent_timeout_shorter_than_the_request_deadline(self):
+        with deadline_scope(5):
+            results = run_agents_concurrently(calls(first=0.1, slow=1.0), timeout=10, timeouts={"slow": 0.3})
+        self.assertEqual(results, {"first": "first", "slow": "slow fallback"})
+
+
+if __name__ == "__main__":
+    unittest.main()
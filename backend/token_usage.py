@@ -0,0 +1,170 @@
+import os
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Most tokens (prompt + completion) one analysis request may spend; 0 = no limit
+REQUEST_TOKEN_BUDGET = int(os.getenv("REQUEST_TOKEN_BUDGET", "0"))
+
+_request_usage: contextvars.ContextVar[Optional["UsageLedger"]] = contextvars.ContextVar("request_usage", default=None)
+_agent: contextvars.ContextVar[str] = contextvars.ContextVar("agent", default="other")
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised instead of a Gemini call that would overrun the request's token budget"""
+
+
+class UsageLedger:
+    """
+    Token counts per agent, safe to update from several threads.
+
+    Used once per request (the agents of one analysis) and once for the
+    whole process (totals for /stats).
+    """
+
+    def __init__(self, budget: int = 0):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict[str, int]] = {}
+        # Estimates of the calls admitted by reserve() and not yet recorded
+        self.reserved = 0
+        self.budget_rejections = 0
+
+    def _entry(self, agent: str) -> Dict[str, int]:
+        entry = self._agents.get(agent)
+        if entry is None:
+            entry = {"prompt_tokens": 0, "completion_tokens": 0, "calls": 0, "cached_calls": 0, "estimated_calls": 0}
+            self._agents[agent] = entry
+        return entry
+
+    def add(self, agent: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+            cached: bool = False, estimated: bool = False, reserved: int = 0) -> None:
+        """Record one call; ``reserved`` is the estimate it was admitted with, now settled"""
+        with self._lock:
+            self.reserved = max(0, self.reserved - reserved)
+            entry = self._entry(agent)
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["calls"] += 1
+            entry["cached_calls"] += int(cached)
+            entry["estimated_calls"] += int(estimated)
+
+    def note_rejection(self) -> None:
+        with self._lock:
+            self.budget_rejections += 1
+
+    @property
+    def total_tokens(self) -> int:
+        with self._lock:
+            return self._spent()
+
+    def _spent(self) -> int:
+        return sum(e["prompt_tokens"] + e["completion_tokens"] for e in self._agents.values())
+
+    def reserve(self, tokens: int) -> int:
+        """
+        Hold about ``tokens`` of the budget for a call, or refuse it.
+
+        Calls that start together each see what the others have reserved,
+        so they cannot all pass on the same remaining budget. Returns the
+        amount held, to be settled by add(reserved=...) or release().
+        """
+        if self.budget <= 0:
+            return 0
+        with self._lock:
+            spent = self._spent()
+            if spent + self.reserved + tokens > self.budget:
+                self.budget_rejections += 1
+                raise TokenBudgetExceeded(
+                    f"Token budget of {self.budget} would be exceeded "
+                    f"({spent} spent, {self.reserved} reserved, ~{tokens} needed)"
+                )
+            self.reserved += tokens
+            return tokens
+
+    def release(self, tokens: int) -> None:
+        """Give back a reservation whose call was not made or failed"""
+        with self._lock:
+            self.reserved = max(0, self.reserved - tokens)
+
+    def summary(self) -> dict:
+        with self._lock:
+            agents = {agent: dict(entry) for agent, entry in self._agents.items()}
+        prompt_tokens = sum(e["prompt_tokens"] for e in agents.values())
+        completion_tokens = sum(e["completion_tokens"] for e in agents.values())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "calls": sum(e["calls"] for e in agents.values()),
+            "cached_calls": sum(e["cached_calls"] for e in agents.values()),
+            "budget": self.budget or None,
+            "budget_rejections": self.budget_rejections,
+            "agents": agents,
+        }
+
+
+# Everything spent since the process started
+usage_totals = UsageLedger()
+
+
+@contextmanager
+def usage_scope(budget: int = REQUEST_TOKEN_BUDGET):
+    """Collect the token usage of everything called inside the block"""
+    ledger = UsageLedger(budget)
+    token = _request_usage.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _request_usage.reset(token)
+
+
+@contextmanager
+def agent_scope(agent: str):
+    """Attribute Gemini calls made inside the block to ``agent``"""
+    token = _agent.set(agent)
+    try:
+        yield
+    finally:
+        _agent.reset(token)
+
+
+def run_as_agent(agent: str, fn, *args):
+    """Call fn(*args) with its Gemini usage attributed to ``agent``"""
+    with agent_scope(agent):
+        return fn(*args)
+
+
+def current_agent() -> str:
+    """Agent the current Gemini calls are attributed to"""
+    return _agent.get()
+
+
+def reserve_tokens(tokens: int) -> int:
+    """Hold budget of the current request for a call; see UsageLedger.reserve"""
+    ledger = _request_usage.get()
+    if ledger is None:
+        return 0
+    try:
+        return ledger.reserve(tokens)
+    except TokenBudgetExceeded:
+        usage_totals.note_rejection()
+        raise
+
+
+def release_tokens(reserved: int) -> None:
+    """Give back what reserve_tokens held when the call is not recorded"""
+    ledger = _request_usage.get()
+    if ledger is not None and reserved:
+        ledger.release(reserved)
+
+
+def record_usage(prompt_tokens: int = 0, completion_tokens: int = 0,
+                 cached: bool = False, estimated: bool = False, reserved: int = 0) -> None:
+    """Add one call to the current request and to the process totals, settling its reservation"""
+    agent = _agent.get()
+    usage_totals.add(agent, prompt_tokens, completion_tokens, cached, estimated)
+    ledger = _request_usage.get()
+    if ledger is not None:
+        ledger.add(agent, prompt_tokens, completion_tokens, cached, estimated, reserved)
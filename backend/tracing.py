@@ -0,0 +1,143 @@
+"""
+OpenTelemetry tracing for the backend.
+
+Spans cover the HTTP handler, the orchestrator, crew.kickoff(), every
+agent and every Gemini call. The incoming W3C ``traceparent`` header is
+honoured, so a request relayed by the Flask frontend continues the
+frontend's trace. Context travels into worker threads with the rest of
+the request-scoped context variables.
+
+With TRACING_EXPORTER unset (or "none") only the OpenTelemetry API is
+loaded and every span is a no-op. Print one trace from a span file with
+
+    python -m tracing traces.jsonl [trace_id]
+"""
+import os
+import sys
+import json
+from datetime import datetime
+from typing import Optional
+
+from opentelemetry import trace
+from opentelemetry.propagate import extract
+
+# none, file (JSON lines in TRACING_FILE), console, or otlp (OTEL_EXPORTER_OTLP_ENDPOINT, default localhost:4318)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").strip().lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+
+tracer = trace.get_tracer("finance-backend")
+
+
+def setup_tracing(service_name: str, exporter: str = TRACING_EXPORTER, path: str = TRACING_FILE) -> bool:
+    """Install the SDK tracer provider for ``exporter``; False when tracing is off"""
+    if exporter in ("", "none"):
+        return False
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if exporter == "file":
+        span_exporter = ConsoleSpanExporter(
+            out=open(path, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    elif exporter == "console":
+        span_exporter = ConsoleSpanExporter()
+    elif exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        span_exporter = OTLPSpanExporter()
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER {exporter!r}")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(provider)
+    return True
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span per HTTP request.
+
+    The span continues the caller's trace when a ``traceparent`` header is
+    present, and ends with the response, so streamed responses are
+    covered to their last byte. Nothing is added when the framework has
+    already opened one.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or trace.get_current_span().is_recording():
+            # Recent FastAPI versions open the server span themselves
+            return await self.app(scope, receive, send)
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", ())}
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}", context=extract(headers), kind=trace.SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(trace.StatusCode.ERROR)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # The router has filled in the matched route by now
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.set_attribute("http.route", route)
+                    span.update_name(f"{method} {route}")
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def print_trace(path: str, trace_id: Optional[str] = None, out=sys.stdout) -> None:
+    """Print the span tree of one trace (default: the most recent) with durations"""
+    with open(path, encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    if not spans:
+        raise SystemExit(f"No spans in {path}")
+    if trace_id is None:
+        trace_id = max(spans, key=lambda span: span["end_time"])["context"]["trace_id"]
+    elif not trace_id.startswith("0x"):
+        trace_id = "0x" + trace_id
+
+    spans = [span for span in spans if span["context"]["trace_id"] == trace_id]
+    if not spans:
+        raise SystemExit(f"Trace {trace_id} not found in {path}")
+    span_ids = {span["context"]["span_id"] for span in spans}
+    children = {}
+    for span in spans:
+        parent = span["parent_id"] if span["parent_id"] in span_ids else None
+        children.setdefault(parent, []).append(span)
+    trace_start = min(_parse_time(span["start_time"]) for span in spans)
+
+    def show(span, depth):
+        start = _parse_time(span["start_time"])
+        duration_ms = (_parse_time(span["end_time"]) - start).total_seconds() * 1000
+        offset_ms = (start - trace_start).total_seconds() * 1000
+        service = span.get("resource", {}).get("attributes", {}).get("service.name", "")
+        error = "  ERROR" if span["status"]["status_code"] == "ERROR" else ""
+        print(f"{offset_ms:9.1f} ms {duration_ms:9.1f} ms  {'  ' * depth}{span['name']}  [{service}]{error}", file=out)
+        for child in sorted(children.get(span["context"]["span_id"], []), key=lambda s: s["start_time"]):
+            show(child, depth + 1)
+
+    print(f"trace {trace_id}  (start offset, duration)", file=out)
+    for root in sorted(children.get(None, []), key=lambda s: s["start_time"]):
+        show(root, 0)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        raise SystemExit("usage: python -m tracing SPAN_FILE [TRACE_ID]")
+    print_trace(*sys.argv[1:])
@@ -1,12 +1,32 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 import requests
 import os
-import json
+import logging
+import backend_client
+from backend_client import BACKEND_URL
+from metrics import count_fallback, init_metrics, observe_backend, register_stats
+from result_cache import payload_key, result_cache
+from tracing import init_tracing, setup_tracing, trace_headers
+from logging_setup import SAMPLED, setup_logging
+from json_provider import ORJSONProvider
+
+# JSON lines written by a background thread; see logging_setup.py
+setup_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# jsonify() and request parsing through orjson; see json_provider.py
+app.json = ORJSONProvider(app)
+init_metrics(app)
+register_stats("backend_pool", backend_client.stats,
+               counters=("requests", "http_requests", "connections_opened", "retries", "sessions"))
+if result_cache is not None:
+    register_stats("result_cache", result_cache.stats, counters=("lookups", "revalidated", "stale", "evictions"))
+setup_tracing(os.environ.get("OTEL_SERVICE_NAME", "finance-frontend"))
+init_tracing(app)
 
-# Use environment variable for backend URL (Render will set this)
-BACKEND_URL = os.environ.get('BACKEND_URL', 'http://localhost:8000')
+# The backend answers in the browser's schema and its bytes are relayed as is
+FRONTEND_PASSTHROUGH = os.environ.get('FRONTEND_PASSTHROUGH', '0') == '1'
 
 @app.route('/')
 def index():
@@ -21,61 +41,71 @@ def analyze_finances():
         if not data:
             return jsonify({"success": False, "error": "No data received"})
         
-        print(f"📨 Frontend received data: {data}")
+        # Formatted only when DEBUG is on and the line is sampled
+        logger.debug("Frontend received data: %s", data, extra=SAMPLED)
 
-        # Extract data with CORRECT field names (matching your frontend HTML)
-        income = float(data.get('income', 0))
-        expenses_dict = data.get('expenses', {})  # Frontend now sends as dictionary
-        risk_level = data.get('risk_level', 'Medium')  # Note: frontend sends 'risk_level'
-        debt = float(data.get('debt', 0))  # Note: frontend sends 'debt'
+        # Clients that accept SSE get each section relayed as it is produced
+        if request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', ''):
+            return relay_analysis_stream(data)
 
-        print(f"💰 Parsed - Income: {income}, Expenses: {expenses_dict}, Risk: {risk_level}, Debt: {debt}")
+        if FRONTEND_PASSTHROUGH:
+            return relay_analysis(data)
 
-        # Prepare data for backend in the expected format
-        payload = {
-            "income": income,
-            "expenses": expenses_dict,  # Already a dictionary from frontend
-            "risk_level": risk_level,
-            "debt": debt
-        }
-        
-        print(f"📤 Sending to backend {BACKEND_URL}/analyze-finance")
-        print(f"📦 Payload: {payload}")
-        
-        # Call backend with timeout
-        response = requests.post(
-            f"{BACKEND_URL}/analyze-finance",
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
+        # Same payload, and so the same cache key, as the relay paths
+        payload = build_backend_payload(data)
         
-        print(f"📥 Backend response status: {response.status_code}")
+        # A stored analysis of the same payload is revalidated instead of re-sent
+        headers = {"Content-Type": "application/json"}
+        cache_key = payload_key(payload)
+        cached = result_cache.get(cache_key) if result_cache is not None else None
+        if cached is not None:
+            headers["If-None-Match"] = cached.etag
+
+        # Call backend over the shared keep-alive pool (connect/read timeouts, retries)
+        with observe_backend("/analyze-finance") as call:
+            # The backend builds the browser's schema (backend/frontend_schema.py)
+            response = backend_client.post(
+                "/analyze-finance",
+                params={"view": "frontend"},
+                json=payload,
+                headers=trace_headers(headers)
+            )
+            call["status"] = response.status_code
         
+        if response.status_code == 304 and cached is not None:
+            logger.debug("Backend confirmed the cached analysis")
+            result_cache.note_revalidated()
+            return jsonify({
+                "success": True,
+                "results": cached.results
+            })
+
         if response.status_code == 200:
-            backend_data = response.json()
-            print("✅ Backend analysis successful!")
-            print(f"📊 Backend response: {backend_data}")
+            backend_data = app.json.loads(response.content)
+            logger.debug("Backend response: %s", backend_data, extra=SAMPLED)
             
             # Check if backend returned a proper analysis or an error
-            if backend_data and isinstance(backend_data, dict) and not backend_data.get('error'):
-                # Transform backend response to match frontend expectations
-                results = transform_backend_response(backend_data, income, expenses_dict, debt)
+            if backend_data and isinstance(backend_data, dict) and backend_data.get('results'):
+                results = backend_data['results']
+                etag = response.headers.get("ETag")
+                if result_cache is not None and etag:
+                    if cached is not None:
+                        result_cache.note_stale()
+                    result_cache.set(cache_key, etag, results=results)
             else:
                 # Backend returned error or invalid data, use fallback
-                print("⚠️ Backend returned error, using fallback analysis")
+                logger.warning("Backend returned an error, using fallback analysis")
+                count_fallback("backend_invalid")
                 results = generate_fallback_analysis(data)
             
-            print(f"🎯 Sending results to frontend: {results}")
-            
             return jsonify({
                 "success": True, 
                 "results": results  # Frontend expects "results" not "data"
             })
         else:
-            error_msg = f"Backend error: {response.status_code} - {response.text}"
-            print(f"❌ {error_msg}")
+            logger.warning("Backend error %s: %s", response.status_code, response.text)
             # Use fallback analysis when backend fails
+            count_fallback("backend_status")
             fallback_results = generate_fallback_analysis(data)
             return jsonify({
                 "success": True,
@@ -83,148 +113,140 @@ def analyze_finances():
             })
             
     except requests.exceptions.ConnectionError:
-        error_msg = f"Cannot connect to backend at {BACKEND_URL}"
-        print(f"❌ {error_msg}")
+        logger.error("Cannot connect to backend at %s", BACKEND_URL)
         # Generate fallback analysis that matches frontend structure
+        count_fallback("connection_error")
         fallback_results = generate_fallback_analysis(data)
-        print(f"🔄 Using fallback results: {fallback_results}")
         return jsonify({
             "success": True,  # Still success for fallback
             "results": fallback_results  # Frontend expects "results"
         })
     except Exception as e:
-        error_msg = f"Unexpected error: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.exception("Unexpected error: %s", e)
         # Even on unexpected errors, provide fallback analysis
+        count_fallback("unexpected_error")
         fallback_results = generate_fallback_analysis(data if 'data' in locals() else {})
         return jsonify({
             "success": True,
             "results": fallback_results
         })
 
-def transform_backend_response(backend_data, income, expenses_dict, debt):
-    """Transform backend response to match frontend expected structure"""
-    
-    # Calculate total expenses and ACTUAL SAVINGS
-    total_expenses = sum(expenses_dict.values()) if expenses_dict else 0
-    actual_savings = income - total_expenses
-    savings_rate = (actual_savings / income) * 100 if income > 0 else 0
-    
-    print(f"🔍 TRANSFORM DEBUG - Income: ₹{income}, Expenses: ₹{total_expenses}, Savings: ₹{actual_savings} ({savings_rate:.1f}%)")
-    
-    # Use backend calculations if available, otherwise calculate properly
-    needs_percentage = backend_data.get('needs_percentage')
-    wants_percentage = backend_data.get('wants_percentage') 
-    savings_percentage = backend_data.get('savings_percentage')
-    
-    # If backend didn't provide allocation percentages, calculate them
-    if needs_percentage is None or wants_percentage is None or savings_percentage is None:
-        if income > 0:
-            # Calculate based on actual expenses vs income
-            savings_percentage = min(100, max(0, ((income - total_expenses) / income) * 100))
-            needs_percentage = min(100 - savings_percentage, (total_expenses / income) * 100)
-            wants_percentage = max(0, 100 - needs_percentage - savings_percentage)
-        else:
-            needs_percentage = 50
-            wants_percentage = 30
-            savings_percentage = 20
-    
-    # 🎯 KEY FIX: Use ACTUAL savings, not 20% rule
-    recommended_savings = backend_data.get('recommended_monthly_savings', actual_savings)
-    
-    # Smart tips based on actual savings rate
-    if savings_rate > 50:
-        backend_tips = [
-            f"Exceptional! You're saving {savings_rate:.1f}% of your income (₹{actual_savings:,.0f})",
-            "Consider investing your substantial savings for better returns",
-            "You're saving much more than the typical 20% target"
-        ]
-    elif savings_rate >= 20:
-        backend_tips = [
-            f"Good job! You're saving {savings_rate:.1f}% of your income",
-            "You're meeting or exceeding savings goals",
-            "Consider automating your investments"
-        ]
-    else:
-        backend_tips = [
-            f"Current savings: {savings_rate:.1f}% (₹{actual_savings:,.0f})",
-            "Aim to increase savings gradually",
-            "Review expenses for optimization opportunities"
-        ]
-    
-    # Create the structure your frontend expects
-    results = {
-        "budget_plan": {
-            "current_allocation": {
-                "needs_percentage": round(needs_percentage, 1),
-                "wants_percentage": round(wants_percentage, 1),
-                "savings_percentage": round(savings_percentage, 1)
-            },
-            "recommended_allocation_50_30_20": {
-                "needs": 50,
-                "wants": 30,
-                "savings": 20
-            },
-            "recommended_monthly_savings": recommended_savings,  # 🎯 This will be correct now
-            "tips": backend_tips
-        },
-        "investment_plan": {
-            "portfolio": backend_data.get('portfolio', [
-                {
-                    "asset": "Emergency Fund",
-                    "allocation%": 20,
-                    "amount": total_expenses * 4,  # 4 months expenses
-                    "notes": "Liquid cash for emergencies"
-                },
-                {
-                    "asset": "Index Funds",
-                    "allocation%": 40,
-                    "amount": recommended_savings * 0.4,  # Based on ACTUAL savings
-                    "notes": "Diversified stock market investment"
-                },
-                {
-                    "asset": "Bonds",
-                    "allocation%": 30,
-                    "amount": recommended_savings * 0.3,  # Based on ACTUAL savings
-                    "notes": "Fixed income for stability"
-                },
-                {
-                    "asset": "Real Estate",
-                    "allocation%": 10,
-                    "amount": recommended_savings * 0.1,  # Based on ACTUAL savings
-                    "notes": "Real estate investment trusts"
-                }
-            ]),
-            "important_considerations": backend_data.get('important_considerations', [
-                'Consult with a financial advisor',
-                'Consider your risk tolerance when investing'
-            ])
-        },
-        "expense_optimizations": backend_data.get('expense_optimizations', [
-            {
-                "action": "Review monthly subscriptions",
-                "estimated_savings": total_expenses * 0.1,
-                "reason": "Potential 10% savings from unused services"
-            },
-            {
-                "action": "Reduce dining out",
-                "estimated_savings": total_expenses * 0.05,
-                "reason": "Cook more meals at home to save money"
-            }
-        ]),
-        "debt_plan": {
-            "status": backend_data.get('debt_plan', {}).get('status', 'Excellent - Debt Free!' if debt == 0 else 'Manageable Debt'),
-            "estimated_months_to_clear": backend_data.get('debt_plan', {}).get('estimated_months_to_clear', 0 if debt == 0 else max(6, int(debt / (income * 0.15)))),
-            "recommended_strategy": backend_data.get('debt_plan', {}).get('recommended_strategy', 'Maintain your debt-free financial health!' if debt == 0 else 'Focus on high-interest debt first')
-        },
-        "financial_health_score": backend_data.get('financial_health_score', min(100, max(40, 70 + (savings_rate * 0.3))))
+def build_backend_payload(data):
+    """The backend's FinanceInput fields from the submitted form"""
+    return {
+        "income": float(data.get('income', 0)),
+        "expenses": data.get('expenses', {}),
+        "risk_level": data.get('risk_level', 'Medium'),
+        "debt": float(data.get('debt', 0))
     }
-    
-    print(f"✅ TRANSFORM COMPLETE - Final savings: ₹{results['budget_plan']['recommended_monthly_savings']}")
-    
-    return results
 
-    
+def relay_analysis(data):
+    """
+    Relay the backend's answer to the browser without decoding it (FRONTEND_PASSTHROUGH).
+
+    The backend builds the frontend schema itself (?view=frontend), so the
+    body is streamed through byte for byte; the result cache keeps the
+    bytes for revalidation.
+    """
+    payload = build_backend_payload(data)
+    headers = {"Content-Type": "application/json"}
+    cache_key = payload_key(payload)
+    cached = result_cache.get(cache_key) if result_cache is not None else None
+    if cached is not None:
+        headers["If-None-Match"] = cached.etag
+
+    try:
+        with observe_backend("/analyze-finance") as call:
+            response = backend_client.post(
+                "/analyze-finance",
+                params={"view": "frontend"},
+                json=payload,
+                headers=trace_headers(headers),
+                stream=True
+            )
+            call["status"] = response.status_code
+    except requests.exceptions.ConnectionError:
+        logger.error("Cannot connect to backend at %s", BACKEND_URL)
+        count_fallback("connection_error")
+        return jsonify({"success": True, "results": generate_fallback_analysis(data)})
+    except requests.exceptions.RequestException as e:
+        logger.error("Backend request failed: %s", e)
+        count_fallback("unexpected_error")
+        return jsonify({"success": True, "results": generate_fallback_analysis(data)})
+
+    if response.status_code == 304 and cached is not None:
+        response.close()
+        result_cache.note_revalidated()
+        return Response(cached.body, content_type="application/json")
+
+    if response.status_code != 200:
+        logger.warning("Backend error %s", response.status_code)
+        response.close()
+        count_fallback("backend_status")
+        return jsonify({"success": True, "results": generate_fallback_analysis(data)})
+
+    etag = response.headers.get("ETag")
+
+    def generate():
+        chunks = []
+        with response:
+            for chunk in response.iter_content(chunk_size=None):
+                chunks.append(chunk)
+                yield chunk
+        # Only a complete body is worth revalidating later
+        if result_cache is not None and etag:
+            if cached is not None:
+                result_cache.note_stale()
+            result_cache.set(cache_key, etag, body=b"".join(chunks))
+
+    relay_headers = {}
+    if "Content-Length" in response.headers:
+        relay_headers["Content-Length"] = response.headers["Content-Length"]
+    return Response(
+        generate(),
+        content_type=response.headers.get("Content-Type", "application/json"),
+        headers=relay_headers
+    )
+
+def relay_analysis_stream(data):
+    """Relay the backend's per-section Server-Sent Events to the browser"""
+    payload = build_backend_payload(data)
+    # Taken now: the generator below runs after this view has returned
+    headers = trace_headers({"Accept": "text/event-stream"})
+
+    def generate():
+        try:
+            with observe_backend("/analyze-finance/stream") as call:
+                response = backend_client.post(
+                    "/analyze-finance/stream",
+                    json=payload,
+                    headers=headers,
+                    stream=True
+                )
+                call["status"] = response.status_code
+            if response.status_code == 200:
+                with response:
+                    # chunk_size=None yields each chunk as soon as it arrives
+                    for chunk in response.iter_content(chunk_size=None):
+                        yield chunk
+                return
+            logger.warning("Backend stream error %s", response.status_code)
+        except requests.exceptions.RequestException as e:
+            logger.error("Backend stream failed: %s", e)
+
+        # Same event shape, built from the local fallback analysis
+        count_fallback("stream_failed")
+        results = generate_fallback_analysis(data)
+        for section, value in results.items():
+            yield f"event: {section}\ndata: {app.json.dumps(value)}\n\n"
+        yield f"event: complete\ndata: {app.json.dumps(results)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 def generate_fallback_analysis(data):
     """Generate basic analysis when backend is unavailable - matches frontend structure"""
     
@@ -237,8 +259,7 @@ def generate_fallback_analysis(data):
     total_expenses = sum(expenses_dict.values()) if expenses_dict else 0
     actual_savings = income - total_expenses
     savings_rate = (actual_savings / income) * 100 if income > 0 else 0
-    
-    print(f"🚨 FALLBACK ACTIVATED - Income: ₹{income}, Expenses: ₹{total_expenses}, Savings: ₹{actual_savings}")
+    logger.info("Serving fallback analysis")
     
     # Risk-based portfolio adjustment
     risk_multiplier = 1.0
@@ -339,6 +360,13 @@ def generate_fallback_analysis(data):
 def health_check():
     return jsonify({"status": "healthy", "service": "flask-frontend"})
 
+@app.route('/stats')
+def stats():
+    return jsonify({
+        "backend_pool": backend_client.stats(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+    })
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Pooled HTTP client for calls from the frontend to the FastAPI backend.
+
+Every request thread gets its own requests.Session, and all of them share
+one HTTPAdapter, so one urllib3 connection pool. Connections to the
+backend are kept alive and reused instead of paying the TCP (and TLS)
+handshake on every user request.
+
+Failures that are safe to repeat are retried a bounded number of times
+with jittered exponential backoff: connections that could not be
+established, and 502/503/504 answers from the backend or its proxy. An
+analysis has no side effects, so a POST is repeatable too. Read timeouts
+are not retried, because the backend may still be working on the first
+attempt.
+"""
+import os
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BACKEND_URL = os.environ.get('BACKEND_URL', 'http://localhost:8000')
+# Connections kept open to the backend; size it to the server's thread count
+BACKEND_POOL_SIZE = int(os.environ.get('BACKEND_POOL_SIZE', '20'))
+BACKEND_CONNECT_TIMEOUT = float(os.environ.get('BACKEND_CONNECT_TIMEOUT', '3.05'))
+BACKEND_READ_TIMEOUT = float(os.environ.get('BACKEND_READ_TIMEOUT', '30'))
+BACKEND_RETRIES = int(os.environ.get('BACKEND_RETRIES', '2'))
+BACKEND_RETRY_BACKOFF = float(os.environ.get('BACKEND_RETRY_BACKOFF', '0.25'))
+# Longest wait between attempts, Retry-After from the backend included
+BACKEND_RETRY_MAX_BACKOFF = float(os.environ.get('BACKEND_RETRY_MAX_BACKOFF', '2'))
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.sessions = 0
+
+    def add(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+_counters = _Counters()
+
+
+class JitteredRetry(Retry):
+    """Retry with full jitter on the backoff, capped Retry-After, and a retry counter"""
+
+    def get_backoff_time(self) -> float:
+        backoff = min(super().get_backoff_time(), BACKEND_RETRY_MAX_BACKOFF)
+        # Spread retries out so a backend blip is not followed by a synchronized burst
+        return random.uniform(0, backoff)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, BACKEND_RETRY_MAX_BACKOFF)
+
+    def increment(self, *args, **kwargs):
+        retry = super().increment(*args, **kwargs)
+        _counters.add("retries")
+        return retry
+
+
+def _build_adapter() -> HTTPAdapter:
+    retry = JitteredRetry(
+        total=BACKEND_RETRIES,
+        connect=BACKEND_RETRIES,
+        read=0,
+        status=BACKEND_RETRIES,
+        other=0,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        backoff_factor=BACKEND_RETRY_BACKOFF,
+        raise_on_status=False,
+    )
+    # One host, so a single pool holding up to BACKEND_POOL_SIZE connections
+    return HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE, pool_block=False, max_retries=retry)
+
+
+_adapter = _build_adapter()
+_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """This thread's session; every session shares the same connection pool"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.mount("http://", _adapter)
+        session.mount("https://", _adapter)
+        _local.session = session
+        _counters.add("sessions")
+    return session
+
+
+def post(path: str, **kwargs) -> requests.Response:
+    """POST to the backend through the pool with the configured timeouts and retries"""
+    kwargs.setdefault("timeout", (BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT))
+    _counters.add("requests")
+    return get_session().post(f"{BACKEND_URL}{path}", **kwargs)
+
+
+def stats() -> dict:
+    """Connection reuse and retry counts since start-up"""
+    opened = idle = pooled_requests = 0
+    for key in _adapter.poolmanager.pools.keys():
+        pool = _adapter.poolmanager.pools.get(key)
+        if pool is None:
+            continue
+        opened += pool.num_connections
+        pooled_requests += pool.num_requests
+        # Free slots hold None until a connection is returned to them
+        idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+    return {
+        "pool_size": BACKEND_POOL_SIZE,
+        "requests": _counters.requests,
+        "http_requests": pooled_requests,
+        "connections_opened": opened,
+        "connections_idle": idle,
+        "connection_reuse_ratio": round(1 - opened / pooled_requests, 4) if pooled_requests else None,
+        "retries": _counters.retries,
+        "sessions": _counters.sessions,
+        "connect_timeout_seconds": BACKEND_CONNECT_TIMEOUT,
+        "read_timeout_seconds": BACKEND_READ_TIMEOUT,
+    }
@@ -0,0 +1,37 @@
+"""
+orjson-backed JSON for the Flask frontend.
+
+Installed as ``app.json``, so jsonify(), request.get_json() and the
+parsing of backend answers all use it. Output matches Flask's default
+provider in compact mode: sorted keys, no whitespace, UTF-8; types orjson
+does not know (Decimal, for instance) are written with str().
+"""
+import typing as t
+
+import orjson
+from flask import Response
+from flask.json.provider import JSONProvider
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ORJSONProvider(JSONProvider):
+    sort_keys = True
+    mimetype = "application/json"
+
+    def _option(self) -> int:
+        return _OPTIONS | orjson.OPT_SORT_KEYS if self.sort_keys else _OPTIONS
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        return self.dumpb(obj).decode("utf-8")
+
+    def dumpb(self, obj: t.Any) -> bytes:
+        """dumps() without the round trip through str"""
+        return orjson.dumps(obj, default=str, option=self._option())
+
+    def loads(self, s: t.Union[str, bytes], **kwargs: t.Any) -> t.Any:
+        return orjson.loads(s)
+
+    def response(self, *args: t.Any, **kwargs: t.Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumpb(obj) + b"\n", mimetype=self.mimetype)
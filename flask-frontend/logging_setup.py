@@ -0,0 +1,119 @@
+"""
+Asynchronous, structured logging for the Flask frontend (same as the backend's).
+
+The frontend is deployed on its own, so it keeps its own copy of
+backend/logging_setup.py; change the two together.
+
+setup_logging() puts a QueueHandler on the root logger: a log call
+creates the record, fills in its message and appends it to an in-memory
+queue, and a background QueueListener thread encodes and writes it. Log
+with %-style arguments (``logger.debug("result %s", result)``), never
+f-strings: the message is only built for records that pass the level
+check and the sampling, so disabled lines cost a level comparison.
+
+High-volume debug lines can be sampled: pass ``extra=SAMPLED`` and only
+LOG_SAMPLE_RATE of them are kept. Fields given in ``extra`` become keys
+of the JSON record.
+"""
+import os
+import sys
+import json
+import atexit
+import queue
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# json (one object per line) or text
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').strip().lower()
+# Share of the records logged with extra=SAMPLED that are kept
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+
+SAMPLED = {"sampled": True}
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key != "sampled":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Keep ``rate`` of the records marked with extra=SAMPLED, and every other record"""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves the output formatting to the listener.
+
+    The message is merged with its arguments here, while they still hold
+    the values they had at the call; the caller may change them right
+    after. The stock prepare() would also format the whole line and drop
+    exc_info, but the JSON encoding and the traceback can wait for the
+    writer thread: records never leave the process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener = None
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, sample_rate: float = LOG_SAMPLE_RATE,
+                  stream=None) -> logging.handlers.QueueListener:
+    """Route the root logger through a queue to a background writer; safe to call twice"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    # Dropped before they are queued
+    handler.addFilter(SampleFilter(sample_rate))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued on shutdown
+    atexit.register(_listener.stop)
+    return _listener
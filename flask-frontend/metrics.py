@@ -0,0 +1,113 @@
+"""
+Prometheus metrics for the Flask frontend, served at GET /metrics.
+
+Covers every route (latency, in-flight), calls to the FastAPI backend
+(latency per status or error, connection pool reuse and retries), the
+result cache and how often the local fallback analysis replaced the
+backend's answer.
+"""
+import time
+from contextlib import contextmanager
+
+import requests
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Matches the backend: analyses take seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 20, 30, 60)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to serve a request, until the response is closed",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served", ["route"])
+
+# outcome: the HTTP status, or timeout / connection_error / error
+BACKEND_SECONDS = Histogram(
+    "backend_request_duration_seconds", "Calls to the FastAPI backend, until the response headers",
+    ["endpoint", "outcome"], buckets=LATENCY_BUCKETS,
+)
+FALLBACKS = Counter("frontend_fallbacks_total", "Local fallback analyses served, by reason", ["reason"])
+
+
+@contextmanager
+def observe_backend(endpoint: str):
+    """Time one backend call; set ``call["status"]`` to the response status inside the block"""
+    call = {"status": None}
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        yield call
+        outcome = str(call["status"])
+    except requests.exceptions.Timeout:
+        outcome = "timeout"
+        raise
+    except requests.exceptions.ConnectionError:
+        outcome = "connection_error"
+        raise
+    finally:
+        BACKEND_SECONDS.labels(endpoint, outcome).observe(time.perf_counter() - start)
+
+
+def count_fallback(reason: str) -> None:
+    FALLBACKS.labels(reason).inc()
+
+
+class StatsCollector:
+    """
+    Exposes the numeric fields of stats() dicts at scrape time, as in the
+    backend: keys listed as counters become counters, other numbers gauges.
+    """
+
+    def __init__(self):
+        self._sources = {}
+
+    def add(self, prefix: str, stats, counters=()) -> None:
+        self._sources[prefix] = (stats, frozenset(counters))
+
+    def collect(self):
+        for prefix, (stats, counters) in self._sources.items():
+            for key, value in (stats() or {}).items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                family = CounterMetricFamily(name, f"{key} ({prefix})") if key in counters \
+                    else GaugeMetricFamily(name, f"{key} ({prefix})")
+                family.add_metric([], value)
+                yield family
+
+
+_stats_collector = StatsCollector()
+REGISTRY.register(_stats_collector)
+register_stats = _stats_collector.add
+
+
+def init_metrics(app) -> None:
+    """Time every request of ``app`` and serve GET /metrics"""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        g.metrics_start = time.perf_counter()
+        HTTP_IN_FLIGHT.labels(g.metrics_route).inc()
+
+    @app.after_request
+    def stop_timer_on_close(response):
+        route = g.pop("metrics_route", None)
+        if route is None:
+            return response
+        start = g.pop("metrics_start")
+        method, status = request.method, str(response.status_code)
+
+        # Streamed responses (SSE relay) finish when the server closes them
+        def finish():
+            HTTP_IN_FLIGHT.labels(route).dec()
+            HTTP_REQUEST_SECONDS.labels(method, route, status).observe(time.perf_counter() - start)
+
+        response.call_on_close(finish)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
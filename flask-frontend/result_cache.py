@@ -0,0 +1,94 @@
+"""
+Cache of finished analyses in the Flask frontend.
+
+Entries are keyed by the canonical backend payload and hold the
+decoded results (in FRONTEND_PASSTHROUGH mode, the relayed response
+body) together with the backend's ETag. A resubmitted form is
+revalidated with If-None-Match: while the backend still vouches for its
+analysis it answers 304 with no body and no agent work, and the stored
+results are served as they are.
+Entries expire after RESULT_CACHE_TTL_SECONDS and the least recently
+used are evicted beyond RESULT_CACHE_MAX_ENTRIES.
+"""
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', '1') == '1'
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', '512'))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('RESULT_CACHE_TTL_SECONDS', '900'))
+
+
+class CachedResult(NamedTuple):
+    etag: str
+    # The transformed results, or the relayed response body in pass-through mode
+    results: Optional[dict] = None
+    body: Optional[bytes] = None
+
+
+def payload_key(payload: dict) -> str:
+    """Same key for payloads that differ only in key order or number formatting"""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+class ResultCache:
+    """Thread-safe TTL + LRU store of ETagged analyses"""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl: float = RESULT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, CachedResult)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.revalidated = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """The stored result to revalidate, or None"""
+        with self._lock:
+            self.lookups += 1
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return result
+
+    def set(self, key: str, etag: str, results: Optional[dict] = None, body: Optional[bytes] = None) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + self.ttl, CachedResult(etag, results, body))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def note_revalidated(self) -> None:
+        """The backend confirmed a stored result (304)"""
+        with self._lock:
+            self.revalidated += 1
+
+    def note_stale(self) -> None:
+        """The backend sent a new analysis for a stored key"""
+        with self._lock:
+            self.stale += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "revalidated": self.revalidated,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "hit_ratio": self.revalidated / self.lookups if self.lookups else 0.0,
+            }
+
+
+result_cache = ResultCache() if RESULT_CACHE_ENABLED else None
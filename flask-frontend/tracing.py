@@ -0,0 +1,90 @@
+"""
+OpenTelemetry tracing for the Flask frontend.
+
+Every request gets a server span; calls to the backend carry its context
+in a W3C ``traceparent`` header (see trace_headers), so the backend's
+spans join the same trace. TRACING_EXPORTER works as in the backend:
+none (default, no-op spans), file (JSON lines in TRACING_FILE), console
+or otlp. Point both services at the same TRACING_FILE and print a trace
+with ``python -m tracing traces.jsonl`` from the backend directory.
+"""
+import os
+
+from flask import g, request
+from opentelemetry import context, trace
+from opentelemetry.propagate import extract, inject
+
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "none").strip().lower()
+TRACING_FILE = os.environ.get("TRACING_FILE", "traces.jsonl")
+
+tracer = trace.get_tracer("finance-frontend")
+
+
+def setup_tracing(service_name: str, exporter: str = TRACING_EXPORTER, path: str = TRACING_FILE) -> bool:
+    """Install the SDK tracer provider for ``exporter``; False when tracing is off"""
+    if exporter in ("", "none"):
+        return False
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if exporter == "file":
+        span_exporter = ConsoleSpanExporter(
+            out=open(path, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    elif exporter == "console":
+        span_exporter = ConsoleSpanExporter()
+    elif exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        span_exporter = OTLPSpanExporter()
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER {exporter!r}")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(provider)
+    return True
+
+
+def trace_headers(headers: dict = None) -> dict:
+    """``headers`` plus the current trace context, for an outgoing request"""
+    headers = dict(headers or {})
+    inject(headers)
+    return headers
+
+
+def init_tracing(app) -> None:
+    """Open a server span for every request of ``app``"""
+
+    @app.before_request
+    def start_span():
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        span = tracer.start_span(
+            f"{request.method} {route}", context=extract(request.headers), kind=trace.SpanKind.SERVER,
+            attributes={"http.request.method": request.method, "http.route": route},
+        )
+        g.trace_span = span
+        g.trace_token = context.attach(trace.set_span_in_context(span))
+
+    @app.after_request
+    def record_status(response):
+        span = g.get("trace_span")
+        if span is not None:
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status(trace.StatusCode.ERROR)
+        return response
+
+    # Runs once the response is done, after the last chunk of a streamed one
+    @app.teardown_request
+    def end_span(error):
+        span = g.pop("trace_span", None)
+        if span is None:
+            return
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(trace.StatusCode.ERROR)
+        context.detach(g.pop("trace_token"))
+        span.end()